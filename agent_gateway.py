@@ -0,0 +1,484 @@
+"""Cached calls to the workflow's decision agents.
+
+"batch compliance agent", "route compliance agent" and "Decision Agent1"
+call the chat model on every run, even when the same DPP profile or the same
+route forecast was judged a minute earlier. ``AgentGateway`` puts a
+content-addressed cache in front of the model:
+
+* the agent input is normalised (keys sorted, strings trimmed, floats
+  rounded, per-item identifiers such as batchId / uuid dropped, and list
+  order ignored where the agent does not depend on it) and hashed together
+  with the agent's model and prompts, so a prompt change invalidates its
+  entries;
+* the parsed JSON answer (the Structured Output Parser result) is stored in
+  SQLite with a TTL and least-recently-used eviction. Answers echo the
+  identifiers the key ignores (``includedBatches``, batch ids in ``reason``),
+  so they are stored as templates: each input identifier becomes a
+  positional placeholder, filled with the caller's own identifiers on every
+  hit;
+* ``run_many`` judges each distinct input once, so many batches with the
+  same profile cost one model call.
+
+The client speaks the OpenAI chat-completions API; ``OPENAI_BASE_URL`` can
+point it at ``StubModelServer`` (``python agent_gateway.py stub``) offline.
+
+    python agent_gateway.py run batch_compliance batch.json --cache agents.db
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import tracing
+
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
+MODEL = "gpt-5-nano"
+REQUEST_TIMEOUT_SECONDS = 120
+
+CACHE_TTL_SECONDS = 7 * 24 * 3600
+CACHE_MAX_ENTRIES = 50000
+FLOAT_DIGITS = 6
+WORKERS = 4
+
+# Keys that name an item rather than describe it; two batches that differ only here get one answer
+IDENTITY_KEYS = {"id", "uuid", "batchId", "shipmentId", "orderId", "garmentId", "productId", "timestamp"}
+# Shorter identifier values are not templated (too likely to match inside other text)
+MIN_IDENTITY_LENGTH = 2
+# Bumped when the stored answer format changes, so older entries are not served
+CACHE_FORMAT = 2
+
+# Prompts and output examples copied from the workflow's agent / parser nodes
+AGENTS = {
+    "batch_compliance": {
+        "system": (
+            "You are an EU batch routing and compliance agent.\n\n"
+            "RULE 1: You have NO internal knowledge of textile regulations. You MUST use the DPP_knowledge tool "
+            "to assess the input data.\n\n"
+            "RULE 2: Output ONLY raw JSON. Do not use Markdown formatting (no ```json backticks). Do not include "
+            "any conversational text outside the JSON object.\n\n"
+            'Structure your JSON response like this: { "isFlagged": boolean, "reason": "string", '
+            '"severity": "string", "recommendations": "string" }'
+        ),
+        "prompt": (
+            "Analyze the input data and explain whether the batches or dpp data has a reason to be flagged by "
+            "using the knowledge tool.\n\nYou should output valid JSON: Provide information whether it is flagged. "
+            "Explain what the reason is for whether it is flagged or not. Also include which batches, its severity, "
+            "and further recommendations.\n\nInput data:\n{input}"
+        ),
+        "example": {
+            "isFlagged": True,
+            "reason": "does not contain all required DPP information",
+            "includedBatches": "BatchId x",
+            "severity": "0.8",
+            "recommendations": "based on x, you should commit action y",
+        },
+        "ordered_lists": False,
+    },
+    "route_compliance": {
+        "system": (
+            "You are an EU shipment routing compliance agent.\n\n"
+            "CRITICAL RULE: You have NO internal knowledge of current port regulations or compliance status. "
+            "You MUST use the Route_Knowledge tool to retrieve this information.\n\n"
+            "If the tool returns no information, stop and reply 'No compliance data found.' "
+            "Do not hallucinate or make up regulations."
+        ),
+        "prompt": (
+            "First, retrieve the mandatory port compliance documents using the Route_Knowledge tool.\n\n"
+            "ONLY AFTER you have retrieved those documents, use them to assess the risk for the provided city "
+            "forecast data.\n\nInput Data: {input}"
+        ),
+        "example": {
+            "isFlagged": True,
+            "reason": "severe weather conditions",
+            "includedCities": "City x",
+            "severity": "0.8",
+            "recommendations": "based on x, you should commit action y",
+        },
+        "ordered_lists": False,
+    },
+    "decision": {
+        "system": (
+            "You are the Final Decision Authority in a Logistics Supply Chain.\n\n"
+            "Given the input data, decide whether this shipment is flagged or not.\n\n"
+            "In case of flagged, please explain exactly why in detail what goes wrong. Aks yourself on which "
+            "level: batch? weather? something else? maybe a combination of both.\n"
+        ),
+        "prompt": (
+            "You are given combined batch compliance and route compliance results.\n\n"
+            "Decide whether the shipment should:\n- PROCEED\n- DELAY\n- BLOCK\n\n"
+            "Base your decision on:\n- number and severity of flagged garments\n- overall batch risk\n"
+            "- route weather risk\n\nReturn JSON only with:\ndecision, confidence (0–1), reasons[], "
+            "requiredActions[].\n\nInput data:\n{input}\n"
+        ),
+        "example": {"decision": "PROCEED", "confidence": 0.9, "reasons": [], "requiredActions": []},
+        # Reasons / actions lists are read in order by the decision agent
+        "ordered_lists": True,
+    },
+}
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+_PLACEHOLDER = re.compile(r"\{\{id:(\d+)\}\}")
+
+
+# --- NORMALISATION ---
+def normalize(value, ordered_lists=False):
+    """Canonical form of an agent input (see module docstring)."""
+    if isinstance(value, dict):
+        return {
+            k: normalize(v, ordered_lists)
+            for k, v in sorted(value.items())
+            if k not in IDENTITY_KEYS
+        }
+    if isinstance(value, (list, tuple)):
+        items = [normalize(v, ordered_lists) for v in value]
+        return items if ordered_lists else sorted(items, key=_canonical)
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else round(value, FLOAT_DIGITS)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def identities(value, ordered_lists=False):
+    """Identifier values of an agent input, in the order ``normalize`` lays the input out.
+
+    Inputs with the same normalised form therefore list their identifiers
+    position by position, which is what lets a cached answer be re-labelled.
+    """
+    out = []
+
+    def walk(v):
+        if isinstance(v, dict):
+            for k, x in sorted(v.items()):
+                if k not in IDENTITY_KEYS:
+                    walk(x)
+                elif x is not None and not isinstance(x, (dict, list, tuple)):
+                    out.append(str(x).strip())
+        elif isinstance(v, (list, tuple)):
+            items = v if ordered_lists else sorted(v, key=lambda i: _canonical(normalize(i, ordered_lists)))
+            for x in items:
+                walk(x)
+
+    walk(value)
+    return out
+
+
+def _map_strings(value, fn):
+    if isinstance(value, str):
+        return fn(value)
+    if isinstance(value, dict):
+        return {k: _map_strings(v, fn) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_map_strings(v, fn) for v in value]
+    return value
+
+
+def to_template(answer, ids):
+    """``answer`` with each identifier from ``ids`` replaced by ``{{id:<position>}}``."""
+    slots = {}
+    for i, v in enumerate(ids):
+        if len(v) >= MIN_IDENTITY_LENGTH:
+            slots.setdefault(v, i)
+    if not slots:
+        return answer
+    # Whole identifiers only: "B1" must not match inside "B12" or "SB1"
+    pattern = re.compile(
+        r"(?<![\w.-])(" + "|".join(re.escape(v) for v in sorted(slots, key=len, reverse=True)) + r")(?![\w-]|\.\w)"
+    )
+    return _map_strings(answer, lambda s: pattern.sub(lambda m: "{{id:%d}}" % slots[m.group(1)], s))
+
+
+def fill_template(template, ids):
+    """Inverse of ``to_template`` for another input's ``ids``."""
+    def fill(s):
+        return _PLACEHOLDER.sub(lambda m: ids[int(m.group(1))] if int(m.group(1)) < len(ids) else m.group(0), s)
+
+    return _map_strings(template, fill)
+
+
+def input_key(agent, payload, model=MODEL):
+    """Cache key: hash of the agent definition, model and normalised input."""
+    spec = AGENTS[agent]
+    h = hashlib.sha256()
+    h.update(_canonical([CACHE_FORMAT, agent, model, spec["system"], spec["prompt"]]).encode("utf-8"))
+    h.update(_canonical(normalize(payload, spec["ordered_lists"])).encode("utf-8"))
+    return h.hexdigest()
+
+
+def parse_output(agent, text):
+    """Parse the model reply as the agent's JSON object; raises ValueError otherwise."""
+    data = json.loads(_FENCE.sub("", (text or "").strip()))
+    if not isinstance(data, dict):
+        raise ValueError(f"{agent} returned {type(data).__name__}, expected an object")
+    missing = [k for k in AGENTS[agent]["example"] if k not in data]
+    if missing:
+        raise ValueError(f"{agent} output is missing {', '.join(missing)}")
+    return data
+
+
+# --- CACHE ---
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS agent_cache (
+    key TEXT PRIMARY KEY,
+    agent TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_agent_cache_accessed ON agent_cache (accessed);
+"""
+
+
+class AgentCache:
+    """Agent answers in SQLite keyed by input hash, with TTL and LRU eviction."""
+
+    def __init__(self, path, ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = self.clock()
+        conn = self._conn()
+        row = conn.execute("SELECT created, value FROM agent_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            if row[0] + self.ttl <= now:
+                conn.execute("DELETE FROM agent_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE agent_cache SET accessed = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        return json.loads(row[1])
+
+    def put(self, key, agent, value):
+        now = self.clock()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO agent_cache (key, agent, created, accessed, hits, value) VALUES (?, ?, ?, ?, 0, ?)",
+                (key, agent, now, now, json.dumps(value)),
+            )
+            n = conn.execute("SELECT COUNT(*) FROM agent_cache").fetchone()[0]
+            if n > self.max_entries:
+                conn.execute(
+                    "DELETE FROM agent_cache WHERE key IN (SELECT key FROM agent_cache ORDER BY accessed LIMIT ?)",
+                    (n - self.max_entries,),
+                )
+
+    def purge_expired(self):
+        with self._conn() as conn:
+            return conn.execute("DELETE FROM agent_cache WHERE created <= ?", (self.clock() - self.ttl,)).rowcount
+
+    def stats(self):
+        rows = self._conn().execute("SELECT agent, COUNT(*), COALESCE(SUM(hits), 0) FROM agent_cache GROUP BY agent")
+        return {agent: {"entries": n, "hits": hits} for agent, n, hits in rows}
+
+
+# --- MODEL CLIENT ---
+class ChatClient:
+    """Minimal OpenAI-compatible chat-completions client (JSON replies)."""
+
+    def __init__(self, base_url=OPENAI_BASE_URL, api_key=None, model=MODEL, timeout=REQUEST_TIMEOUT_SECONDS):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY", "")
+        self.model = model
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.requests = 0
+
+    def complete(self, system, prompt):
+        self.requests += 1
+        resp = self.session.post(
+            f"{self.base_url}/chat/completions",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={
+                "model": self.model,
+                "messages": [{"role": "system", "content": system}, {"role": "user", "content": prompt}],
+                "response_format": {"type": "json_object"},
+            },
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        return resp.json()["choices"][0]["message"]["content"]
+
+
+# --- GATEWAY ---
+class AgentGateway:
+    """Runs agents through the cache; only unseen inputs reach the model."""
+
+    def __init__(self, client=None, cache=None):
+        self.client = client or ChatClient()
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def _template(self, agent, payload, key):
+        """``(template, cached)``: the stored answer for ``key``, asking the model on a miss."""
+        spec = AGENTS[agent]
+        with tracing.span(f"agent.{agent}", stage=f"{agent}_agent") as span:
+            if self.cache is not None:
+                template = self.cache.get(key)
+                if template is not None:
+                    self.hits += 1
+                    span.set_attribute("agent.cached", True)
+                    return template, True
+            self.misses += 1
+            span.set_attribute("agent.cached", False)
+            prompt = spec["prompt"].replace("{input}", json.dumps(payload, indent=2, ensure_ascii=False))
+            answer = parse_output(agent, self.client.complete(spec["system"], prompt))
+            template = to_template(answer, identities(payload, spec["ordered_lists"]))
+            if self.cache is not None:
+                self.cache.put(key, agent, template)
+            return template, False
+
+    def run(self, agent, payload):
+        """Return ``(answer, cached)`` for one agent input."""
+        template, cached = self._template(agent, payload, input_key(agent, payload, self.client.model))
+        return fill_template(template, identities(payload, AGENTS[agent]["ordered_lists"])), cached
+
+    def run_many(self, agent, payloads, workers=WORKERS):
+        """Answers for ``payloads`` in order; each distinct normalised input runs once.
+
+        Every answer carries its own payload's identifiers, also when shared.
+        """
+        ordered = AGENTS[agent]["ordered_lists"]
+        keys = [input_key(agent, p, self.client.model) for p in payloads]
+        first = {}
+        for i, k in enumerate(keys):
+            first.setdefault(k, i)
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            templates = dict(zip(first, pool.map(
+                lambda item: self._template(agent, payloads[item[1]], item[0])[0], first.items(),
+            )))
+        return [fill_template(templates[k], identities(p, ordered)) for k, p in zip(keys, payloads)]
+
+
+# --- STUB SERVER ---
+class StubModelServer:
+    """Local OpenAI-compatible endpoint answering every agent with its output example.
+
+    ``respond(agent, messages)`` can return a custom answer dict; ``delay``
+    seconds are slept per request to stand in for model latency.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0, respond=None):
+        self.delay = delay
+        self.respond = respond
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _answer(self, messages):
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        agent = next((name for name, spec in AGENTS.items() if spec["system"] == system), None)
+        if self.respond is not None:
+            return self.respond(agent, messages)
+        return AGENTS[agent]["example"] if agent else {}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                if stub.delay:
+                    time.sleep(stub.delay)
+                content = json.dumps(stub._answer(body.get("messages") or []))
+                out = json.dumps({
+                    "object": "chat.completion",
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="model-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cached agent calls.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    stub = sub.add_parser("stub", help="Serve a local OpenAI-compatible stand-in")
+    stub.add_argument("--port", type=int, default=8766)
+    stub.add_argument("--delay", type=float, default=0.0)
+    run = sub.add_parser("run", help="Run an agent on a JSON input (a list runs each item)")
+    run.add_argument("agent", choices=sorted(AGENTS))
+    run.add_argument("input")
+    run.add_argument("--cache", default="agent_cache.db")
+    stats = sub.add_parser("stats", help="Show cache entries and hits per agent")
+    stats.add_argument("--cache", default="agent_cache.db")
+    args = parser.parse_args()
+
+    if args.cmd == "stub":
+        server = StubModelServer(port=args.port, delay=args.delay)
+        print(f"Stub model listening on {server.base_url}")
+        try:
+            server._httpd.serve_forever()
+        except KeyboardInterrupt:
+            server._httpd.server_close()
+    elif args.cmd == "stats":
+        print(json.dumps(AgentCache(args.cache).stats(), indent=2))
+    else:
+        with open(args.input, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        gateway = AgentGateway(cache=AgentCache(args.cache))
+        started = time.perf_counter()
+        answers = gateway.run_many(args.agent, data if isinstance(data, list) else [data])
+        print(json.dumps(answers if isinstance(data, list) else answers[0], indent=2))
+        print(f"{gateway.hits} cached, {gateway.misses} model calls in {time.perf_counter() - started:.2f}s")
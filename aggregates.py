@@ -0,0 +1,200 @@
+"""Decision-bucket and risk counts behind the Shipments charts.
+
+The page used to copy the whole frame twice per rerun and bucket every
+decision with ``.apply`` before calling ``value_counts``. ``DecisionAggregates``
+holds the counts plus, per row, a hash of its decision and risk and the
+label codes it was counted under. Each data version is derived from the
+previous one: rows whose hash changed (the workflow writes the sheet with
+``appendOrUpdate``, the SQLite store upserts) are taken out under their old
+labels and counted under their new ones, and appended rows are added. Only
+the hashing touches every row.
+``AggregateRegistry`` shares them across sessions, and the chart figures are
+cached on the counts themselves, so an unchanged log re-renders without
+touching its rows.
+"""
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+BUCKETS = ("PROCEED", "DELAY", "BLOCK", "Unknown")
+# Columns the counts depend on (and the row hashes cover)
+COUNTED_COLUMNS = ("decision", "risk")
+
+# Versions kept per registry
+KEEP_VERSIONS = 4
+
+
+def decision_bucket(x):
+    s = str(x or "").upper()
+    if "BLOCK" in s:
+        return "BLOCK"
+    if "DELAY" in s:
+        return "DELAY"
+    if "PROCEED" in s:
+        return "PROCEED"
+    return "Unknown"
+
+
+def _risk_label(x):
+    return "" if x is None or (isinstance(x, float) and x != x) else str(x).strip()
+
+
+def _label_codes(series, label, codes):
+    """Code of ``label(value)`` per row; ``codes`` ({label: code}) gains unseen labels."""
+    # Label each distinct value once instead of every row
+    positions, uniques = pd.factorize(series, use_na_sentinel=False)
+    lookup = np.array([codes.setdefault(label(v), len(codes)) for v in uniques], dtype=np.int32)
+    return lookup[positions] if len(lookup) else np.zeros(len(series), dtype=np.int32)
+
+
+def _row_hashes(df):
+    """One uint64 per row over the counted columns (decision, risk)."""
+    cols = [c for c in COUNTED_COLUMNS if c in df.columns]
+    if not cols:
+        return np.zeros(len(df), dtype=np.uint64)
+    # Categoricals hash by value already (and far faster than as text)
+    frame = pd.DataFrame({
+        c: df[c] if isinstance(df[c].dtype, pd.CategoricalDtype) else df[c].astype(str) for c in cols
+    })
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+class _Column:
+    """Per-row label codes of one counted column, and the counts they add up to."""
+
+    def __init__(self, name, label, codes=None):
+        self.name = name
+        self.label = label
+        self.codes = dict(codes or {})  # label -> code
+        self.rows = np.zeros(0, dtype=np.int32)
+        self.counts = Counter()
+
+    def copy(self):
+        other = _Column(self.name, self.label, self.codes)
+        other.rows = self.rows
+        other.counts = Counter(self.counts)
+        return other
+
+    def _tally(self, codes, sign):
+        labels = list(self.codes)
+        for code, n in enumerate(np.bincount(codes, minlength=len(labels))):
+            if n:
+                self.counts[labels[code]] += sign * int(n)
+
+    def build(self, series):
+        self.rows = _label_codes(series, self.label, self.codes)
+        self.counts = Counter()
+        self._tally(self.rows, 1)
+
+    def patch(self, series, changed, length):
+        """Recount rows ``changed`` (positions < ``length``) from ``series``; rows past ``length`` go."""
+        old = self.rows
+        self._tally(old[changed[changed < len(old)]], -1)
+        self._tally(old[length:], -1)
+        new = _label_codes(series.iloc[changed], self.label, self.codes)
+        self._tally(new, 1)
+        rows = np.empty(length, dtype=np.int32)
+        kept = min(length, len(old))
+        rows[:kept] = old[:kept]
+        rows[changed] = new
+        self.rows = rows
+
+
+def _columns():
+    return {
+        "decision": _Column("decision", decision_bucket, {b: i for i, b in enumerate(BUCKETS)}),
+        "risk": _Column("risk", _risk_label),
+    }
+
+
+class DecisionAggregates:
+    """Decision-bucket and risk counts for one snapshot of the decision log.
+
+    Keeps the snapshot's row hashes and per-row label codes, so the next
+    snapshot only recounts the rows whose hash differs and the rows appended.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self._hashes = np.zeros(0, dtype=np.uint64)
+        self._columns = {}
+
+    @property
+    def buckets(self):
+        column = self._columns.get("decision")
+        return column.counts if column is not None else Counter()
+
+    @property
+    def risks(self):
+        column = self._columns.get("risk")
+        return column.counts if column is not None else Counter()
+
+    def copy(self):
+        other = DecisionAggregates()
+        other.rows = self.rows
+        other._hashes = self._hashes
+        other._columns = {name: column.copy() for name, column in self._columns.items()}
+        return other
+
+    @classmethod
+    def from_frame(cls, df, hashes=None):
+        aggs = cls()
+        aggs.rows = len(df)
+        aggs._hashes = _row_hashes(df) if hashes is None else hashes
+        aggs._columns = {name: column for name, column in _columns().items() if name in df.columns}
+        for name, column in aggs._columns.items():
+            column.build(df[name])
+        return aggs
+
+    def advance(self, df):
+        """Aggregates for ``df``, recounting only rows that changed since this snapshot.
+
+        Rows are compared by position: an edited row is recounted, appended
+        rows are added and rows past the end of ``df`` are taken out. A
+        different set of counted columns recounts everything.
+        """
+        hashes = _row_hashes(df)
+        if set(self._columns) != {c for c in COUNTED_COLUMNS if c in df.columns}:
+            return DecisionAggregates.from_frame(df, hashes)
+        shared = min(self.rows, len(df))
+        changed = np.flatnonzero(hashes[:shared] != self._hashes[:shared])
+        if not len(changed) and len(df) == self.rows:
+            return self
+        changed = np.concatenate([changed, np.arange(shared, len(df))])
+        nxt = self.copy()
+        nxt.rows = len(df)
+        nxt._hashes = hashes
+        for name, column in nxt._columns.items():
+            column.patch(df[name], changed, len(df))
+        return nxt
+
+    def bucket_counts(self):
+        """``((bucket, count), ...)`` by descending count, zero buckets dropped."""
+        return tuple(sorted(((b, n) for b, n in self.buckets.items() if n > 0), key=lambda t: (-t[1], t[0])))
+
+    def risk_counts(self):
+        """``((risk, count), ...)`` by descending count, blank risks dropped."""
+        return tuple(sorted(((r, n) for r, n in self.risks.items() if r and n > 0), key=lambda t: (-t[1], t[0])))
+
+
+class AggregateRegistry:
+    """Process-wide aggregates per data version, advanced from the latest known one."""
+
+    def __init__(self, keep=KEEP_VERSIONS):
+        self.keep = keep
+        self._by_version = {}
+        self._latest = None
+        self._lock = threading.Lock()
+
+    def for_frame(self, version, df):
+        with self._lock:
+            aggs = self._by_version.get(version)
+            if aggs is None:
+                aggs = self._latest.advance(df) if self._latest is not None else DecisionAggregates.from_frame(df)
+                self._by_version[version] = aggs
+                self._latest = aggs
+                while len(self._by_version) > self.keep:
+                    self._by_version.pop(next(iter(self._by_version)))
+            return aggs
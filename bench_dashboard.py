@@ -0,0 +1,390 @@
+"""Benchmarks for the dashboard's data paths at several decision-log sizes.
+
+Every Streamlit interaction reruns the whole page over the decision log:
+column normalisation, the search index, the decision filter, sorting and
+paging, the editor write-back and the chart aggregates. This script drives
+those reruns headlessly with Streamlit's ``AppTest`` against a seeded local
+CSV stand-in for the sheet (``SHEET_CSV_URL``), at each requested size.
+
+Each step is one rerun (Home, Shipments cold and warm, search, filter, sort,
+Shipment Overview). Steps are timed over ``--repeats`` fresh sessions with
+cold Streamlit caches, after one untimed warm-up session that pays for module
+imports, and the median is kept. Peak memory per step is the process peak
+RSS, reset before the step through ``/proc/self/clear_refs`` on Linux;
+elsewhere it is tracemalloc's peak, which only sees Python-visible
+allocations. The editor
+write-back (``EditTracker`` into a SQLite store) cannot be driven through
+AppTest, so it is timed directly with the same calls the page makes.
+
+Results can be saved as a baseline and later runs compared against it; a
+step is flagged when it is slower (or larger) by more than ``--tolerance``
+and by more than an absolute floor, and the exit status is 1.
+
+    python bench_dashboard.py --sizes 10000,100000 --save-baseline bench-baseline.json
+    python bench_dashboard.py --sizes 10000,100000 --baseline bench-baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard.py")
+SIZES = (10_000, 100_000, 1_000_000)
+REPEATS = 3
+SEED = 0
+RUN_TIMEOUT_SECONDS = 600
+WORKDIR = os.path.join(tempfile.gettempdir(), "shipping-dashboard-bench")
+
+# A step regresses when it is this much slower / larger than the baseline...
+TOLERANCE = 0.25
+# ...and by more than these absolute amounts (so timer noise on fast steps is ignored)
+MIN_SECONDS = 0.05
+MIN_MB = 16.0
+
+EDITS = 50
+SEARCH_QUERY = "weather"
+
+DECISIONS = ["FLAGGED AS PROCEED", "FLAGGED AS DELAY", "FLAGGED AS BLOCK", "PROCEED", "GOOD", ""]
+RISKS = ["LOW", "MEDIUM", "HIGH", "Low", "High", ""]
+REASONS = [
+    "weather delay at destination port",
+    "compliance score below threshold",
+    "missing raw material certifications",
+    "all checks passed",
+    "transport CO2 above budget",
+    "labor standards under review",
+]
+RECOMMENDATIONS = [
+    "- check port\n- re-plan leg",
+    '["Request audit", "Hold batch"]',
+    "Proceed as planned",
+    "- wait; - recheck forecast",
+]
+PORTS = ["Rotterdam", "Antwerp-Bruges", "Hamburg", "Valencia", "Algeciras", "Genoa", "Piraeus", "Le Havre"]
+
+
+# --- DATA ---
+def make_decision_csv(path, rows, seed=SEED):
+    """Write a seeded decision log with the sheet's columns (about two rows per shipment)."""
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(0, max(1, rows // 2), rows)
+    stamps = np.datetime64("2025-01-01T00:00:00") + np.sort(rng.integers(0, 365 * 86400, rows)).astype("timedelta64[s]")
+    a, b, c = (rng.integers(0, len(PORTS), rows) for _ in range(3))
+    ports = np.array(PORTS, dtype=object)
+    route = np.where(rng.random(rows) < 0.5, ports[a] + " -> " + ports[b] + " -> " + ports[c], ports[a] + "," + ports[c])
+    df = pd.DataFrame({
+        "ShipmentID": np.char.add("SHP-", np.char.zfill(ids.astype(str), 7)),
+        "Timestamp": np.datetime_as_string(stamps) + "Z",
+        "Decision": np.array(DECISIONS, dtype=object)[rng.integers(0, len(DECISIONS), rows)],
+        "Risk": np.array(RISKS, dtype=object)[rng.integers(0, len(RISKS), rows)],
+        "Reason": np.array(REASONS, dtype=object)[rng.integers(0, len(REASONS), rows)],
+        "Recommendations": np.array(RECOMMENDATIONS, dtype=object)[rng.integers(0, len(RECOMMENDATIONS), rows)],
+        "Route": route,
+    })
+    tmp = f"{path}.tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def decision_csv(rows, workdir=WORKDIR, seed=SEED):
+    """Path of the CSV for ``rows`` / ``seed``, generated on first use."""
+    os.makedirs(workdir, exist_ok=True)
+    path = os.path.join(workdir, f"decisions-{rows}-{seed}.csv")
+    if not os.path.exists(path):
+        make_decision_csv(path, rows, seed)
+    return path
+
+
+# --- MEASUREMENT ---
+def _hwm_mb():
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    raise OSError("VmHWM not available")
+
+
+def _can_reset_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        _hwm_mb()
+        return True
+    except OSError:
+        return False
+
+
+class PeakMemory:
+    """Peak memory (MB) over a block: process peak RSS where it can be reset, else tracemalloc."""
+
+    def __init__(self):
+        self.source = "rss" if _can_reset_rss() else "tracemalloc"
+        self.peak_mb = None
+
+    def __enter__(self):
+        if self.source == "rss":
+            with open("/proc/self/clear_refs", "w") as f:
+                f.write("5")
+        else:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        return self
+
+    def __exit__(self, *exc):
+        if self.source == "rss":
+            self.peak_mb = _hwm_mb()
+        else:
+            self.peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+
+
+def _widget(elements, label):
+    for e in elements:
+        if e.label == label:
+            return e
+    return None
+
+
+def _go(tab):
+    def step(at):
+        at.session_state["active_tab"] = tab
+        at.run()
+    return step
+
+
+def _rerun(at):
+    at.run()
+
+
+def _search(at):
+    _widget(at.text_input, "Search").set_value(SEARCH_QUERY)
+    at.run()
+
+
+def _filter(at):
+    box = _widget(at.selectbox, "Filter Decision")
+    if box is not None and len(box.options) > 1:
+        box.set_value(box.options[1])
+    at.run()
+
+
+def _sort(at):
+    _widget(at.text_input, "Search").set_value("")
+    box = _widget(at.selectbox, "Filter Decision")
+    if box is not None:
+        box.set_value("All")
+    sort = _widget(at.selectbox, "Sort by")
+    if sort is not None and "timestamp" in sort.options:
+        sort.set_value("timestamp")
+    at.run()
+
+
+# One rerun each, in order, on the same session
+STEPS = [
+    ("home", _go("Home")),
+    ("shipments_load", _go("Shipments")),
+    ("shipments_rerun", _rerun),
+    ("search", _search),
+    ("filter", _filter),
+    ("sort", _sort),
+    ("overview", _go("Shipment Overview")),
+]
+
+
+def _clear_caches():
+    import streamlit as st
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+def run_pass(csv_path, memory=None):
+    """One fresh session through ``STEPS``; ``{step: {"seconds", "peak_mb"?, "error"?}}``."""
+    from streamlit.testing.v1 import AppTest
+
+    os.environ["SHEET_CSV_URL"] = csv_path
+    _clear_caches()
+    at = AppTest.from_file(APP_PATH, default_timeout=RUN_TIMEOUT_SECONDS)
+    out = {}
+    for name, step in STEPS:
+        started = time.perf_counter()
+        if memory is not None:
+            with memory:
+                step(at)
+        else:
+            step(at)
+        out[name] = {"seconds": time.perf_counter() - started}
+        if memory is not None:
+            out[name]["peak_mb"] = memory.peak_mb
+        errors = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+        if errors:
+            out[name]["error"] = errors[0]
+    return out
+
+
+def bench_edit_writeback(csv_path, edits=EDITS, workdir=WORKDIR):
+    """Time ``EditTracker.sync`` + ``flush`` for ``edits`` STATUS cells (via a session overlay) into a SQLite store."""
+    from decision_store import SQLiteDecisionStore, normalize_columns
+    from edit_tracking import EditTracker
+    from shared_table import SessionTable, SharedTable, StatusOverlay
+
+    df = normalize_columns(pd.read_csv(csv_path)).fillna("")
+    df["STATUS"] = ""
+    db = os.path.join(workdir, f"writeback-{os.getpid()}.db")
+    if os.path.exists(db):
+        os.remove(db)
+    store = SQLiteDecisionStore(db)
+    store.import_frame(df)
+    positions = np.linspace(0, len(df) - 1, min(edits, len(df))).astype(int)
+    state = {"edited_rows": {int(p): {"STATUS": "checked"} for p in positions}, "added_rows": [], "deleted_rows": []}
+
+    shipments = SessionTable(SharedTable.from_frame(df, store.version()), StatusOverlay())
+    tracker = EditTracker()
+    tracker.sync("bench", {}, df.index, shipments, columns=["STATUS"])
+    started = time.perf_counter()
+    tracker.sync("bench", state, df.index, shipments, columns=["STATUS"])
+    written = tracker.flush(store, shipments)
+    elapsed = time.perf_counter() - started
+    os.remove(db)
+    return {"seconds": elapsed, "rows": written}
+
+
+def bench_size(rows, repeats=REPEATS, workdir=WORKDIR, seed=SEED):
+    csv_path = decision_csv(rows, workdir, seed)
+    # The first pass in a process also pays for importing the app's modules; it is not timed
+    run_pass(csv_path)
+    # Timing passes run without memory tracking; one more pass measures memory
+    passes = [run_pass(csv_path) for _ in range(repeats)]
+    memory = PeakMemory()
+    mem_pass = run_pass(csv_path, memory)
+    steps = {}
+    for name, _ in STEPS:
+        result = {
+            "seconds": statistics.median(p[name]["seconds"] for p in passes),
+            "peak_mb": mem_pass[name]["peak_mb"],
+        }
+        error = next((p[name]["error"] for p in passes + [mem_pass] if "error" in p[name]), None)
+        if error:
+            result["error"] = error
+        steps[name] = result
+    steps["edit_writeback"] = bench_edit_writeback(csv_path, workdir=workdir)
+    return {"steps": steps, "memory": memory.source}
+
+
+def environment():
+    import streamlit
+
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "streamlit": streamlit.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run(sizes=SIZES, repeats=REPEATS, workdir=WORKDIR, seed=SEED):
+    return {
+        "environment": environment(),
+        "seed": seed,
+        "repeats": repeats,
+        "sizes": {str(rows): bench_size(rows, repeats, workdir, seed) for rows in sizes},
+    }
+
+
+# --- BASELINE ---
+def compare(results, baseline, tolerance=TOLERANCE, min_seconds=MIN_SECONDS, min_mb=MIN_MB):
+    """Regressions of ``results`` against ``baseline``, one dict per step and metric."""
+    regressions = []
+    for size, current in results["sizes"].items():
+        base = baseline.get("sizes", {}).get(size)
+        if base is None:
+            continue
+        for step, now in current["steps"].items():
+            then = base["steps"].get(step)
+            if then is None:
+                continue
+            for metric, floor in (("seconds", min_seconds), ("peak_mb", min_mb)):
+                if now.get(metric) is None or then.get(metric) is None:
+                    continue
+                if metric == "peak_mb" and current.get("memory") != base.get("memory"):
+                    continue
+                if now[metric] > then[metric] * (1 + tolerance) and now[metric] - then[metric] > floor:
+                    regressions.append({
+                        "size": int(size),
+                        "step": step,
+                        "metric": metric,
+                        "baseline": then[metric],
+                        "current": now[metric],
+                        "ratio": now[metric] / then[metric] if then[metric] else None,
+                    })
+    return regressions
+
+
+def format_results(results):
+    lines = []
+    for size, result in results["sizes"].items():
+        lines.append(f"# {int(size):,} rows (memory: {result['memory']})")
+        for step, r in result["steps"].items():
+            mem = f"{r['peak_mb']:9.1f} MB" if r.get("peak_mb") is not None else " " * 12
+            note = f"  ERROR: {r['error']}" if r.get("error") else ""
+            lines.append(f"  {step:<16} {r['seconds']:8.3f}s {mem}{note}")
+    return "\n".join(lines)
+
+
+def _write_json(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dashboard reruns at several decision-log sizes.")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in SIZES), help="Comma-separated row counts")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--workdir", default=WORKDIR, help="Where the generated CSVs are kept")
+    parser.add_argument("--output", help="Write the results JSON here")
+    parser.add_argument("--baseline", help="Compare against this results JSON")
+    parser.add_argument("--save-baseline", help="Write the results as a baseline here")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    # Deprecation warnings from every rerun would bury the results
+    from streamlit import config
+    from streamlit.logger import set_log_level
+
+    config.set_option("logger.level", "error")
+    set_log_level("error")
+    os.environ.setdefault("SHEET_CACHE_DIR", os.path.join(args.workdir, "sheet-cache"))
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = run(sizes, args.repeats, args.workdir, args.seed)
+    print(format_results(results))
+    if args.output:
+        _write_json(args.output, results)
+    if args.save_baseline:
+        _write_json(args.save_baseline, results)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("environment") != results["environment"]:
+            print("Note: baseline was recorded in a different environment", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['size']:,} rows {r['step']} {r['metric']}: "
+                  f"{r['baseline']:.3f} -> {r['current']:.3f} ({r['ratio']:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline")
@@ -0,0 +1,329 @@
+"""Rule-based batch compliance, with the LLM agent kept for borderline batches.
+
+The DPP fields the batch compliance agent reasons about (complianceScore,
+esgRating, laborStandards, certifications, co2EmissionsKg, ...) are already
+structured, so most batches can be decided without a model call. Rules live
+in ``compliance_rules.json``. Each rule is a condition on one DPP field and
+fires when any garment in a batch matches it, or when at least ``min_share``
+of the batch's garments do. Rule levels are ordered
+PROCEED < REVIEW < DELAY < BLOCK; a batch takes the level of its worst rule.
+Garments with no DPP data at all (absent, null or an empty object) cannot be
+checked by any rule, so they escalate their batch to the ``missing_dpp``
+level (BLOCK unless the rules file says otherwise) instead of passing.
+
+Conditions are evaluated column-wise over micro-batches of
+``garment_pipeline`` views, and hits are accumulated per batch with
+``np.bincount``, so a manifest is scored in one pass. Batches at REVIEW are
+borderline: ``assess_manifest`` sends only those to the "batch compliance
+agent" through ``agent_gateway`` (cached), when a gateway is given. Without
+one they take the ``review_fallback`` decision from the rules file (DELAY by
+default) with ``"source": "rules-review"``, since REVIEW is not a decision
+the workflow knows.
+
+Results use the shape of the workflow's ``Code in JavaScript4`` output:
+``{shipmentFlagged, decision, confidence, reasons, requiredActions}``, with
+``decision`` one of PROCEED / DELAY / BLOCK.
+
+    python compliance_rules.py syntheticdata.json
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from garment_pipeline import MICRO_BATCH, GarmentIndex, load_manifest, micro_batches
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compliance_rules.json")
+
+LEVELS = ("PROCEED", "REVIEW", "DELAY", "BLOCK")
+# Decisions of ``Code in JavaScript4``
+DECISIONS = ("PROCEED", "DELAY", "BLOCK")
+FLAGGED = ("DELAY", "BLOCK")
+# Agent severity at or above this blocks a flagged batch; below it delays
+AGENT_BLOCK_SEVERITY = 0.7
+
+_OPS = ("lt", "le", "gt", "ge", "eq", "ne", "in", "not_in", "missing", "empty")
+
+# Used when the rules file has no "missing_dpp" entry
+MISSING_DPP = {
+    "level": "BLOCK",
+    "reason": "no DPP data",
+    "action": "Attach a complete Digital Product Passport to every garment before release",
+}
+
+# Used when the rules file has no "review_fallback" entry
+REVIEW_FALLBACK = {
+    "decision": "DELAY",
+    "reason": "borderline; not reviewed by the batch compliance agent",
+}
+
+
+def load_rules(path=RULES_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        rules = json.load(f)
+    for rule in rules["rules"]:
+        if rule["op"] not in _OPS:
+            raise ValueError(f"Rule {rule['id']}: unknown op {rule['op']!r}")
+        if rule["level"] not in LEVELS:
+            raise ValueError(f"Rule {rule['id']}: unknown level {rule['level']!r}")
+    if rules.get("missing_dpp", MISSING_DPP)["level"] not in LEVELS:
+        raise ValueError(f"missing_dpp: unknown level {rules['missing_dpp']['level']!r}")
+    if rules.get("review_fallback", REVIEW_FALLBACK)["decision"] not in DECISIONS:
+        raise ValueError(f"review_fallback: unknown decision {rules['review_fallback']['decision']!r}")
+    return rules
+
+
+def _get_path(obj, path):
+    for key in path:
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(key)
+    return obj
+
+
+def _column(dpps, field):
+    path = field.split(".")
+    return [_get_path(d, path) for d in dpps]
+
+
+def _numbers(values):
+    out = np.full(len(values), np.nan)
+    for i, v in enumerate(values):
+        if isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[i] = v
+    return out
+
+
+def _strings(values):
+    return np.array(["" if v is None else str(v) for v in values], dtype=str)
+
+
+def _condition(rule, values):
+    """Boolean hit per garment for one rule."""
+    op = rule["op"]
+    if op == "missing":
+        return np.fromiter((v is None or v == "" or v == [] for v in values), dtype=bool, count=len(values))
+    if op == "empty":
+        return np.fromiter((not v for v in values), dtype=bool, count=len(values))
+    if op in ("lt", "le", "gt", "ge"):
+        x = _numbers(values)
+        with np.errstate(invalid="ignore"):
+            return {"lt": np.less, "le": np.less_equal, "gt": np.greater, "ge": np.greater_equal}[op](x, rule["value"])
+    s = _strings(values)
+    if op == "eq":
+        return s == str(rule["value"])
+    if op == "ne":
+        return (s != str(rule["value"])) & (s != "")
+    hit = np.isin(s, [str(v) for v in rule["value"]])
+    return hit if op == "in" else ~hit & (s != "")
+
+
+class BatchScores:
+    """Per-batch garment counts and rule hits for one manifest.
+
+    ``garments`` counts the garments the rules saw; ``no_dpp`` counts those
+    without DPP data, including the ones ``GarmentIndex`` skipped.
+    """
+
+    def __init__(self, index, rules):
+        self.index = index
+        self.rules = rules
+        n = len(index.batch_ids)
+        self.garments = np.zeros(n, dtype=np.int64)
+        self.no_dpp = np.asarray(index.skipped, dtype=np.int64).copy()
+        self.hits = np.zeros((len(rules["rules"]), n), dtype=np.int64)
+
+    def add(self, views):
+        group = self.index.groups[np.fromiter((v.row for v in views), dtype=np.int64, count=len(views))]
+        n = len(self.index.batch_ids)
+        self.garments += np.bincount(group, minlength=n)
+        dpps = [v.dpp for v in views]
+        # Kept by the index (e.g. `{}`) but still nothing to check
+        empty = np.fromiter((not (isinstance(d, dict) and d) for d in dpps), dtype=bool, count=len(dpps))
+        self.no_dpp += np.bincount(group[empty], minlength=n)
+        columns = {}
+        for r, rule in enumerate(self.rules["rules"]):
+            if rule["field"] not in columns:
+                columns[rule["field"]] = _column(dpps, rule["field"])
+            hit = _condition(rule, columns[rule["field"]])
+            self.hits[r] += np.bincount(group[hit], minlength=n)
+
+    def triggered(self):
+        """``(rules x batches)`` boolean matrix of rules that fire per batch."""
+        share = self.hits / np.maximum(self.garments, 1)
+        fired = self.hits > 0
+        for r, rule in enumerate(self.rules["rules"]):
+            if rule.get("min_share") is not None:
+                fired[r] = share[r] >= rule["min_share"]
+        return fired
+
+    def levels(self):
+        rule_levels = np.array([LEVELS.index(rule["level"]) for rule in self.rules["rules"]], dtype=np.int64)
+        fired = self.triggered()
+        levels = np.where(fired, rule_levels[:, None], 0).max(axis=0, initial=0)
+        missing_level = LEVELS.index(self.rules.get("missing_dpp", MISSING_DPP)["level"])
+        return np.where(self.no_dpp > 0, np.maximum(levels, missing_level), levels), fired
+
+
+def score_index(index, rules=None, micro_batch=MICRO_BATCH):
+    rules = rules or load_rules()
+    scores = BatchScores(index, rules)
+    for chunk in micro_batches(index.views(), micro_batch):
+        scores.add(chunk)
+    return scores
+
+
+def _rows_by_batch(index):
+    """Garment rows of each batch (one argsort, not one scan per batch)."""
+    order = np.argsort(index.groups, kind="stable")
+    bounds = np.searchsorted(index.groups[order], np.arange(1, len(index.batch_ids)))
+    return np.split(order, bounds)
+
+
+def _batch_payload(index, b, rows):
+    # The batch as "Batch mapping" hands it to the agent
+    views = [index[row] for row in rows]
+    ctx = index.shipments[index.batch_context[b]]
+    orders = {}
+    for v in views:
+        order = orders.setdefault(v.order.get("orderId"), {
+            "orderId": v.order.get("orderId"),
+            "brand": v.order.get("brand"),
+            "quantity": v.order.get("quantity"),
+            "garments": [],
+        })
+        order["garments"].append({"id": v.garment.get("id"), "orderId": v.garment.get("orderId"), "dpp": v.dpp})
+    return {
+        "batchId": index.batch_ids[b],
+        "shipmentId": ctx.get("shipmentId"),
+        "origin": ctx.get("origin"),
+        "destination": ctx.get("destination"),
+        "orders": list(orders.values()),
+    }
+
+
+def _from_agent(answer):
+    flagged = bool(answer.get("isFlagged"))
+    try:
+        severity = float(answer.get("severity"))
+    except (TypeError, ValueError):
+        severity = 1.0 if flagged else 0.0
+    decision = ("BLOCK" if severity >= AGENT_BLOCK_SEVERITY else "DELAY") if flagged else "PROCEED"
+    return {
+        "shipmentFlagged": flagged,
+        "decision": decision,
+        "confidence": severity if flagged else 1.0 - severity,
+        "reasons": [answer.get("reason")] if answer.get("reason") else [],
+        "requiredActions": [answer.get("recommendations")] if answer.get("recommendations") else [],
+    }
+
+
+def assess_manifest(manifest, rules=None, gateway=None, micro_batch=MICRO_BATCH):
+    """Decision per batch (``Code in JavaScript4`` shape plus batchId, shipmentId, source).
+
+    Borderline batches are decided by ``gateway`` when given; otherwise they
+    take the ``review_fallback`` decision, with ``source`` "rules-review".
+    """
+    rules = rules or load_rules()
+    index = manifest if isinstance(manifest, GarmentIndex) else GarmentIndex.build(manifest)
+    scores = score_index(index, rules, micro_batch)
+    levels, fired = scores.levels()
+
+    missing_dpp = rules.get("missing_dpp", MISSING_DPP)
+    results = []
+    for b, batch_id in enumerate(index.batch_ids):
+        decision = LEVELS[levels[b]]
+        reasons, actions = [], []
+        if scores.no_dpp[b]:
+            total = scores.garments[b] + index.skipped[b]
+            reasons.append(f"{scores.no_dpp[b]} of {total} garments: {missing_dpp['reason']}")
+            if missing_dpp.get("action"):
+                actions.append(missing_dpp["action"])
+        for r, rule in enumerate(rules["rules"]):
+            if fired[r, b]:
+                reasons.append(f"{scores.hits[r, b]} of {scores.garments[b]} garments: {rule['reason']}")
+                if rule.get("action") and rule["action"] not in actions:
+                    actions.append(rule["action"])
+        results.append({
+            "batchId": batch_id,
+            "shipmentId": index.shipments[index.batch_context[b]].get("shipmentId"),
+            "shipmentFlagged": decision in FLAGGED,
+            "decision": decision,
+            "confidence": rules["confidence"].get(decision),
+            "reasons": reasons,
+            "requiredActions": actions,
+            "source": "rules",
+        })
+
+    borderline = [b for b, r in enumerate(results) if r["decision"] == "REVIEW"]
+    if gateway is not None and borderline:
+        rows = _rows_by_batch(index)
+        answers = gateway.run_many("batch_compliance", [_batch_payload(index, b, rows[b]) for b in borderline])
+        for b, answer in zip(borderline, answers):
+            result = results[b]
+            rule_reasons = result["reasons"]
+            result.update(_from_agent(answer), source="agent")
+            result["reasons"] = rule_reasons + result["reasons"]
+    elif borderline:
+        fallback = rules.get("review_fallback", REVIEW_FALLBACK)
+        decision = fallback["decision"]
+        for b in borderline:
+            result = results[b]
+            result.update(
+                shipmentFlagged=decision in FLAGGED,
+                decision=decision,
+                confidence=rules["confidence"].get(decision),
+                source="rules-review",
+            )
+            if fallback.get("reason"):
+                result["reasons"].append(fallback["reason"])
+    return results
+
+
+def decide_shipment(batch_results, rules=None):
+    """Roll batch results up to one ``Code in JavaScript4``-shaped decision."""
+    rules = rules or load_rules()
+    if not batch_results:
+        return {"shipmentFlagged": False, "decision": "PROCEED", "confidence": rules["confidence"]["PROCEED"],
+                "reasons": [], "requiredActions": []}
+    worst = max(batch_results, key=lambda r: LEVELS.index(r["decision"]))["decision"]
+    reasons, actions = [], []
+    for r in batch_results:
+        reasons.extend(f"{r['batchId']}: {reason}" for reason in r["reasons"])
+        actions.extend(a for a in r["requiredActions"] if a not in actions)
+    deciding = [r["confidence"] for r in batch_results if r["decision"] == worst and r["confidence"] is not None]
+    return {
+        "shipmentFlagged": worst in FLAGGED,
+        "decision": worst,
+        "confidence": min(deciding) if deciding else None,
+        "reasons": reasons,
+        "requiredActions": actions,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score manifest batches with the compliance rules.")
+    parser.add_argument("manifest")
+    parser.add_argument("--rules", default=RULES_PATH)
+    parser.add_argument("--agent-cache", help="Send borderline batches to the agent, caching answers in this SQLite file")
+    args = parser.parse_args()
+
+    gateway = None
+    if args.agent_cache:
+        from agent_gateway import AgentCache, AgentGateway
+        gateway = AgentGateway(cache=AgentCache(args.agent_cache))
+
+    rules = load_rules(args.rules)
+    manifest = load_manifest(args.manifest)
+    started = time.perf_counter()
+    results = assess_manifest(manifest, rules, gateway)
+    elapsed = time.perf_counter() - started
+    counts = {decision: sum(r["decision"] == decision for r in results) for decision in DECISIONS}
+    borderline = sum(r["source"] != "rules" for r in results)
+    print(json.dumps(results, indent=2))
+    print(
+        f"{len(results)} batches in {elapsed:.3f}s: " + ", ".join(f"{k} {v}" for k, v in counts.items())
+        + f" ({borderline} borderline)"
+    )
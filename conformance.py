@@ -0,0 +1,280 @@
+"""Token-replay conformance of garment DPP lifecycles against a process net.
+
+Every garment DPP carries a dated lifecycle (harvest, processing, component
+assembly, product assembly, completion, warehousing), and every batch has
+its own ``timestamp``. Ordering those dates gives one trace per garment.
+Each trace is replayed against a Petri net from ``petri_sim`` (by default
+``dpp_lifecycle``) with token-based replay: missing tokens are added when a
+transition is not enabled, and leftover tokens are counted at the end.
+``NET_TRANSITIONS`` maps each activity to its transition per replayable
+net. The notebook's shipping nets only model the batch onwards, so the
+earlier DPP events have no transition there; such an event counts as one
+missing and one consumed token, which makes the trace deviate. Fitness is
+computed as in pm4py:
+
+    fitness = 0.5 * (1 - missing / consumed) + 0.5 * (1 - remaining / produced)
+
+Garment traces are encoded as small integers, so identical traces collapse
+into variants and each variant is replayed once per process. Shipments are
+streamed from the manifest and spread over a process pool (in-process on one
+core), so manifests with millions of garments keep bounded memory.
+
+    python conformance.py syntheticdata.json --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
+
+import numpy as np
+
+from garment_pipeline import GarmentIndex
+from petri_sim import NETS
+
+# (activity, DPP section, date field); "batch" uses the batch timestamp
+ACTIVITIES = [
+    ("harvest", "rawMaterialsAndProcess", "harvestDate"),
+    ("process", "rawMaterialsConversion", "processDate"),
+    ("component_assembly", "component", "assemblyDate"),
+    ("product_assembly", "productAssembly", "assemblyDate"),
+    ("completion", "finishedProduct", "completionDate"),
+    ("warehouse", "distribution", "warehouseDate"),
+    ("batch", None, "timestamp"),
+]
+# Net -> {activity: transition}; activities left out have no transition in that net
+NET_TRANSITIONS = {
+    "dpp_lifecycle": {
+        "harvest": "t_harvest",
+        "process": "t_process",
+        "component_assembly": "t_component_assembly",
+        "product_assembly": "t_product_assembly",
+        "completion": "t_completion",
+        "warehouse": "t_warehouse",
+        "batch": "t_create_batch",
+    },
+    "batch_shipping": {"batch": "t_create_batch"},
+    "batch_shipping_nonlinear": {"batch": "t_create_batch"},
+    "arc_weight_example": {"batch": "t_create_batch"},
+}
+NET = "dpp_lifecycle"
+
+SHIPMENTS_PER_TASK = 64
+MAX_REPORTED_DEVIATIONS = 200
+
+# Trace codes: one 4-bit slot per event, activity id + 1 (0 ends the trace)
+_SLOT_BITS = 4
+_MISSING = np.iinfo(np.int64).max
+
+
+def _available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _parse_dates(values):
+    try:
+        return np.array(values, dtype="datetime64[us]").astype(np.int64)
+    except ValueError:
+        # One malformed date should not drop the column: parse individually
+        out = np.empty(len(values), dtype=np.int64)
+        for i, v in enumerate(values):
+            try:
+                out[i] = np.datetime64(v, "us").astype(np.int64)
+            except (ValueError, TypeError):
+                out[i] = np.datetime64("NaT").astype(np.int64)
+        return out
+
+
+def encode_traces(times):
+    """Trace codes for a ``(garments x activities)`` int64 matrix (NaT = missing event)."""
+    nat = np.datetime64("NaT").astype(np.int64)
+    times = np.where(times == nat, _MISSING, times)
+    order = np.argsort(times, axis=1, kind="stable")
+    present = np.take_along_axis(times, order, axis=1) != _MISSING
+    digits = np.where(present, order + 1, 0).astype(np.int64)
+    return digits @ (np.int64(1) << (_SLOT_BITS * np.arange(times.shape[1], dtype=np.int64)))
+
+
+def decode_trace(code):
+    """Activity names of a trace code."""
+    out = []
+    while code:
+        out.append(ACTIVITIES[(code & 0xF) - 1][0])
+        code >>= _SLOT_BITS
+    return out
+
+
+@lru_cache(maxsize=None)
+def _net(name):
+    """``(net, initial, final, transition index per activity or None)``."""
+    if name not in NET_TRANSITIONS:
+        raise ValueError(f"Net {name!r} has no activity mapping; replayable nets: {', '.join(sorted(NET_TRANSITIONS))}")
+    net, initial, final = NETS[name]()
+    t_index = {t: i for i, t in enumerate(net.transitions)}
+    mapping = NET_TRANSITIONS[name]
+    return net, initial, final, [t_index.get(mapping.get(activity)) for activity, _, _ in ACTIVITIES]
+
+
+@lru_cache(maxsize=65536)
+def replay(code, net_name=NET):
+    """``(missing, consumed, remaining, produced)`` token counts for one trace code."""
+    net, initial, final, transitions = _net(net_name)
+    m = net.marking(initial)
+    missing, consumed, produced = 0, 0, int(m.sum())
+    while code:
+        t = transitions[(code & 0xF) - 1]
+        code >>= _SLOT_BITS
+        if t is None:
+            # No transition for this event: one token it would have needed is missing
+            missing += 1
+            consumed += 1
+            continue
+        short = np.maximum(net.pre[t] - m, 0)
+        missing += int(short.sum())
+        m = m + short - net.pre[t] + net.post[t]
+        consumed += int(net.pre[t].sum())
+        produced += int(net.post[t].sum())
+    f = net.marking(final)
+    short = np.maximum(f - m, 0)
+    missing += int(short.sum())
+    m = m + short - f
+    consumed += int(f.sum())
+    return missing, consumed, int(m.sum()), produced
+
+
+def fitness(counts):
+    missing, consumed, remaining, produced = counts
+    return 0.5 * (1 - missing / consumed if consumed else 1) + 0.5 * (1 - remaining / produced if produced else 1)
+
+
+def _trace_chunk(args):
+    """Variant counts and deviating garments for a list of shipments (runs in a worker)."""
+    shipments, net_name, limit = args
+    index = GarmentIndex.build({"shipments": shipments})
+    if not len(index):
+        return Counter(), [], 0
+    columns = [[] for _ in ACTIVITIES]
+    for v in index.views():
+        dpp, batch = v.dpp, v.batch
+        for a, (_, section, field) in enumerate(ACTIVITIES):
+            obj = batch if section is None else dpp.get(section)
+            columns[a].append(obj.get(field) if isinstance(obj, dict) else None)
+    times = np.stack([_parse_dates(c) for c in columns], axis=1)
+    codes = encode_traces(times)
+
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.concatenate([[True], sorted_codes[1:] != sorted_codes[:-1]]))
+    variants = Counter(dict(zip(
+        (int(c) for c in sorted_codes[starts]),
+        (int(n) for n in np.diff(np.append(starts, len(codes)))),
+    )))
+
+    deviating_codes = [c for c in variants if fitness(replay(c, net_name)) < 1]
+    n_deviating = sum(variants[c] for c in deviating_codes)
+    reported = []
+    if deviating_codes and limit:
+        for row in np.flatnonzero(np.isin(codes, deviating_codes))[:limit]:
+            v = index[row]
+            reported.append({
+                "shipmentId": v.context.get("shipmentId"),
+                "batchId": v.batch.get("batchId"),
+                "garmentId": v.garment.get("id"),
+                "trace": decode_trace(int(codes[row])),
+                "fitness": round(fitness(replay(int(codes[row]), net_name)), 4),
+            })
+    return variants, reported, n_deviating
+
+
+def _chunks(shipments, chunk, net_name, limit):
+    it = iter(shipments)
+    while True:
+        part = list(islice(it, chunk))
+        if not part:
+            return
+        yield part, net_name, limit
+
+
+def check_shipments(shipments, net_name=NET, workers=None, chunk=SHIPMENTS_PER_TASK, limit=MAX_REPORTED_DEVIATIONS):
+    """Conformance report for an iterable of shipments (e.g. ``manifest_stream.iter_shipments``)."""
+    _net(net_name)  # fail on an unknown net before reading any shipments
+    workers = workers or _available_cpus()
+    variants = Counter()
+    deviations = []
+    n_deviating = 0
+
+    def merge(result):
+        nonlocal n_deviating
+        v, reported, n = result
+        variants.update(v)
+        deviations.extend(reported[:max(0, limit - len(deviations))])
+        n_deviating += n
+
+    tasks = _chunks(shipments, chunk, net_name, limit)
+    if workers <= 1:
+        # A pool on one core only adds pickling cost
+        for task in tasks:
+            merge(_trace_chunk(task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.submit(_trace_chunk, task))
+                if len(pending) >= 2 * workers:
+                    merge(pending.popleft().result())
+            while pending:
+                merge(pending.popleft().result())
+    return report(variants, deviations, n_deviating, net_name)
+
+
+def report(variants, deviations, n_deviating, net_name=NET):
+    totals = np.zeros(4, dtype=np.int64)
+    trace_fitness = 0.0
+    rows = []
+    for code, n in variants.most_common():
+        counts = replay(code, net_name)
+        totals += np.array(counts) * n
+        f = fitness(counts)
+        trace_fitness += f * n
+        rows.append({"trace": decode_trace(code), "garments": n, "fitness": round(f, 4)})
+    garments = sum(variants.values())
+    return {
+        "net": net_name,
+        "garments": garments,
+        "variants": len(variants),
+        "log_fitness": round(fitness(tuple(int(x) for x in totals)), 4) if garments else None,
+        "average_trace_fitness": round(trace_fitness / garments, 4) if garments else None,
+        "fitting_garments": garments - n_deviating,
+        "deviating_garments": n_deviating,
+        "top_variants": rows[:20],
+        "deviations": deviations,
+    }
+
+
+def check_manifest_file(path, net_name=NET, workers=None):
+    from manifest_stream import iter_shipments
+
+    with open(path, "rb") as f:
+        return check_shipments(iter_shipments(f), net_name, workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay garment DPP lifecycles against a process net.")
+    parser.add_argument("manifest")
+    parser.add_argument("--net", default=NET, choices=sorted(NET_TRANSITIONS))
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    result = check_manifest_file(args.manifest, args.net, args.workers)
+    print(json.dumps(result, indent=2))
+    print(
+        f"{result['garments']} garments, {result['variants']} variants in {time.perf_counter() - started:.2f}s",
+        file=sys.stderr,
+    )
@@ -1,17 +1,29 @@
-import streamlit as st
-import pandas as pd
-import requests
-import json
-import plotly.express as px
 import time
+
+# Started before the imports, so a page's first run in a process includes them
+_RUN_STARTED = time.perf_counter()
+
+import streamlit as st
 import os
 import base64
-from streamlit_extras.stylable_container import stylable_container
-from PIL import Image # <--- ADD THIS IMPORT
+from edit_tracking import EditTracker
+from rerun_timer import ENABLED as TIMINGS_ENABLED, TIMINGS
+
+# Heavy modules (pandas, plotly, PIL, the data layer, the webhook client) are
+# imported by the pages that use them, so Home renders without loading them
 
 # --- CONFIGURATION ---
-N8N_WEBHOOK_URL = "https://lisaselma.app.n8n.cloud/webhook-test/98f01249-5cf6-4626-b4aa-755fdba9fb98"
-GOOGLE_SHEET_CSV_URL = "https://docs.google.com/spreadsheets/d/1zXKdsqy5nrp48mZJR23q_vmQj4gGVM01fgmIZZTMpWw/gviz/tq?tqx=out:csv&sheet=Sheet1"
+# N8N_WEBHOOK_URL may point at a local stub (python webhook_client.py stub)
+N8N_WEBHOOK_URL = os.environ.get(
+    "N8N_WEBHOOK_URL", "https://lisaselma.app.n8n.cloud/webhook-test/98f01249-5cf6-4626-b4aa-755fdba9fb98"
+)
+# SHEET_CSV_URL may point at a local CSV (path or file://) to run against a copy of the sheet
+GOOGLE_SHEET_CSV_URL = os.environ.get(
+    "SHEET_CSV_URL",
+    "https://docs.google.com/spreadsheets/d/1zXKdsqy5nrp48mZJR23q_vmQj4gGVM01fgmIZZTMpWw/gviz/tq?tqx=out:csv&sheet=Sheet1",
+)
+# While a submission runs, the Upload page reruns this often to show its progress
+SUBMIT_POLL_SECONDS = 0.5
 
 # --- BRANDING COLORS (Updated to match design) ---
 COLOR_BG_MAIN = "#FFFFFD"
@@ -32,19 +44,22 @@ color_map = {
 }
 
 # --- LOAD ICON (Robust Method) ---
-# Get the absolute path to the image to ensure Streamlit finds it
-script_dir = os.path.dirname(os.path.abspath(__file__))
-icon_path = os.path.join(script_dir, "logo.png")
+# Loaded once per process; PIL is only imported when the icon file exists
+@st.cache_resource
+def get_app_icon():
+    # Get the absolute path to the image to ensure Streamlit finds it
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    icon_path = os.path.join(script_dir, "logo.png")
 
-# Load the image using PIL if it exists, otherwise use emoji fallback
-if os.path.exists(icon_path):
-    app_icon = Image.open(icon_path)
-else:
-    app_icon = "🧶"
+    # Load the image using PIL if it exists, otherwise use emoji fallback
+    if os.path.exists(icon_path):
+        from PIL import Image
+        return Image.open(icon_path)
+    return "🧶"
 
 # --- PAGE SETUP ---
 # Pass the actual image object, not the filename string
-st.set_page_config(page_title="FiberTrace", layout="wide", page_icon=app_icon)
+st.set_page_config(page_title="FiberTrace", layout="wide", page_icon=get_app_icon())
 
 # --- SESSION STATE FOR TAB NAVIGATION ---
 if 'active_tab' not in st.session_state:
@@ -58,7 +73,13 @@ if "selected_shipment_id" not in st.session_state:
 if "open_last_shipment" not in st.session_state:
     st.session_state.open_last_shipment = False
 
+# Applies STATUS edits from the data editors cell by cell
+if "edit_tracker" not in st.session_state:
+    st.session_state.edit_tracker = EditTracker()
+
 # --- HELPER: ROBUST LOGO LOADER ---
+# Read and encoded once per process instead of on every rerun
+@st.cache_resource
 def get_base64_image(filename):
     # 1. Get the absolute path of the folder containing this script (dashboard.py)
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -76,11 +97,141 @@ def get_base64_image(filename):
         print(f"LOGO ERROR: Could not find file at: {file_path}")
         return None
 
+# --- HELPER: SHARED DECISION SHEET ---
+# One process-wide source: reruns and sessions reuse the parsed sheet until its TTL
+# expires, then it is revalidated (ETag / Last-Modified) instead of re-downloaded
+@st.cache_resource
+def get_sheet_source():
+    from sheet_source import SheetSource
+    return SheetSource(GOOGLE_SHEET_CSV_URL)
+
+# DECISION_STORE selects the backend: "sheet" (default) or "sqlite:///path/to/decisions.db"
+@st.cache_resource
+def get_decision_store():
+    from decision_store import open_decision_store
+    return open_decision_store(os.environ.get("DECISION_STORE"), sheet_source=get_sheet_source())
+
+# Search index over the Shipments table, built once per data version and shared by sessions
+@st.cache_resource(max_entries=4)
+def get_search_index(version, _df):
+    from search_index import SearchIndex
+    return SearchIndex.build(_df)
+
+# Sorted row order per data version and column, for the windowed Shipments table
+@st.cache_resource(max_entries=8)
+def get_sort_order(version, column, _df):
+    from table_window import SortOrder
+    return SortOrder(_df[column])
+
+# Decision / risk counts per data version, advanced incrementally when rows are appended
+@st.cache_resource
+def get_aggregate_registry():
+    from aggregates import AggregateRegistry
+    return AggregateRegistry()
+
+# Typed decision rows (parsed timestamps, routes, reasons, recommendations) per data version
+@st.cache_resource
+def get_decision_rows_registry():
+    from decision_rows import DecisionRowsRegistry
+    return DecisionRowsRegistry()
+
+
+# One read-only decision table per data version, shared by all sessions
+@st.cache_resource
+def get_shared_table_registry():
+    from shared_table import SharedTableRegistry
+    return SharedTableRegistry()
+
+
+def get_session_table(store):
+    """The shared table plus this session's STATUS overlay (the only per-session copy of edits)."""
+    from shared_table import SessionTable, StatusOverlay
+    table = get_shared_table_registry().get(store)
+    if "status_overlay" not in st.session_state:
+        st.session_state.status_overlay = StatusOverlay()
+    return SessionTable(table, st.session_state.status_overlay)
+
+# Chart figures keyed on the counts, so an unchanged log reuses the same figure
+@st.cache_resource(max_entries=16)
+def decision_pie_figure(counts):
+    import pandas as pd
+    import plotly.express as px
+    pie_color_map = {
+        "PROCEED": color_map.get("FLAGGED AS PROCEED", color_map["Unknown"]),
+        "DELAY": color_map.get("FLAGGED AS DELAY", color_map["Unknown"]),
+        "BLOCK": color_map.get("FLAGGED AS BLOCK", color_map["Unknown"]),
+        "Unknown": color_map["Unknown"],
+    }
+    fig_pie = px.pie(
+        pd.DataFrame(list(counts), columns=["bucket", "count"]),
+        names="bucket",
+        values="count",
+        title="Shipment Decisions",
+        color="bucket",
+        color_discrete_map=pie_color_map,
+    )
+    fig_pie.update_layout(height=320, margin=dict(l=10, r=10, t=60, b=10))
+    return fig_pie
+
+@st.cache_resource(max_entries=16)
+def risk_bar_figure(counts):
+    import pandas as pd
+    import plotly.express as px
+    risk_color_map = {
+        "Low": "#CF8CA9",
+        "Moderate": "#69002E",
+        "High": "#351C27",
+    }
+    fig_bar = px.bar(
+        pd.DataFrame(list(counts), columns=["risk", "count"]),
+        x="risk",
+        y="count",
+        title="Risk Distribution",
+        color="risk",
+        color_discrete_map=risk_color_map,
+    )
+    fig_bar.update_layout(height=320, margin=dict(l=10, r=10, t=60, b=10))
+    return fig_bar
+
+# --- HELPER: PIPELINE TRACES ---
+# TRACE_SINK selects where spans go: "off" (default), "jsonl:///path" or "sqlite:///path"
+# Latency tables per sink version; the sink is append-only, so a new span means a new version
+@st.cache_resource(max_entries=4)
+def get_latency_tables(version, limit):
+    from tracing import get_tracer, latency_by_shipment, latency_by_stage
+    records = get_tracer().sink.read(limit)
+    return len(records), latency_by_stage(records), latency_by_shipment(records)
+
+@st.cache_resource(max_entries=4)
+def latency_stage_figure(version, limit):
+    import pandas as pd
+    import plotly.express as px
+    _, stage_rows, _ = get_latency_tables(version, limit)
+    df = pd.DataFrame(stage_rows).melt(
+        id_vars="stage", value_vars=["p50_ms", "p95_ms", "p99_ms"], var_name="percentile", value_name="ms"
+    )
+    df["percentile"] = df["percentile"].str.replace("_ms", "")
+    fig = px.bar(
+        df,
+        x="stage",
+        y="ms",
+        color="percentile",
+        barmode="group",
+        log_y=True,
+        title="Latency per Stage (ms, log scale)",
+        color_discrete_map={"p50": "#CF8CA9", "p95": "#69002E", "p99": "#351C27"},
+    )
+    fig.update_layout(height=360, margin=dict(l=10, r=10, t=60, b=10))
+    return fig
+
 # Load the logo
 logo_b64 = get_base64_image("logotype.png")
 
 # --- CUSTOM CSS ---
-st.markdown(f"""
+# Built once per process; every rerun only re-sends the cached string
+@st.cache_resource
+def get_app_css():
+    return f"""
 <style>
     @import url('https://fonts.googleapis.com/icon?family=Material+Icons');
     @import url('https://fonts.googleapis.com/css2?family=Gabarito:wght@400..900&family=Montserrat:ital,wght@0,100..900;1,100..900&display=swap');
@@ -295,7 +446,9 @@ st.markdown(f"""
     }}
     
 </style>
-""", unsafe_allow_html=True)
+"""
+
+st.markdown(get_app_css(), unsafe_allow_html=True)
 
 # --- SIDEBAR NAVIGATION ---
 with st.sidebar:
@@ -326,12 +479,17 @@ with st.sidebar:
     if st.button("SHIPMENTS", use_container_width=True, key="nav_shipments"):
         st.session_state.active_tab = "Shipments"
         st.rerun()
+    if st.button("LATENCY", use_container_width=True, key="nav_latency"):
+        st.session_state.active_tab = "Latency"
+        st.rerun()
     
 
 # ==========================================
 # PAGE 1: HOME
 # ==========================================
 if st.session_state.active_tab == "Home":
+    from streamlit_extras.stylable_container import stylable_container
+
     st.markdown(f"""
     <div class="main-content-wrapper" style="margin-bottom: 60px;">
         <div class="hero-headline">FiberTrace.</div>
@@ -389,33 +547,75 @@ if st.session_state.active_tab == "Home":
 # PAGE 2: UPLOAD & EXECUTE
 # ==========================================
 elif st.session_state.active_tab == "Upload & Execute":
+    import io
+    from streamlit_extras.stylable_container import stylable_container
+    from manifest_stream import PREVIEW_ITEMS, scan_manifest
+    from webhook_client import SubmissionJob, count_chunks, iter_chunks
+    from tracing import get_tracer
+
+    tracer = get_tracer()
+
     st.subheader("Shipment Processing")
     st.markdown("Upload your shipment manifest JSON below.")
 
     col1, col2 = st.columns([1, 1], gap="large")
-    
+
+    with col2:
+        st.markdown("##### Data Preview")
+        preview_slot = st.empty()
+
     with col1:
         with st.container():
             uploaded_file = st.file_uploader("Drop Shipment JSON Data Here", type=['json'])
         
         if uploaded_file is not None:
-            batch_data = json.load(uploaded_file)
+            # Stream the manifest once per upload: counts + bounded preview, never the full tree.
+            # file_id is unique per upload, unlike (name, size)
+            file_key = uploaded_file.file_id
+            manifest = st.session_state.get("manifest_summary")
+            if manifest is None or st.session_state.get("manifest_file_key") != file_key:
+                progress_bar = st.progress(0.0, text="Reading manifest…")
+
+                def _on_manifest_progress(summary):
+                    c = summary.counts
+                    frac = summary.bytes_read / uploaded_file.size if uploaded_file.size else 1.0
+                    progress_bar.progress(
+                        min(1.0, frac),
+                        text=f"Reading manifest… {c['shipments']} shipments, {c['batches']} batches, "
+                             f"{c['orders']} orders, {c['garments']} garments",
+                    )
+                    if summary.preview_complete and not summary.done:
+                        with preview_slot.container():
+                            with st.expander("View Raw Content", expanded=True):
+                                st.json(summary.preview)
+
+                uploaded_file.seek(0)
+                # The parse span starts the upload's trace; the submission below continues it
+                with tracer.span("manifest.parse", stage="json_parse", attributes={"manifest.bytes": uploaded_file.size}) as parse_span:
+                    try:
+                        manifest = scan_manifest(uploaded_file, on_progress=_on_manifest_progress)
+                    except Exception as e:
+                        manifest = None
+                        parse_span.record_error(e)
+                        st.error(f"Unsupported JSON format: {e}")
+                progress_bar.empty()
+                st.session_state.manifest_summary = manifest
+                st.session_state.manifest_file_key = file_key
+                st.session_state.manifest_trace = parse_span.context
+
             is_valid = False
-            
-            if isinstance(batch_data, list):
-                count = len(batch_data)
-                st.success(f"Loaded {count} Batches")
-                is_valid = True
-            elif isinstance(batch_data, dict):
-                try:
-                    batch_id = batch_data['shipments'][0]['batches'][0]['shipmentId']
-                except (KeyError, IndexError, TypeError):
-                    batch_id = batch_data.get('shipmentId', 'Unknown')
 
-                st.success(f"Loaded Shipment: {batch_id}")
+            if manifest is not None:
+                counts = manifest.counts
+                if manifest.root_type == "list":
+                    st.success(f"Loaded {manifest.top_level_items} Batches")
+                else:
+                    st.success(f"Loaded Shipment: {manifest.first_shipment_id or 'Unknown'}")
+                st.caption(
+                    f"{counts['shipments']} shipments · {counts['batches']} batches · "
+                    f"{counts['orders']} orders · {counts['garments']} garments"
+                )
                 is_valid = True
-            else:
-                st.error("Unsupported JSON format")
 
             if is_valid:
                 st.markdown("<br>", unsafe_allow_html=True)
@@ -445,60 +645,62 @@ elif st.session_state.active_tab == "Upload & Execute":
                         }}
                     """
                 ):
-                    # if st.button("RUN COMPLIANCE CHECK", use_container_width=True):
-                    #     # --- NEW: PROGRESS STATUS ---
-                    #     status_container = st.status("Initializing Multi-Agent System...", expanded=True)
-                    #     try:
-                    #         status_container.write("🔍 Analyzing DPP Metadata...")
-                    #         time.sleep(1) # Simulate slight delay for UX
-                            
-                    #         status_container.write("🌍 Checking Route Constraints...")
-                    #         # Send to n8n
-                    #         response = requests.post(N8N_WEBHOOK_URL, json=batch_data)
-                            
-                    #         status_container.write("🤖 Generating Final Decision...")
-                            
-                    #         if response.status_code == 200:
-                    #             status_container.update(label="✅ Compliance Check Complete!", state="complete", expanded=False)
-                    #             st.balloons()
-                    #             time.sleep(1)
-                                
-                    #             # --- AUTO-SWITCH TAB ---
-                    #             st.session_state.active_tab = "Analytics"
-                    #             st.rerun()
-                                
-                    #         else:
-                    #             status_container.update(label="Error Occurred", state="error")
-                    #             st.error(f"Error {response.status_code}: {response.text}")
-                                
-                    #     except requests.exceptions.ConnectionError:
-                    #         status_container.update(label="Connection Failed", state="error")
-                    #         st.error("Connection Failed.")
                     if st.button("RUN COMPLIANCE CHECK", use_container_width=True):
-                        status_container = st.status("Initializing Multi-Agent System...", expanded=True)
-                        time.sleep(1.5)
-                        status_container.write("Analyzing DPP Metadata...")
-                        time.sleep(1.5) # Simulate slight delay for UX
-                        status_container.write("Checking Route Constraints...")
-                        time.sleep(1.5) # Simulate slight delay for UX
-                        status_container.write("Generating Final Decision...")
-                        time.sleep(1.5)
-                        st.session_state.open_last_shipment = True
-                        st.session_state.selected_shipment_id = None
-                        st.session_state.active_tab = "Shipment Overview"
-                        st.rerun()
-                        
-
-    with col2:
-        st.markdown("##### Data Preview")
-        if uploaded_file:
+                        total = count_chunks(manifest.top_level_items, manifest.root_type)
+                        if not total:
+                            st.error("Nothing to submit: the manifest has no shipments or batches.")
+                        else:
+                            # Chunks are posted concurrently off the script thread; reruns below only poll
+                            st.session_state.submission = {
+                                "total": total,
+                                "job": SubmissionJob(
+                                    N8N_WEBHOOK_URL,
+                                    iter_chunks(io.BytesIO(uploaded_file.getvalue()), manifest.root_type),
+                                    span_name="manifest.submit",
+                                    span_attributes={"chunks": total},
+                                    tracer=tracer,
+                                    parent=st.session_state.get("manifest_trace"),
+                                ).start(),
+                            }
+
+                    submission = st.session_state.get("submission")
+                    if submission is not None:
+                        job, total = submission["job"], submission["total"]
+                        status_container = st.status(f"Submitting {total} chunks to the Multi-Agent System...", expanded=True)
+                        job.poll()
+                        done = len(job.results)
+                        status_container.progress(min(1.0, done / max(total, 1)), text=f"{done}/{total} chunks")
+                        for result in job.failed:
+                            status_container.write(f"Chunk {result.index + 1} failed after {result.attempts} attempts: {result.error or result.status}")
+
+                        if not job.done:
+                            time.sleep(SUBMIT_POLL_SECONDS)
+                            st.rerun()
+                        del st.session_state.submission
+                        if job.error is not None:
+                            status_container.update(label="Connection Failed", state="error")
+                            st.error(f"Submission Error: {job.error}")
+                        elif job.failed:
+                            status_container.update(label="Error Occurred", state="error")
+                            st.error(f"{len(job.failed)} of {len(job.results)} chunks were not accepted.")
+                        elif not job.results:
+                            status_container.update(label="Nothing Submitted", state="error")
+                            st.error("No chunks were sent: the manifest has no shipments or batches.")
+                        else:
+                            status_container.update(label="Compliance Check Submitted!", state="complete", expanded=False)
+                            st.session_state.open_last_shipment = True
+                            st.session_state.selected_shipment_id = None
+                            st.session_state.active_tab = "Shipment Overview"
+                            st.rerun()
+
+    with preview_slot.container():
+        manifest = st.session_state.get("manifest_summary") if uploaded_file else None
+        if manifest is not None:
             with st.expander("View Raw Content", expanded=True):
-                if isinstance(batch_data, list) and len(batch_data) > 3:
-                    st.warning(f"Showing first 3 of {len(batch_data)} items")
-                    st.json(batch_data[:3])
-                else:
-                    st.json(batch_data)
-        else:
+                if manifest.top_level_items > PREVIEW_ITEMS:
+                    st.warning(f"Showing first {PREVIEW_ITEMS} of {manifest.top_level_items} items")
+                st.json(manifest.preview)
+        elif not uploaded_file:
             st.markdown(
                 f"""
                 <div style="
@@ -520,100 +722,89 @@ elif st.session_state.active_tab == "Upload & Execute":
 # ==========================================
 
 elif st.session_state.active_tab == "Shipments":
-
-    def _norm_cols(df_):
-        df_ = df_.copy()
-        df_.columns = [str(c).strip() for c in df_.columns]
-        rename_map = {
-            "ShipmentID": "shipmentId",
-            "shipmentID": "shipmentId",
-            "ShipmentId": "shipmentId",
-            "TimeStamp": "timestamp",
-            "Timestamp": "timestamp",
-            "Decision": "decision",
-            "Risk": "risk",
-            "Reason": "reason",
-            "Recommendations": "recommendations",
-            "route": "route",
-            "Route": "route",
-            "route_edges": "route_edges",
-            "routeEdges": "route_edges",
-        }
-        df_ = df_.rename(columns={k: v for k, v in rename_map.items() if k in df_.columns})
-        df_.fillna("", inplace=True)
-        return df_
-
-    def _decision_bucket(x):
-        s = str(x or "").upper()
-        if "BLOCK" in s:
-            return "BLOCK"
-        if "DELAY" in s:
-            return "DELAY"
-        if "PROCEED" in s:
-            return "PROCEED"
-        return "Unknown"
+    from table_window import (
+        PAGE_SIZES,
+        PICKER_ALL_IDS,
+        PICKER_MATCHES,
+        SORTABLE_COLUMNS,
+        TABLE_WINDOW_ROWS,
+        ordered_rows,
+        page_rows,
+    )
 
     try:
-        cache_buster_url = f"{GOOGLE_SHEET_CSV_URL}&t={int(time.time())}"
-        df_raw = pd.read_csv(cache_buster_url)
-        df = _norm_cols(df_raw)
-
-        if "shipments_df" not in st.session_state:
-            df_raw = pd.read_csv(cache_buster_url)
-            st.session_state.shipments_df = _norm_cols(df_raw)
+        store = get_decision_store()
 
 
         EXTRA_COL = "STATUS"
 
-        if "shipments_df" not in st.session_state:
-            st.session_state.shipments_df = df.copy()
-
-        df = st.session_state.shipments_df
-
-        if EXTRA_COL not in df.columns:
-            df[EXTRA_COL] = ""
-            st.session_state.shipments_df = df
+        # Shared read-only rows (with a STATUS column); this session only keeps its edits
+        shipments = get_session_table(store)
 
         st.subheader("All Shipments")
 
-        df = st.session_state.shipments_df
+        df = shipments.frame
 
         if df.empty:
             st.info("No rows found.")
         else:
             # Requested columns for overview table (+ STATUS)
             overview_cols = [c for c in ["shipmentId", "timestamp", "decision", "risk", EXTRA_COL] if c in df.columns]
-            df_overview = df[overview_cols].copy() if overview_cols else df.copy()
 
-            # Search + filter
+            # Search + filter (indexed; the index covers more columns than the table shows)
+            version = shipments.version
+            index = get_search_index(version, df)
             c1, c2 = st.columns([2, 1])
             with c1:
                 q = st.text_input(
                     "Search",
-                    placeholder="ShipmentID, decision, reason…",
+                    placeholder="ShipmentID, decision, status, reason…",
                     label_visibility="collapsed",
                 )
             with c2:
-                if "decision" in df_overview.columns:
-                    opts = ["All"] + sorted(
-                        [x for x in df_overview["decision"].astype(str).unique().tolist() if str(x).strip()]
-                    )
+                if "decision" in index.columns:
+                    opts = ["All"] + index.distinct("decision")
                     sel = st.selectbox("Filter Decision", opts, label_visibility="collapsed")
                 else:
                     sel = "All"
 
-            if q:
-                df_overview = df_overview[
-                    df_overview.astype(str)
-                    .apply(lambda x: x.str.contains(q, case=False, na=False))
-                    .any(axis=1)
-                ]
-
-            if sel != "All" and "decision" in df_overview.columns:
-                df_overview = df_overview[df_overview["decision"].astype(str) == sel]
+            rows = None
+            if q or sel != "All":
+                rows = index.select(
+                    q,
+                    equals={"decision": sel} if sel != "All" else None,
+                    # The index holds the shared STATUS; this session's edits replace it
+                    overrides={EXTRA_COL: shipments.status_by_row()} if q else None,
+                )
+            n_rows = len(df) if rows is None else len(rows)
+            # Editor positions refer to one version's rows, so a new version is a new view
+            view = (version, q, sel)
+
+            # Large logs: sort and page on the server and send only one page to the browser
+            if n_rows > TABLE_WINDOW_ROWS:
+                sortable = [c for c in SORTABLE_COLUMNS if c in df.columns]
+                w1, w2, w3, w4 = st.columns([2, 1, 1, 1])
+                with w1:
+                    sort_col = st.selectbox("Sort by", ["Log order"] + sortable, key="shipments_sort")
+                with w2:
+                    descending = st.toggle("Descending", value=False, key="shipments_desc")
+                with w3:
+                    page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key="shipments_page_size")
+                with w4:
+                    page = st.number_input("Page", min_value=1, value=1, step=1, key="shipments_page")
+
+                order = get_sort_order(version, sort_col, df) if sort_col in sortable else None
+                ordered = ordered_rows(rows, len(df), order, descending)
+                rows, page, n_pages = page_rows(ordered, page, page_size)
+                start = (page - 1) * page_size
+                st.caption(f"Rows {start + 1:,}–{start + len(rows):,} of {n_rows:,} · page {page} of {n_pages:,}")
+                view = (version, q, sel, sort_col, descending, page_size, page)
+
+            # Only the shown rows are copied, with this session's STATUS edits laid over them
+            df_overview = shipments.view(rows, overview_cols)
 
             # Editable table (notes column editable)
-            edited = st.data_editor(
+            st.data_editor(
                 df_overview,
                 use_container_width=True,
                 hide_index=True,
@@ -630,15 +821,17 @@ elif st.session_state.active_tab == "Shipments":
                 key="shipments_editor",
             )
 
-            # Write edits back to master dataframe (by shipmentId)
-            if "shipmentId" in edited.columns:
-                base = df.set_index("shipmentId")
-                edited = edited.set_index("shipmentId")
-
-                for col in edited.columns:
-                    base.loc[edited.index, col] = edited[col]
-
-                st.session_state.shipments_df = base.reset_index()
+            # Record only the editor's changed cells in this session's overlay
+            tracker = st.session_state.edit_tracker
+            if tracker.sync(
+                "shipments_editor",
+                st.session_state.get("shipments_editor"),
+                df_overview.index,
+                shipments,
+                columns=[EXTRA_COL],
+                view=view,
+            ):
+                tracker.flush(store, shipments)
 
 
         # st.subheader("All Shipments")
@@ -696,12 +889,24 @@ elif st.session_state.active_tab == "Shipments":
             
             st.markdown("<div style='height: 24px;'></div>", unsafe_allow_html=True)
 
-            # Open a shipment (best-effort "click"): dropdown selection
-            if "shipmentId" in df.columns:
-                ids = [x for x in df["shipmentId"].astype(str).tolist() if str(x).strip()]
-                if ids:
+            # Open a shipment (best-effort "click"): dropdown selection, type-ahead for large logs
+            if "shipmentId" in index.columns:
+                type_ahead = index.distinct_count("shipmentId") > PICKER_ALL_IDS
+                ids = [] if type_ahead else index.distinct("shipmentId", sort=False)
+                if type_ahead or ids:
                     st.markdown("##### Open shipment")
-                    chosen = st.selectbox("Shipment", options=list(dict.fromkeys(ids)), label_visibility="collapsed")
+                if type_ahead:
+                    find = st.text_input(
+                        "Find shipment",
+                        placeholder="Type part of a shipment ID…",
+                        label_visibility="collapsed",
+                        key="shipment_picker_query",
+                    )
+                    ids = index.suggest("shipmentId", find, limit=PICKER_MATCHES)
+                    if not ids:
+                        st.caption("No matching shipments.")
+                if ids:
+                    chosen = st.selectbox("Shipment", options=ids, label_visibility="collapsed")
                     if st.button("View shipment overview", use_container_width=False):
                         st.session_state.selected_shipment_id = chosen
                         st.session_state.open_last_shipment = False
@@ -712,58 +917,19 @@ elif st.session_state.active_tab == "Shipments":
 
 
             # --- Pie + bar overview ---
+            # Counts come from the shared aggregates, not from copies of the frame
+            aggs = get_aggregate_registry().for_frame(shipments.version, df)
             left, right = st.columns(2)
 
             # PIE: decisions overview
             with left:
                 if "decision" in df.columns:
-                    df_pie = df.copy()
-                    df_pie["bucket"] = df_pie["decision"].apply(_decision_bucket)
-                    counts = df_pie["bucket"].value_counts().reset_index()
-                    counts.columns = ["bucket", "count"]
-
-                    pie_color_map = {
-                        "PROCEED": color_map.get("FLAGGED AS PROCEED", color_map["Unknown"]),
-                        "DELAY": color_map.get("FLAGGED AS DELAY", color_map["Unknown"]),
-                        "BLOCK": color_map.get("FLAGGED AS BLOCK", color_map["Unknown"]),
-                        "Unknown": color_map["Unknown"],
-                    }
-
-                    fig_pie = px.pie(
-                        counts,
-                        names="bucket",
-                        values="count",
-                        title="Shipment Decisions",
-                        color="bucket",
-                        color_discrete_map=pie_color_map,
-                    )
-                    fig_pie.update_layout(height=320, margin=dict(l=10, r=10, t=60, b=10))
-                    st.plotly_chart(fig_pie, use_container_width=True)
+                    st.plotly_chart(decision_pie_figure(aggs.bucket_counts()), use_container_width=True)
 
             # BAR: risk distribution
             with right:
                 if "risk" in df.columns:
-                    sev = df.copy()
-                    sev["risk"] = sev["risk"].astype(str).str.strip()
-                    sev = sev[sev["risk"] != ""]
-                    sev_counts = sev["risk"].value_counts().reset_index()
-                    sev_counts.columns = ["risk", "count"]
-
-                    risk_color_map = {
-                        "Low": "#CF8CA9",
-                        "Moderate": "#69002E",
-                        "High": "#351C27",
-                    }
-                    fig_bar = px.bar(
-                        sev_counts,
-                        x="risk",
-                        y="count",
-                        title="Risk Distribution",
-                        color="risk",
-                        color_discrete_map=risk_color_map,
-                    )
-                    fig_bar.update_layout(height=320, margin=dict(l=10, r=10, t=60, b=10))
-                    st.plotly_chart(fig_bar, use_container_width=True)
+                    st.plotly_chart(risk_bar_figure(aggs.risk_counts()), use_container_width=True)
 
     except Exception as e:
         st.error(f"Data Error: {e}")
@@ -773,6 +939,7 @@ elif st.session_state.active_tab == "Shipments":
 # ==========================================
 
 elif st.session_state.active_tab == "Shipment Overview":
+    from streamlit_extras.stylable_container import stylable_container
 
     st.markdown(
     """
@@ -791,68 +958,6 @@ elif st.session_state.active_tab == "Shipment Overview":
 )
 
 
-    def _norm_cols(df_):
-        df_ = df_.copy()
-        df_.columns = [str(c).strip() for c in df_.columns]
-        rename_map = {
-            "ShipmentID": "shipmentId",
-            "shipmentID": "shipmentId",
-            "ShipmentId": "shipmentId",
-            "TimeStamp": "timestamp",
-            "Timestamp": "timestamp",
-            "Decision": "decision",
-            "Risk": "risk",
-            "Reason": "reason",
-            "Recommendations": "recommendations",
-            "route": "route",
-            "Route": "route",
-            "route_edges": "route_edges",
-            "routeEdges": "route_edges",
-        }
-        df_ = df_.rename(columns={k: v for k, v in rename_map.items() if k in df_.columns})
-        df_.fillna("", inplace=True)
-        return df_
-
-    def _parse_route(v):
-        if v is None:
-            return []
-        s = str(v).strip()
-        if not s:
-            return []
-        s = s.replace("\n", ",")
-        parts = [p.strip() for p in s.split(",") if p.strip()]
-        return parts
-
-    def _parse_bullet_list(v):
-        """Accepts a Python list, JSON list string, or free-text; returns list of bullet strings."""
-        if v is None:
-            return []
-        if isinstance(v, list):
-            return [str(x).strip() for x in v if str(x).strip()]
-        s = str(v).strip()
-        if not s:
-            return []
-        if s.startswith("[") and s.endswith("]"):
-            try:
-                parsed = json.loads(s)
-                if isinstance(parsed, list):
-                    return [str(x).strip() for x in parsed if str(x).strip()]
-            except Exception:
-                try:
-                    import ast
-                    parsed = ast.literal_eval(s)
-                    if isinstance(parsed, list):
-                        return [str(x).strip() for x in parsed if str(x).strip()]
-                except Exception:
-                    pass
-        import re
-        s2 = s.replace("\r", "\n")
-        parts = re.split(r"(?:\n|;)+", s2)
-        parts = [p.strip() for p in parts if p.strip()]
-        if len(parts) > 1:
-            return [re.sub(r"^[-•\d\)\.\s]+", "", p).strip() for p in parts if p.strip()]
-        return [s]
-
     def _render_bullets(title, items, empty_text):
         st.markdown(f"##### {title}")
         if not items:
@@ -904,34 +1009,27 @@ elif st.session_state.active_tab == "Shipment Overview":
 
 
     try:
-        cache_buster_url = f"{GOOGLE_SHEET_CSV_URL}&t={int(time.time())}"
-        df_raw = pd.read_csv(cache_buster_url)
-        df = _norm_cols(df_raw)
-        if df.empty:
+        store = get_decision_store()
+        # Routes, reasons and recommendations are parsed once per data version, not per render
+        rows = get_decision_rows_registry().get(store.version(), store.frame)
+
+        # Choose which row to show (falls back to the most recent row)
+        record = None
+        if not st.session_state.open_last_shipment and st.session_state.selected_shipment_id:
+            record = rows.latest(st.session_state.selected_shipment_id)
+        if record is None:
+            record = rows.latest()
+
+        if record is None:
             st.info("No rows found.")
         else:
-            # Choose which row to show
-            row = None
-            if st.session_state.open_last_shipment or not st.session_state.selected_shipment_id:
-                row = df.iloc[-1]
-            else:
-                sid = str(st.session_state.selected_shipment_id)
-                if "shipmentId" in df.columns:
-                    matches = df[df["shipmentId"].astype(str) == sid]
-                    if not matches.empty:
-                        row = matches.iloc[-1]
-                    else:
-                        row = df.iloc[-1]
-                else:
-                    row = df.iloc[-1]
-
             # Reset the "open last" flag once used
             st.session_state.open_last_shipment = False
 
-            shipment_id = str(row.get("shipmentId", "")).strip()
-            decision = str(row.get("decision", "")).strip()
-            risk = str(row.get("risk", "")).strip()
-            route_list = _parse_route(row.get("route", ""))
+            shipment_id = record["shipmentId"]
+            decision = record["decision"]
+            risk = record["risk"]
+            route_list = record["route"]
 
             top1, top2, top3 = st.columns(3)
             top1.metric("ShipmentID", shipment_id or "—")
@@ -948,29 +1046,26 @@ elif st.session_state.active_tab == "Shipment Overview":
             # --- Single-shipment row editor (only notes editable) ---
             EXTRA_COL = "STATUS"
 
-            # Ensure source of truth exists + has notes column
-            if "shipments_df" not in st.session_state:
-                st.session_state.shipments_df = df.copy()
-
-            master = st.session_state.shipments_df.copy()
-            if EXTRA_COL not in master.columns:
-                master[EXTRA_COL] = ""
+            # Shared read-only rows + this session's STATUS overlay
+            shipments = get_session_table(store)
+            master = shipments.frame
 
             # Match the currently displayed shipmentId
             sid = shipment_id  # from your selected row above
             if "shipmentId" not in master.columns:
-                st.error("shipments_df is missing 'shipmentId' column.")
+                st.error("The decision log is missing a 'shipmentId' column.")
             else:
-                mask = master["shipmentId"].astype(str) == str(sid)
+                index = get_search_index(shipments.version, master)
+                labels = master.index[index.rows_equal("shipmentId", sid)]
 
-                if not mask.any():
+                if not len(labels):
                     st.info("Shipment not found in editable table.")
                 else:
                     # Show only this shipment row (you can choose columns)
                     show_cols = [c for c in ["shipmentId", "timestamp", "decision", "risk", EXTRA_COL] if c in master.columns]
-                    row_df = master.loc[mask, show_cols].copy()
+                    row_df = shipments.view(labels, show_cols)
 
-                    edited_row = st.data_editor(
+                    st.data_editor(
                         row_df,
                         use_container_width=True,
                         hide_index=True,
@@ -986,10 +1081,14 @@ elif st.session_state.active_tab == "Shipment Overview":
                         key=f"shipment_row_editor_{sid}",
                     )
 
-                    # Persist edited notes back to session_state dataframe
-                    new_notes = edited_row.iloc[0][EXTRA_COL] if EXTRA_COL in edited_row.columns and len(edited_row) else ""
-                    master.loc[mask, EXTRA_COL] = new_notes
-                    st.session_state.shipments_df = master
+                    # Record only the edited cells in this session's overlay
+                    tracker = st.session_state.edit_tracker
+                    editor_key = f"shipment_row_editor_{sid}"
+                    if tracker.sync(
+                        editor_key, st.session_state.get(editor_key), row_df.index, shipments,
+                        columns=[EXTRA_COL], view=shipments.version,
+                    ):
+                        tracker.flush(store, shipments)
             st.markdown(
                 """
                 <div style="
@@ -1008,7 +1107,7 @@ elif st.session_state.active_tab == "Shipment Overview":
 
             left, right = st.columns([1, 2], gap="small")
             with left:
-                reason_items = _parse_bullet_list(row.get("reason", ""))
+                reason_items = record["reasons"]
                 
 
                 with stylable_container(
@@ -1033,7 +1132,7 @@ elif st.session_state.active_tab == "Shipment Overview":
                 else:
                     st.caption("No route available.")
             with right:
-                rec_items = _parse_bullet_list(row.get("recommendations", ""))
+                rec_items = record["recommendations"]
                 with stylable_container(
                     key="recs_card_detail",
                     css_styles="""
@@ -1052,3 +1151,65 @@ elif st.session_state.active_tab == "Shipment Overview":
 
     except Exception as e:
         st.error(f"Data Error: {e}")
+
+# ==========================================
+# PAGE 5: LATENCY
+# ==========================================
+elif st.session_state.active_tab == "Latency":
+    import pandas as pd
+    from tracing import READ_LIMIT, get_tracer
+
+    st.subheader("Pipeline Latency")
+    st.markdown("Span latency per pipeline stage and per shipment, from upload to decision.")
+
+    sink = get_tracer().sink
+    if not sink.enabled:
+        st.info("Tracing is off. Set TRACE_SINK to jsonl:///path/to/traces.jsonl or sqlite:///path/to/traces.db.")
+    else:
+        limit = st.selectbox(
+            "Most recent spans", [1000, 10000, READ_LIMIT], index=1, key="latency_limit",
+            format_func=lambda n: f"{n:,}",
+        )
+        try:
+            n_spans, stage_rows, shipment_rows = get_latency_tables(sink.version(), limit)
+        except Exception as e:
+            n_spans, stage_rows, shipment_rows = 0, [], []
+            st.error(f"Trace Error: {e}")
+        st.caption(f"{n_spans:,} spans from {sink.location}")
+
+        if not stage_rows:
+            st.info("No spans recorded yet. Submit a manifest on Upload & Execute.")
+        else:
+            slowest_p95 = max(stage_rows, key=lambda r: r["p95_ms"])
+            slowest_total = max(stage_rows, key=lambda r: r["total_ms"])
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Stages", len(stage_rows))
+            c2.metric("Slowest p95", slowest_p95["stage"], f"{slowest_p95['p95_ms']:,.0f} ms", delta_color="off")
+            c3.metric("Most total time", slowest_total["stage"], f"{slowest_total['total_ms'] / 1000:,.1f} s", delta_color="off")
+
+            st.plotly_chart(latency_stage_figure(sink.version(), limit), use_container_width=True)
+
+            st.markdown("##### Per Stage")
+            st.dataframe(pd.DataFrame(stage_rows), hide_index=True, use_container_width=True)
+
+            st.markdown("##### Per Shipment")
+            st.caption("End-to-end latency per run of a shipment (first span start to last span end), slowest p95 first.")
+            shipment_query = st.text_input("Filter by shipment ID", key="latency_shipment_query")
+            rows = shipment_rows
+            if shipment_query:
+                q = shipment_query.strip().lower()
+                rows = [r for r in rows if q in str(r["shipmentId"]).lower()]
+            if rows:
+                st.dataframe(pd.DataFrame(rows[:500]), hide_index=True, use_container_width=True)
+                if len(rows) > 500:
+                    st.caption(f"Showing 500 of {len(rows):,} shipments")
+            else:
+                st.caption("No shipment spans match.")
+
+# --- RERUN TIMINGS ---
+# DASHBOARD_TIMINGS=1 reports cold-start / warm-rerun latency per page (see rerun_timer.py)
+TIMINGS.record(st.session_state.active_tab, time.perf_counter() - _RUN_STARTED)
+if TIMINGS_ENABLED:
+    with st.sidebar:
+        with st.expander("Rerun timings", expanded=False):
+            st.markdown(TIMINGS.markdown())
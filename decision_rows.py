@@ -0,0 +1,232 @@
+"""Typed decision rows, parsed once per data version.
+
+The decision log reaches the dashboard as strings. Shipment Overview used to
+re-parse the route and the reason / recommendation cells of the shown row on
+every render (``json.loads``, then ``ast.literal_eval``, then regex
+splitting), and timestamps, decisions and risks stayed plain text.
+``DecisionRows`` parses a whole snapshot of the log once into typed columns:
+
+* ``timestamp``: datetime64 in UTC (unparseable -> NaT); ``timestamp_text``
+  keeps the cell as written;
+* ``decision`` / ``risk``: categoricals of the trimmed text, and ``bucket``:
+  the decision bucket (``aggregates.BUCKETS``) as a categorical;
+* ``route``, ``reasons``, ``recommendations``: tuples of strings.
+
+Each distinct cell value is parsed once, since a decision log repeats most of
+its values. ``DecisionRowsRegistry`` keeps snapshots per data version and
+memoises them by a content hash of the parsed columns. A new version whose
+parsed columns did not change (a STATUS edit, for one) reuses the previous
+snapshot.
+"""
+import ast
+import hashlib
+import json
+import re
+import threading
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from aggregates import BUCKETS, decision_bucket
+from decision_store import COLUMN_ALIASES
+
+# Columns the snapshot is built from (and hashed over)
+PARSED_COLUMNS = ("shipmentId", "timestamp", "decision", "risk", "reason", "recommendations", "route")
+
+# Snapshots kept per registry
+KEEP_VERSIONS = 4
+# Distinct cell values remembered by each parser
+PARSE_CACHE_SIZE = 65536
+
+_ROUTE_SPLIT = re.compile(r"\s*(?:,|\n|->|→)\s*")
+_BULLET_SPLIT = re.compile(r"(?:\n|;)+")
+_BULLET_PREFIX = re.compile(r"^[-•\d\)\.\s]+")
+
+
+def normalize_frame(df):
+    """Sheet export -> dashboard frame: trimmed headers, known aliases renamed, blanks as ""."""
+    df = df.copy()
+    df.columns = [str(c).strip() for c in df.columns]
+    df = df.rename(columns={k: v for k, v in COLUMN_ALIASES.items() if k in df.columns})
+    df.fillna("", inplace=True)
+    return df
+
+
+# --- CELL PARSERS ---
+def _list_literal(s):
+    """Items of a JSON or Python list literal, or None when ``s`` is not one."""
+    if not (s.startswith("[") and s.endswith("]")):
+        return None
+    for parse in (json.loads, ast.literal_eval):
+        try:
+            parsed = parse(s)
+        except Exception:
+            continue
+        if isinstance(parsed, list):
+            return tuple(str(x).strip() for x in parsed if str(x).strip())
+    return None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _route_text(s):
+    items = _list_literal(s)
+    if items is not None:
+        return items
+    return tuple(p for p in _ROUTE_SPLIT.split(s) if p)
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _bullets_text(s):
+    items = _list_literal(s)
+    if items is not None:
+        return items
+    parts = [p.strip() for p in _BULLET_SPLIT.split(s.replace("\r", "\n")) if p.strip()]
+    if len(parts) > 1:
+        return tuple(_BULLET_PREFIX.sub("", p).strip() for p in parts)
+    return (s,)
+
+
+def _text(v):
+    if v is None or (isinstance(v, float) and v != v):
+        return ""
+    return str(v).strip()
+
+
+def parse_route(v):
+    """Route cell (list, JSON / Python list string, or "A, B" / "A -> B" text) -> tuple of stops."""
+    if isinstance(v, (list, tuple)):
+        return tuple(str(x).strip() for x in v if str(x).strip())
+    s = _text(v)
+    return _route_text(s) if s else ()
+
+
+def parse_bullets(v):
+    """Reason / recommendation cell (list, list string, or free text) -> tuple of bullet strings."""
+    if isinstance(v, (list, tuple)):
+        return tuple(str(x).strip() for x in v if str(x).strip())
+    s = _text(v)
+    return _bullets_text(s) if s else ()
+
+
+def _map_distinct(values, parse):
+    # Parse each distinct value once, then spread the results back over the rows
+    codes, uniques = pd.factorize(values)
+    parsed = np.empty(len(uniques), dtype=object)
+    for i, u in enumerate(uniques.tolist()):
+        parsed[i] = parse(u)
+    return parsed[codes]
+
+
+def _column(df, name):
+    """Trimmed cell text of ``name`` as an object array ("" when the column is missing)."""
+    if name not in df.columns:
+        return np.full(len(df), "", dtype=object)
+    return _map_distinct(df[name], _text)
+
+
+def content_hash(df):
+    """Hash of the parsed columns (cell text only; STATUS and extra columns are ignored)."""
+    h = hashlib.blake2b(digest_size=16)
+    for name in PARSED_COLUMNS:
+        h.update(name.encode("utf-8") + b"\0")
+        if name in df.columns:
+            h.update(pd.util.hash_pandas_object(df[name].astype(str), index=False).to_numpy().tobytes())
+    h.update(str(len(df)).encode("ascii"))
+    return h.hexdigest()
+
+
+# --- SNAPSHOT ---
+class DecisionRows:
+    """Typed snapshot of the decision log; ``frame`` has one row per log row, in log order."""
+
+    def __init__(self, frame, content_hash=None):
+        self.frame = frame
+        self.content_hash = content_hash
+        # Later rows overwrite earlier ones, so this maps id -> last position
+        self._last_pos = dict(zip(frame["shipmentId"].tolist(), range(len(frame))))
+
+    @classmethod
+    def from_frame(cls, df, content_hash=None):
+        df = normalize_frame(df)
+        ids = _column(df, "shipmentId")
+        timestamps = _column(df, "timestamp")
+        decisions = _column(df, "decision")
+        risks = _column(df, "risk")
+
+        codes, uniques = pd.factorize(timestamps)
+        parsed = pd.to_datetime(pd.Index(uniques, dtype=object), utc=True, errors="coerce", format="mixed")
+        decision = pd.Categorical(decisions)
+        # Bucket each distinct decision, then reuse the decision codes
+        bucket_codes = np.array([BUCKETS.index(decision_bucket(c)) for c in decision.categories], dtype=np.int8)
+        bucket = pd.Categorical.from_codes(bucket_codes[decision.codes], categories=BUCKETS)
+        frame = pd.DataFrame({
+            "shipmentId": ids,
+            "timestamp": parsed.take(codes),
+            "timestamp_text": timestamps,
+            "decision": decision,
+            "bucket": bucket,
+            "risk": pd.Categorical(risks),
+            "route": _map_distinct(_column(df, "route"), parse_route),
+            "reasons": _map_distinct(_column(df, "reason"), parse_bullets),
+            "recommendations": _map_distinct(_column(df, "recommendations"), parse_bullets),
+        })
+        return cls(frame, content_hash)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def record(self, pos):
+        """Row ``pos`` as a dict of typed values (lists for the parsed cells)."""
+        r = self.frame.iloc[pos]
+        ts = r["timestamp"]
+        return {
+            "shipmentId": r["shipmentId"],
+            "timestamp": None if pd.isna(ts) else ts,
+            "timestamp_text": r["timestamp_text"],
+            "decision": r["decision"],
+            "bucket": r["bucket"],
+            "risk": r["risk"],
+            "route": list(r["route"]),
+            "reasons": list(r["reasons"]),
+            "recommendations": list(r["recommendations"]),
+        }
+
+    def latest(self, shipment_id=None):
+        """Most recent row for ``shipment_id`` (or of the whole log) as a record, or None."""
+        if not len(self.frame):
+            return None
+        if shipment_id is None:
+            return self.record(len(self.frame) - 1)
+        pos = self._last_pos.get(_text(shipment_id))
+        return None if pos is None else self.record(pos)
+
+
+class DecisionRowsRegistry:
+    """Process-wide ``DecisionRows`` per data version, memoised by content hash."""
+
+    def __init__(self, keep=KEEP_VERSIONS):
+        self.keep = keep
+        self._by_version = {}
+        self._by_hash = {}
+        self._lock = threading.Lock()
+
+    def get(self, version, load):
+        """Snapshot for ``version``; ``load()`` returns the log frame and is only called on a miss."""
+        with self._lock:
+            rows = self._by_version.get(version)
+            if rows is None:
+                df = load()
+                key = content_hash(df)
+                rows = self._by_hash.get(key)
+                if rows is None:
+                    rows = DecisionRows.from_frame(df, key)
+                    self._by_hash[key] = rows
+                self._by_version[version] = rows
+                for cache in (self._by_version, self._by_hash):
+                    while len(cache) > self.keep:
+                        cache.pop(next(iter(cache)))
+            return rows
+
+    def for_frame(self, version, df):
+        return self.get(version, lambda: df)
@@ -0,0 +1,324 @@
+"""Decision log backends for the dashboard.
+
+The n8n decision nodes append rows (shipmentId, timestamp, decision, risk,
+reason, recommendations, route, ...) to a Google Sheet that the dashboard
+reads back as CSV. ``DecisionStore`` is the interface the pages use, with two
+implementations:
+
+* ``SheetDecisionStore``: the published sheet via ``sheet_source`` (read-only).
+* ``SQLiteDecisionStore``: an embedded SQLite log with indexes on
+  shipmentId, timestamp, decision and risk. Point lookups, filtered listings
+  and counts are indexed queries, and writes are batched upserts keyed by
+  (shipmentId, timestamp).
+
+``open_decision_store(spec)`` picks one from a spec string (the dashboard
+reads it from ``DECISION_STORE``): ``"sheet"`` or ``"sqlite:///path/to.db"``.
+
+    python decision_store.py import decisions.csv decisions.db
+"""
+import argparse
+import json
+import sqlite3
+import threading
+
+import pandas as pd
+
+# Sheet header variants -> dashboard column names
+COLUMN_ALIASES = {
+    "ShipmentID": "shipmentId",
+    "shipmentID": "shipmentId",
+    "ShipmentId": "shipmentId",
+    "TimeStamp": "timestamp",
+    "Timestamp": "timestamp",
+    "Decision": "decision",
+    "Risk": "risk",
+    "Reason": "reason",
+    "Recommendations": "recommendations",
+    "Route": "route",
+    "routeEdges": "route_edges",
+}
+
+# Columns stored as real SQLite columns; anything else goes to the JSON "extra" column
+DECISION_COLUMNS = ["shipmentId", "timestamp", "decision", "risk", "reason", "recommendations", "route", "route_edges", "STATUS"]
+INDEXED_COLUMNS = ["shipmentId", "timestamp", "decision", "risk"]
+
+UPSERT_CHUNK = 5000
+
+
+def normalize_columns(df):
+    return df.rename(columns={k: v for k, v in COLUMN_ALIASES.items() if k in df.columns})
+
+
+def _cell(v):
+    # CSV / editor cells -> SQLite values; NaN and None both become NULL
+    if v is None:
+        return None
+    if isinstance(v, float) and v != v:
+        return None
+    if isinstance(v, (dict, list)):
+        return json.dumps(v)
+    return v if isinstance(v, (int, float)) else str(v)
+
+
+class DecisionStore:
+    """Read (and, where supported, write) access to the decision log."""
+
+    writable = False
+
+    def version(self):
+        """Token that changes whenever the log changes (for caches keyed on the data)."""
+        raise NotImplementedError
+
+    def frame(self):
+        """The whole log as a DataFrame, oldest row first, normalised column names."""
+        raise NotImplementedError
+
+    def latest(self, shipment_id=None):
+        """Most recent row for ``shipment_id`` (or of the whole log) as a dict, or None."""
+        raise NotImplementedError
+
+    def query(self, decision=None, risk=None, limit=None, offset=0, order_by=None, descending=False):
+        """Rows matching the filters, as a DataFrame."""
+        raise NotImplementedError
+
+    def count(self, decision=None, risk=None):
+        raise NotImplementedError
+
+    def counts_by(self, column):
+        """``{value: rows}`` for an indexed column."""
+        raise NotImplementedError
+
+    def upsert_many(self, rows):
+        """Insert or update dict rows keyed by (shipmentId, timestamp); returns rows written."""
+        raise NotImplementedError(f"{type(self).__name__} is read-only")
+
+
+# --- GOOGLE SHEET ---
+class SheetDecisionStore(DecisionStore):
+    """The published sheet; lookups use per-version in-memory indexes instead of scans."""
+
+    def __init__(self, source):
+        self.source = source
+        self._version = None
+        self._frame = None
+        self._last_pos = {}
+
+    def _load(self):
+        df = self.source.read_frame()
+        if self._frame is None or self.source.version != self._version:
+            self._frame = normalize_columns(df)
+            self._version = self.source.version
+            ids = self._frame["shipmentId"].astype(str) if "shipmentId" in self._frame.columns else pd.Series(dtype=str)
+            # Later rows overwrite earlier ones, so this maps id -> last position
+            self._last_pos = dict(zip(ids.tolist(), range(len(ids))))
+        return self._frame
+
+    def version(self):
+        self._load()
+        return self._version
+
+    def frame(self):
+        return self._load().copy()
+
+    def latest(self, shipment_id=None):
+        df = self._load()
+        if df.empty:
+            return None
+        if shipment_id is None:
+            return df.iloc[-1].to_dict()
+        pos = self._last_pos.get(str(shipment_id))
+        return None if pos is None else df.iloc[pos].to_dict()
+
+    def _filtered(self, decision, risk):
+        df = self._load()
+        mask = pd.Series(True, index=df.index)
+        if decision is not None and "decision" in df.columns:
+            mask &= df["decision"].astype(str) == str(decision)
+        if risk is not None and "risk" in df.columns:
+            mask &= df["risk"].astype(str) == str(risk)
+        return df[mask]
+
+    def query(self, decision=None, risk=None, limit=None, offset=0, order_by=None, descending=False):
+        df = self._filtered(decision, risk)
+        if order_by is not None and order_by in df.columns:
+            df = df.sort_values(order_by, ascending=not descending, kind="stable")
+        elif descending:
+            df = df.iloc[::-1]
+        end = None if limit is None else offset + limit
+        return df.iloc[offset:end].copy()
+
+    def count(self, decision=None, risk=None):
+        return len(self._filtered(decision, risk))
+
+    def counts_by(self, column):
+        df = self._load()
+        if column not in df.columns:
+            return {}
+        return df[column].fillna("").astype(str).value_counts().to_dict()
+
+
+# --- SQLITE ---
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY,
+    shipmentId TEXT NOT NULL,
+    timestamp TEXT NOT NULL DEFAULT '',
+    decision TEXT,
+    risk TEXT,
+    reason TEXT,
+    recommendations TEXT,
+    route TEXT,
+    route_edges TEXT,
+    STATUS TEXT,
+    extra TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_decisions_key ON decisions (shipmentId, timestamp);
+CREATE INDEX IF NOT EXISTS ix_decisions_timestamp ON decisions (timestamp);
+CREATE INDEX IF NOT EXISTS ix_decisions_decision ON decisions (decision);
+CREATE INDEX IF NOT EXISTS ix_decisions_risk ON decisions (risk);
+CREATE TABLE IF NOT EXISTS store_meta (k TEXT PRIMARY KEY, v INTEGER NOT NULL);
+INSERT OR IGNORE INTO store_meta (k, v) VALUES ('revision', 0);
+"""
+
+_UPDATE_COLUMNS = [c for c in DECISION_COLUMNS if c not in ("shipmentId", "timestamp")] + ["extra"]
+_UPSERT = (
+    f"INSERT INTO decisions ({', '.join(DECISION_COLUMNS)}, extra) "
+    f"VALUES ({', '.join('?' * (len(DECISION_COLUMNS) + 1))}) "
+    "ON CONFLICT (shipmentId, timestamp) DO UPDATE SET "
+    # Only overwrite with values the row actually carries
+    + ", ".join(f"{c} = COALESCE(excluded.{c}, {c})" for c in _UPDATE_COLUMNS)
+)
+
+
+class SQLiteDecisionStore(DecisionStore):
+    """Decision log in an embedded SQLite database (WAL, one connection per thread)."""
+
+    writable = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _rows_to_frame(self, rows):
+        records = []
+        for r in rows:
+            rec = {c: r[c] for c in DECISION_COLUMNS}
+            if r["extra"]:
+                rec.update(json.loads(r["extra"]))
+            records.append(rec)
+        return pd.DataFrame.from_records(records, columns=None if records else DECISION_COLUMNS)
+
+    def _where(self, decision, risk):
+        clauses, params = [], []
+        if decision is not None:
+            clauses.append("decision = ?")
+            params.append(str(decision))
+        if risk is not None:
+            clauses.append("risk = ?")
+            params.append(str(risk))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def version(self):
+        return self._conn().execute("SELECT v FROM store_meta WHERE k = 'revision'").fetchone()[0]
+
+    def frame(self):
+        return self._rows_to_frame(self._conn().execute("SELECT * FROM decisions ORDER BY id"))
+
+    def latest(self, shipment_id=None):
+        if shipment_id is None:
+            rows = self._conn().execute("SELECT * FROM decisions ORDER BY id DESC LIMIT 1").fetchall()
+        else:
+            rows = self._conn().execute(
+                "SELECT * FROM decisions WHERE shipmentId = ? ORDER BY id DESC LIMIT 1", (str(shipment_id),)
+            ).fetchall()
+        df = self._rows_to_frame(rows)
+        return None if df.empty else df.iloc[0].to_dict()
+
+    def query(self, decision=None, risk=None, limit=None, offset=0, order_by=None, descending=False):
+        if order_by is not None and order_by not in INDEXED_COLUMNS + ["id"]:
+            raise ValueError(f"Cannot order decisions by {order_by!r}")
+        where, params = self._where(decision, risk)
+        sql = f"SELECT * FROM decisions{where} ORDER BY {order_by or 'id'} {'DESC' if descending else 'ASC'}"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params += [-1 if limit is None else int(limit), int(offset)]
+        return self._rows_to_frame(self._conn().execute(sql, params))
+
+    def count(self, decision=None, risk=None):
+        where, params = self._where(decision, risk)
+        return self._conn().execute(f"SELECT COUNT(*) FROM decisions{where}", params).fetchone()[0]
+
+    def counts_by(self, column):
+        if column not in INDEXED_COLUMNS:
+            raise ValueError(f"Cannot count decisions by {column!r}")
+        rows = self._conn().execute(f"SELECT COALESCE({column}, ''), COUNT(*) FROM decisions GROUP BY 1")
+        return {k: n for k, n in rows}
+
+    def upsert_many(self, rows):
+        def params():
+            for row in rows:
+                extra = {k: _cell(v) for k, v in row.items() if k not in DECISION_COLUMNS}
+                values = [_cell(row.get(c)) for c in DECISION_COLUMNS]
+                values[0] = "" if values[0] is None else str(values[0])
+                values[1] = "" if values[1] is None else str(values[1])
+                yield values + [json.dumps(extra) if extra else None]
+
+        conn = self._conn()
+        written = 0
+        batch = []
+        with conn:  # one transaction for the whole batch
+            for p in params():
+                batch.append(p)
+                if len(batch) >= UPSERT_CHUNK:
+                    conn.executemany(_UPSERT, batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                conn.executemany(_UPSERT, batch)
+                written += len(batch)
+            # One revision bump per batch (a per-row trigger doubled the write cost)
+            if written:
+                conn.execute("UPDATE store_meta SET v = v + 1 WHERE k = 'revision'")
+        return written
+
+    def import_frame(self, df):
+        """Load a sheet export (any known header spelling) into the store."""
+        return self.upsert_many(normalize_columns(df).to_dict("records"))
+
+
+def open_decision_store(spec=None, sheet_source=None):
+    """Store for ``spec``: "sheet" (needs ``sheet_source``) or "sqlite:///path/to.db"."""
+    spec = spec or "sheet"
+    if spec == "sheet":
+        if sheet_source is None:
+            raise ValueError("The sheet decision store needs a sheet source")
+        return SheetDecisionStore(sheet_source)
+    if spec.startswith("sqlite:///"):
+        return SQLiteDecisionStore(spec[len("sqlite:///"):])
+    if spec.startswith("sqlite:"):
+        return SQLiteDecisionStore(spec[len("sqlite:"):])
+    raise ValueError(f"Unknown decision store: {spec!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decision store utilities.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="Load a decision sheet CSV export into SQLite")
+    imp.add_argument("csv")
+    imp.add_argument("db")
+    args = parser.parse_args()
+    if args.cmd == "import":
+        n = SQLiteDecisionStore(args.db).import_frame(pd.read_csv(args.csv))
+        print(f"Imported {n} decisions into {args.db}")
@@ -0,0 +1,301 @@
+"""Columnar garment table flattened out of shipment manifests.
+
+Every consumer used to re-walk shipments -> batches -> orders -> garments ->
+dpp dicts. ``write_garment_table`` flattens a manifest once into one row per
+garment, keeping the shipment/batch/order keys and one column per DPP leaf
+field (``evaluations.complianceScore``, ``transports.co2EmissionsKg``, ...).
+Repeated strings are dictionary-encoded. The result is written as an
+uncompressed Arrow IPC file (memory-mapped on read) or as Parquet, so
+analytics and compliance checks read only the columns they need.
+
+    python dpp_store.py syntheticdata.json garments.arrow
+"""
+import argparse
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from manifest_stream import iter_shipments
+
+# Garments per record batch
+BATCH_ROWS = 65536
+
+# Column kinds -> Arrow types; "category" columns are dictionary-encoded
+ARROW_TYPES = {
+    "category": pa.dictionary(pa.int32(), pa.string()),
+    "string": pa.string(),
+    "int": pa.int64(),
+    "float": pa.float64(),
+    "bool": pa.bool_(),
+    "timestamp": pa.timestamp("us"),
+    "list": pa.list_(pa.string()),
+}
+
+# Shipment / batch / order / garment context carried on every row
+KEY_FIELDS = [
+    ("shipmentId", "category"),
+    ("origin", "category"),
+    ("destination", "category"),
+    ("priority", "category"),
+    ("batchId", "category"),
+    ("batchTimestamp", "timestamp"),
+    ("orderId", "category"),
+    ("brand", "category"),
+    ("quantity", "int"),
+    ("garmentId", "string"),
+]
+
+# DPP leaf fields, as dotted paths below garment["dpp"]
+DPP_FIELDS = [
+    ("uuid", "string"),
+    ("rawMaterialsAndProcess.sourceCountry", "category"),
+    ("rawMaterialsAndProcess.materialType", "category"),
+    ("rawMaterialsAndProcess.supplier", "category"),
+    ("rawMaterialsAndProcess.harvestDate", "timestamp"),
+    ("rawMaterialsAndProcess.certifications", "list"),
+    ("rawMaterialsConversion.processingFacility", "category"),
+    ("rawMaterialsConversion.location", "category"),
+    ("rawMaterialsConversion.processDate", "timestamp"),
+    ("rawMaterialsConversion.processType", "category"),
+    ("rawMaterialsConversion.waterUsageLiters", "float"),
+    ("rawMaterialsConversion.energyUsageKWh", "float"),
+    ("component.supplier", "category"),
+    ("component.components", "list"),
+    ("component.assemblyDate", "timestamp"),
+    ("productAssembly.manufacturingFacility", "category"),
+    ("productAssembly.location", "category"),
+    ("productAssembly.assemblyDate", "timestamp"),
+    ("productAssembly.workersCount", "int"),
+    ("productAssembly.wasteGeneratedKg", "float"),
+    ("finishedProduct.productId", "string"),
+    ("finishedProduct.completionDate", "timestamp"),
+    ("finishedProduct.qualityGrade", "category"),
+    ("finishedProduct.weightKg", "float"),
+    ("finishedProduct.dimensions.lengthCm", "float"),
+    ("finishedProduct.dimensions.widthCm", "float"),
+    ("distribution.warehouseLocation", "category"),
+    ("distribution.warehouseDate", "timestamp"),
+    ("distribution.packagingType", "category"),
+    ("distribution.storageDays", "int"),
+    ("usage.estimatedLifespanMonths", "int"),
+    ("usage.careInstructions", "category"),
+    ("usage.durabilityRating", "category"),
+    ("afterSale.warrantyMonths", "int"),
+    ("afterSale.repairServiceAvailable", "bool"),
+    ("afterSale.resaleEligible", "bool"),
+    ("collection.collectionProgramAvailable", "bool"),
+    ("collection.collectionPartner", "category"),
+    ("recycling.recyclability", "category"),
+    ("recycling.recyclableMaterials", "list"),
+    ("recycling.recyclingProcess", "category"),
+    ("endOfLife.estimatedEndOfLifeYears", "int"),
+    ("endOfLife.disposalOptions", "list"),
+    ("transports.totalTransportLegs", "int"),
+    ("transports.transportModes", "list"),
+    ("transports.totalDistanceKm", "float"),
+    ("transports.co2EmissionsKg", "float"),
+    ("evaluations.esgRating", "category"),
+    ("evaluations.certifications", "list"),
+    ("evaluations.lastAuditDate", "timestamp"),
+    ("evaluations.complianceScore", "float"),
+    ("evaluations.laborStandards", "category"),
+    ("evaluations.environmentalImpact", "category"),
+]
+
+
+def garment_schema(dpp_fields=DPP_FIELDS):
+    return pa.schema(
+        [pa.field(name, ARROW_TYPES[kind]) for name, kind in KEY_FIELDS]
+        + [pa.field(f"dpp.{path}", ARROW_TYPES[kind]) for path, kind in dpp_fields]
+    )
+
+
+# --- VALUE COERCION ---
+# Manifests are hand-edited / synthetic, so a bad value becomes null rather than an error
+def _as_str(v):
+    if v is None or isinstance(v, (dict, list)):
+        return None
+    return str(v)
+
+
+def _as_int(v):
+    if isinstance(v, bool) or v is None:
+        return None
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_float(v):
+    if isinstance(v, bool) or v is None:
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_bool(v):
+    return v if isinstance(v, bool) else None
+
+
+def _as_timestamp(v):
+    if not isinstance(v, str) or not v.strip():
+        return None
+    try:
+        ts = datetime.fromisoformat(v.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _as_list(v):
+    if not isinstance(v, list):
+        return None
+    return [x if isinstance(x, str) else str(x) for x in v if x is not None]
+
+
+_COERCE = {
+    "category": _as_str,
+    "string": _as_str,
+    "int": _as_int,
+    "float": _as_float,
+    "bool": _as_bool,
+    "timestamp": _as_timestamp,
+    "list": _as_list,
+}
+
+
+def _getter(path):
+    keys = path.split(".")
+
+    def get(obj):
+        for k in keys:
+            if not isinstance(obj, dict):
+                return None
+            obj = obj.get(k)
+        return obj
+
+    return get
+
+
+class _BatchBuilder:
+    """Column buffers for one record batch, with dictionaries shared across batches."""
+
+    def __init__(self, schema, kinds):
+        self.schema = schema
+        self.kinds = kinds
+        self.columns = [[] for _ in kinds]
+        # Dictionaries only ever grow, so later batches are written as IPC deltas
+        self.dictionaries = [({}, []) if kind == "category" else None for kind in kinds]
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def append(self, values):
+        for col, kind, v in zip(self.columns, self.kinds, values):
+            col.append(_COERCE[kind](v))
+
+    def flush(self):
+        arrays = []
+        for col, kind, field, dictionary in zip(self.columns, self.kinds, self.schema, self.dictionaries):
+            if kind == "category":
+                codes, values = dictionary
+                indices = []
+                for v in col:
+                    if v is None:
+                        indices.append(None)
+                        continue
+                    code = codes.get(v)
+                    if code is None:
+                        code = codes[v] = len(values)
+                        values.append(v)
+                    indices.append(code)
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array(indices, type=pa.int32()), pa.array(values, type=pa.string())
+                ))
+            else:
+                arrays.append(pa.array(col, type=field.type))
+        self.columns = [[] for _ in self.kinds]
+        return pa.record_batch(arrays, schema=self.schema)
+
+
+def iter_garment_rows(shipments, dpp_fields=DPP_FIELDS):
+    """Yield one flat value list per garment, in ``garment_schema`` column order."""
+    getters = [_getter(path) for path, _kind in dpp_fields]
+    for sh in shipments:
+        ship_ctx = [sh.get("shipmentId"), sh.get("origin"), sh.get("destination"), sh.get("priority")]
+        for b in sh.get("batches") or []:
+            batch_ctx = [b.get("batchId"), b.get("timestamp")]
+            for o in b.get("orders") or []:
+                order_ctx = [o.get("id", o.get("orderId")), o.get("brand"), o.get("quantity")]
+                for g in o.get("garments") or []:
+                    dpp = g.get("dpp") if isinstance(g, dict) else None
+                    row = ship_ctx + batch_ctx + order_ctx + [g.get("id") if isinstance(g, dict) else None]
+                    row.extend(get(dpp) for get in getters)
+                    yield row
+
+
+def write_garment_table(shipments, path, fmt=None, batch_rows=BATCH_ROWS, dpp_fields=DPP_FIELDS):
+    """Flatten ``shipments`` (any iterable, e.g. ``iter_shipments(fp)``) to ``path``.
+
+    ``fmt`` is "ipc" or "parquet"; by default it follows the file extension.
+    Returns the number of garment rows written.
+    """
+    if fmt is None:
+        fmt = "parquet" if str(path).endswith(".parquet") else "ipc"
+    schema = garment_schema(dpp_fields)
+    kinds = [kind for _name, kind in KEY_FIELDS] + [kind for _path, kind in dpp_fields]
+    builder = _BatchBuilder(schema, kinds)
+
+    if fmt == "ipc":
+        writer = ipc.new_file(str(path), schema, options=ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+    elif fmt == "parquet":
+        writer = pq.ParquetWriter(str(path), schema)
+    else:
+        raise ValueError(f"Unknown garment table format: {fmt!r}")
+
+    rows = 0
+    try:
+        for row in iter_garment_rows(shipments, dpp_fields):
+            builder.append(row)
+            rows += 1
+            if len(builder) >= batch_rows:
+                writer.write_batch(builder.flush())
+        if len(builder) or rows == 0:
+            writer.write_batch(builder.flush())
+    finally:
+        writer.close()
+    return rows
+
+
+def ingest_manifest(manifest_path, out_path, fmt=None, batch_rows=BATCH_ROWS):
+    """Stream a manifest file straight into a garment table; returns rows written."""
+    with open(manifest_path, "rb") as f:
+        return write_garment_table(iter_shipments(f), out_path, fmt=fmt, batch_rows=batch_rows)
+
+
+def read_garment_table(path, columns=None):
+    """Open a garment table, reading only ``columns`` (all when None).
+
+    IPC files are memory-mapped, so untouched columns are never read from disk.
+    """
+    if str(path).endswith(".parquet"):
+        return pq.read_table(str(path), columns=columns, memory_map=True)
+    table = ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    return table.select(columns) if columns is not None else table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flatten a shipment manifest into a columnar garment table.")
+    parser.add_argument("manifest", help="Manifest JSON ({'shipments': [...]})")
+    parser.add_argument("out", help="Output path (.arrow / .parquet)")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    args = parser.parse_args()
+    n = ingest_manifest(args.manifest, args.out, batch_rows=args.batch_rows)
+    print(f"Wrote {n} garments to {args.out}")
@@ -0,0 +1,268 @@
+"""Python port of the "DPP Missing Data Check" n8n node.
+
+The REQUIRED schema and the allow-null prefixes are compiled once into flat
+check lists of ``(key, allow_null)``, so no path is string-matched per issue
+and no generic recursion runs per garment: one flat loop per object walks
+its compiled keys. Large manifests are split across a process pool. Issues
+keep the node's ``{path, reason, value}`` shape and order, and
+``missing_check`` returns the same ``_missingCheck`` object the workflow
+branches on.
+
+Column-at-a-time NumPy masks were tried and dropped. The values live in
+Python dicts, so building the columns cost a Python call per element, and
+the whole check came out slower than this loop.
+
+Unlike the node, a ``{"shipments": [...]}`` manifest is unwrapped and each
+shipment validated under ``shipments[i]`` (the node treats the whole manifest
+as a single shipment and never reaches its garments).
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import tracing
+
+REQUIRED = {
+    "shipment": ["shipmentId", "origin", "destination", "route", "distanceKm", "timeHours", "costEUR", "priority", "batches"],
+    "batch": ["batchId", "shipmentId", "timestamp", "orders"],
+    "order": ["id", "batchId", "brand", "quantity", "garments"],
+    "garment": ["id", "orderId", "dpp"],
+    "dpp": [
+        "uuid",
+        "rawMaterialsAndProcess",
+        "rawMaterialsConversion",
+        "component",
+        "productAssembly",
+        "finishedProduct",
+        "distribution",
+        "usage",
+        "afterSale",
+        "collection",
+        "recycling",
+        "endOfLife",
+        "transports",
+        "evaluations",
+    ],
+}
+
+NESTED_REQUIRED = [
+    ("rawMaterialsAndProcess", ["sourceCountry", "materialType", "supplier", "harvestDate", "certifications"]),
+    ("rawMaterialsConversion", ["processingFacility", "location", "processDate", "processType"]),
+    ("finishedProduct", ["productId", "completionDate", "qualityGrade"]),
+    ("evaluations", ["esgRating", "certifications", "lastAuditDate", "complianceScore"]),
+]
+
+ALLOW_NULL_PATH_PREFIXES = [
+    "batches[].orders[].garments[].dpp.collection.collectionPartner",
+    "batches[].orders[].garments[].dpp.recycling.recyclingProcess",
+]
+
+REASON = "missing/empty"
+
+# The node only forwards the first 200 issues
+MAX_REPORTED_ISSUES = 200
+
+# Shipments per worker task
+SHIPMENTS_PER_TASK = 64
+
+# Stands in for JS `undefined` (absent key) so it can be told apart from null
+_ABSENT = object()
+
+
+def _is_missing(v):
+    return v is _ABSENT or v is None or (isinstance(v, str) and not v.strip()) or (isinstance(v, list) and not v)
+
+
+def _get(obj, key):
+    return obj.get(key, _ABSENT) if isinstance(obj, dict) else _ABSENT
+
+
+def _issue(path, value):
+    # JSON drops `undefined`, so an absent key has no "value" in the node's output either
+    if value is _ABSENT:
+        return {"path": path, "reason": REASON}
+    return {"path": path, "reason": REASON, "value": value}
+
+
+class CompiledSchema:
+    """REQUIRED keys with their allow-null flags resolved against index-free paths."""
+
+    def __init__(self, required=REQUIRED, nested=NESTED_REQUIRED, allow_null_prefixes=ALLOW_NULL_PATH_PREFIXES):
+        prefixes = tuple(allow_null_prefixes)
+
+        def compile_keys(keys, template_base):
+            return [(k, f"{template_base}{k}".startswith(prefixes)) for k in keys]
+
+        g = "batches[].orders[].garments[]."
+        self.shipment = compile_keys(required["shipment"], "")
+        self.route_item_allow_null = "route[]".startswith(prefixes)
+        self.batch = compile_keys(required["batch"], "batches[].")
+        self.order = compile_keys(required["order"], "batches[].orders[].")
+        self.garment = compile_keys(required["garment"], g)
+        self.dpp_allow_null = f"{g}dpp".startswith(prefixes)
+        self.dpp = compile_keys(required["dpp"], f"{g}dpp.")
+        self.nested = [
+            (section, f"{g}dpp.{section}".startswith(prefixes), compile_keys(keys, f"{g}dpp.{section}."))
+            for section, keys in nested
+        ]
+
+
+DEFAULT_SCHEMA = CompiledSchema()
+
+
+def _check_object(out, obj, checks, base_path):
+    """Append an issue per missing key of ``obj`` (``checks`` from ``CompiledSchema``)."""
+    if not isinstance(obj, dict):
+        # Every key of a non-object is absent, and an absent key is never allowed-null
+        out.extend({"path": f"{base_path}.{key}", "reason": REASON} for key, _ in checks)
+        return
+    get = obj.get
+    for key, allow_null in checks:
+        v = get(key, _ABSENT)
+        # _is_missing, unrolled: this runs for every required key of every garment
+        if v is _ABSENT:
+            out.append({"path": f"{base_path}.{key}", "reason": REASON})
+        elif v is None:
+            if not allow_null:
+                out.append({"path": f"{base_path}.{key}", "reason": REASON, "value": None})
+        elif isinstance(v, str):
+            if not v.strip():
+                out.append({"path": f"{base_path}.{key}", "reason": REASON, "value": v})
+        elif isinstance(v, list) and not v:
+            out.append({"path": f"{base_path}.{key}", "reason": REASON, "value": v})
+
+
+def _check_missing(out, v, path, allow_null):
+    if _is_missing(v) and not (v is None and allow_null):
+        out.append(_issue(path, v))
+
+
+def _check_garment(out, schema, g, path):
+    _check_object(out, g, schema.garment, path)
+    dpp = _get(g, "dpp")
+    if _is_missing(dpp):
+        _check_missing(out, dpp, f"{path}.dpp", schema.dpp_allow_null)
+        return
+    d_path = f"{path}.dpp"
+    _check_object(out, dpp, schema.dpp, d_path)
+    for section, section_allow_null, keys in schema.nested:
+        sec = _get(dpp, section)
+        if _is_missing(sec):
+            _check_missing(out, sec, f"{d_path}.{section}", section_allow_null)
+        else:
+            _check_object(out, sec, keys, f"{d_path}.{section}")
+
+
+def _validate_shipments(shipments, path_for, schema=DEFAULT_SCHEMA):
+    """Validate shipments; ``path_for(i)`` gives the base path of the i-th one.
+
+    Issues come out in the node's depth-first order: each object's own keys,
+    then its children.
+    """
+    out = []
+    for si, s in enumerate(shipments):
+        s_path = path_for(si)
+        _check_object(out, s, schema.shipment, s_path)
+        route = _get(s, "route")
+        if isinstance(route, list):
+            for ri, r in enumerate(route):
+                _check_missing(out, r, f"{s_path}.route[{ri}]", schema.route_item_allow_null)
+
+        batches = _get(s, "batches")
+        for bi, b in enumerate(batches if isinstance(batches, list) else []):
+            b_path = f"{s_path}.batches[{bi}]"
+            _check_object(out, b, schema.batch, b_path)
+
+            orders = _get(b, "orders")
+            for oi, o in enumerate(orders if isinstance(orders, list) else []):
+                o_path = f"{b_path}.orders[{oi}]"
+                _check_object(out, o, schema.order, o_path)
+
+                items = _get(o, "garments")
+                for gi, g in enumerate(items if isinstance(items, list) else []):
+                    _check_garment(out, schema, g, f"{o_path}.garments[{gi}]")
+    return out
+
+
+def compute_issues(data, schema=DEFAULT_SCHEMA):
+    """Return the issue list for one workflow item (a shipment, a list of them, or a manifest)."""
+    if isinstance(data, dict) and isinstance(data.get("shipments"), list):
+        return _validate_shipments(data["shipments"], lambda i: f"shipments[{i}]", schema)
+    if isinstance(data, list):
+        return _validate_shipments(data, lambda i: f"[{i}]", schema)
+    return _validate_shipments([data], lambda i: "shipment", schema)
+
+
+def missing_check(data, schema=DEFAULT_SCHEMA):
+    """Return the node's ``_missingCheck`` object for one workflow item."""
+    with tracing.span("DPP Missing Data Check", stage="dpp_missing_data_check"):
+        issues = compute_issues(data, schema)
+    return {"ok": not issues, "missingCount": len(issues), "missing": issues[:MAX_REPORTED_ISSUES]}
+
+
+def _available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _validate_chunk(args):
+    offset, shipments = args
+    return _validate_shipments(shipments, lambda i: f"shipments[{offset + i}]")
+
+
+def validate_shipments_parallel(shipments, workers=None, chunk=SHIPMENTS_PER_TASK):
+    """Validate an iterable of shipments across a process pool; yields issues in order.
+
+    ``shipments`` may be a generator (e.g. ``manifest_stream.iter_shipments``);
+    at most ``2 * workers`` chunks are in flight, so memory stays bounded.
+    """
+    workers = workers or _available_cpus()
+    it = iter(shipments)
+    offset = 0
+    if workers <= 1:
+        # A pool on one core only adds pickling cost
+        while True:
+            part = list(islice(it, chunk))
+            if not part:
+                return
+            yield from _validate_chunk((offset, part))
+            offset += len(part)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        while True:
+            while len(pending) < 2 * workers:
+                part = list(islice(it, chunk))
+                if not part:
+                    break
+                pending.append(pool.submit(_validate_chunk, (offset, part)))
+                offset += len(part)
+            if not pending:
+                break
+            yield from pending.popleft().result()
+
+
+def validate_manifest_file(path, workers=None):
+    """Stream a manifest file through the parallel validator; returns ``_missingCheck``."""
+    from manifest_stream import iter_shipments
+
+    count = 0
+    reported = []
+    with open(path, "rb") as f, tracing.span("DPP Missing Data Check", stage="dpp_missing_data_check") as span:
+        span.set_attribute("manifest.path", str(path))
+        for issue in validate_shipments_parallel(iter_shipments(f), workers=workers):
+            if count < MAX_REPORTED_ISSUES:
+                reported.append(issue)
+            count += 1
+    return {"ok": count == 0, "missingCount": count, "missing": reported}
+
+
+if __name__ == "__main__":
+    # Usage: python dpp_validator.py manifest.json [workers]
+    import json
+    import sys
+
+    result = validate_manifest_file(sys.argv[1], workers=int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    json.dump(result, sys.stdout, indent=2)
@@ -0,0 +1,76 @@
+"""Delta-based persistence of ``st.data_editor`` edits.
+
+The pages used to copy the session's shipments frame and write every column
+of the editor output back after each rerun, which cost O(rows x columns) even
+when nothing changed. ``EditTracker`` reads only the editor's
+``edited_rows`` delta, applies the changed cells in place, and collects them
+for a single batched write to a writable decision store.
+
+``edited_rows`` is cumulative for the widget's lifetime and keyed by
+position in the displayed frame, so the tracker remembers what it already
+applied per editor key and view (search / filter). When the view changes,
+earlier positions no longer refer to the same rows, so those edits are
+treated as already applied.
+"""
+
+_UNSET = object()
+
+
+class EditTracker:
+    """Applies data_editor cell edits to a master DataFrame, one changed cell at a time."""
+
+    def __init__(self):
+        self._applied = {}  # editor key -> (view, {(position, column): value})
+        self.pending = {}  # master row label -> {column: value} not yet written to a store
+
+    def sync(self, key, editor_state, displayed_index, master, columns=None, view=None):
+        """Apply new edits from ``editor_state`` (``st.session_state[key]``) to ``master``.
+
+        ``displayed_index`` is the index of the frame passed to the editor; its
+        labels must exist in ``master``. ``master`` is a DataFrame or anything
+        with ``columns`` and ``at[label, column]``, such as a
+        ``shared_table.SessionTable``. Only ``columns`` (all when None) are
+        accepted. Returns the ``[(label, column, value)]`` applied this call.
+        """
+        edited = (editor_state or {}).get("edited_rows") or {}
+        current = {
+            (int(pos), col): value
+            for pos, cells in edited.items()
+            for col, value in cells.items()
+            if columns is None or col in columns
+        }
+
+        last_view, applied = self._applied.get(key, (view, {}))
+        self._applied[key] = (view, current)
+        if last_view != view:
+            return []
+
+        changes = []
+        for (pos, col), value in current.items():
+            if applied.get((pos, col), _UNSET) == value or pos >= len(displayed_index):
+                continue
+            label = displayed_index[pos]
+            if col not in master.columns:
+                continue
+            master.at[label, col] = value
+            self.pending.setdefault(label, {})[col] = value
+            changes.append((label, col, value))
+        return changes
+
+    def flush(self, store, master, key_columns=("shipmentId", "timestamp")):
+        """Write pending cells to ``store`` in one ``upsert_many``; returns rows written."""
+        if not getattr(store, "writable", False):
+            # Read-only backend (the sheet): edits live in the session only
+            self.pending = {}
+            return 0
+        if not self.pending:
+            return 0
+        rows = []
+        for label, cells in self.pending.items():
+            row = {c: master.at[label, c] for c in key_columns if c in master.columns}
+            row.update(cells)
+            rows.append(row)
+        written = store.upsert_many(rows)
+        self.pending = {}
+        return written
+
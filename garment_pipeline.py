@@ -0,0 +1,205 @@
+"""Per-garment views over one parsed manifest, consumed in micro-batches.
+
+In the workflow, "Batch mapping" rebuilds the manifest as a ``batchMap`` of
+nested dicts, and "Code in JavaScript" then emits one item per garment
+carrying a copy of ``garment.dpp`` plus the batch context. So memory grows
+with garments x DPP size before any agent runs. ``GarmentIndex`` walks the
+parsed manifest once and keeps one row of positions per garment,
+``(shipment, batch, order, garment)``, in the order the two nodes emit
+them:
+
+* batches are grouped by ``batchId`` in first-appearance order, and their
+  context (shipmentId, origin, destination) comes from the first shipment
+  that carries the batch;
+* orders are grouped by ``orderId`` within a batch;
+* garments whose ``dpp`` is falsy in JS (absent, null, "", 0) are skipped
+  (an empty ``{}`` is kept, as in the node) and counted per batch in
+  ``skipped``.
+
+``GarmentView`` resolves fields from the shared manifest on access (the DPP
+is the manifest's own dict, never a copy). ``micro_batches`` and
+``map_micro_batches`` hand views to downstream stages in fixed-size lists, so
+peak memory is about one manifest plus one micro-batch of results.
+
+    python garment_pipeline.py syntheticdata.json --micro-batch 256
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from itertools import islice
+
+import numpy as np
+
+# Garments per micro-batch handed to a downstream stage
+MICRO_BATCH = 256
+
+
+def _items(obj, key):
+    value = obj.get(key) if isinstance(obj, dict) else None
+    return value if isinstance(value, list) else []
+
+
+def _js_falsy(v):
+    # `!v` in the node: undefined / null, false, 0, NaN and "" (but not {} or [])
+    if v is None or v is False or (isinstance(v, str) and not v):
+        return True
+    return isinstance(v, (int, float)) and not isinstance(v, bool) and (v == 0 or v != v)
+
+
+class GarmentView:
+    """One garment of a shared manifest, addressed by position."""
+
+    __slots__ = ("_index", "_row")
+
+    def __init__(self, index, row):
+        self._index = index
+        self._row = row
+
+    @property
+    def row(self):
+        return self._row
+
+    @property
+    def ref(self):
+        """``(shipment, batch, order, garment)`` positions in the manifest."""
+        return tuple(int(v) for v in self._index.refs[self._row])
+
+    @property
+    def shipment(self):
+        return self._index.shipments[self._index.refs[self._row, 0]]
+
+    @property
+    def context(self):
+        # Batch context comes from the first shipment carrying the batchId (as in "Batch mapping")
+        return self._index.shipments[self._index.context[self._row]]
+
+    @property
+    def batch(self):
+        s, b = self._index.refs[self._row, :2]
+        return _items(self._index.shipments[s], "batches")[b]
+
+    @property
+    def order(self):
+        s, b, o = self._index.refs[self._row, :3]
+        return _items(_items(self._index.shipments[s], "batches")[b], "orders")[o]
+
+    @property
+    def garment(self):
+        return _items(self.order, "garments")[self._index.refs[self._row, 3]]
+
+    @property
+    def dpp(self):
+        return self.garment.get("dpp")
+
+    def to_item(self):
+        """The item "Code in JavaScript" emits for this garment (``dpp`` by reference)."""
+        ctx, garment = self.context, self.garment
+        return {
+            "batchId": self.batch.get("batchId"),
+            "shipmentId": ctx.get("shipmentId"),
+            "origin": ctx.get("origin"),
+            "destination": ctx.get("destination"),
+            "orderId": garment.get("orderId"),
+            "garmentId": garment.get("id"),
+            "dpp": garment.get("dpp"),
+        }
+
+
+class GarmentIndex:
+    """Garment positions over one parsed ``{"shipments": [...]}`` manifest."""
+
+    def __init__(self, shipments, refs, context, groups, batch_ids, batch_context, skipped=None):
+        self.shipments = shipments
+        self.refs = refs
+        self.context = context
+        self.groups = groups  # position in batch_ids per garment row
+        self.batch_ids = batch_ids
+        self.batch_context = batch_context  # context shipment position per batch
+        # Garments left out per batch for having no dpp
+        self.skipped = skipped if skipped is not None else np.zeros(len(batch_ids), dtype=np.int64)
+
+    @classmethod
+    def build(cls, manifest):
+        shipments = _items(manifest, "shipments") if isinstance(manifest, dict) else list(manifest)
+        # batchId -> (context shipment, {orderId: [(shipment, batch, order), ...]})
+        batches = {}
+        for s, shipment in enumerate(shipments):
+            for b, batch in enumerate(_items(shipment, "batches")):
+                entry = batches.setdefault(batch.get("batchId") if isinstance(batch, dict) else None, (s, {}))
+                for o, order in enumerate(_items(batch, "orders")):
+                    entry[1].setdefault(order.get("orderId") if isinstance(order, dict) else None, []).append((s, b, o))
+
+        refs, context, groups = [], [], []
+        skipped = np.zeros(len(batches), dtype=np.int64)
+        for group, (ctx, orders) in enumerate(batches.values()):
+            for locations in orders.values():
+                for s, b, o in locations:
+                    order = _items(_items(shipments[s], "batches")[b], "orders")[o]
+                    for g, garment in enumerate(_items(order, "garments")):
+                        if isinstance(garment, dict) and not _js_falsy(garment.get("dpp")):
+                            refs.append((s, b, o, g))
+                            context.append(ctx)
+                            groups.append(group)
+                        else:
+                            skipped[group] += 1
+        refs = np.array(refs, dtype=np.int32).reshape(-1, 4)
+        return cls(
+            shipments,
+            refs,
+            np.array(context, dtype=np.int32),
+            np.array(groups, dtype=np.int32),
+            list(batches),
+            [ctx for ctx, _ in batches.values()],
+            skipped,
+        )
+
+    def __len__(self):
+        return len(self.refs)
+
+    def __getitem__(self, row):
+        return GarmentView(self, row)
+
+    def views(self, start=0, stop=None):
+        """Yield ``GarmentView``s lazily in workflow order."""
+        for row in range(start, len(self.refs) if stop is None else min(stop, len(self.refs))):
+            yield GarmentView(self, row)
+
+
+def micro_batches(views, size=MICRO_BATCH):
+    """Group an iterable of views into lists of at most ``size``."""
+    views = iter(views)
+    while True:
+        chunk = list(islice(views, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def map_micro_batches(stage, views, size=MICRO_BATCH):
+    """Yield ``stage(micro_batch)`` for each micro-batch, one batch at a time."""
+    for chunk in micro_batches(views, size):
+        yield stage(chunk)
+
+
+def load_manifest(path):
+    with open(path, "rb") as fp:
+        return json.load(fp)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk a manifest's garments in micro-batches.")
+    parser.add_argument("manifest")
+    parser.add_argument("--micro-batch", type=int, default=MICRO_BATCH)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = GarmentIndex.build(load_manifest(args.manifest))
+    n_batches = sum(1 for _ in map_micro_batches(len, index.views(), args.micro_batch))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    print(
+        f"{len(index)} garments in {len(index.batch_ids)} batches, "
+        f"{n_batches} micro-batches of {args.micro_batch} in {elapsed:.2f}s (peak {peak / 1e6:.1f} MB)"
+    )
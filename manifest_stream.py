@@ -0,0 +1,246 @@
+"""Streaming reader for shipment manifests.
+
+Manifests are shipments -> batches -> orders -> garments trees that can run to
+hundreds of MB. Instead of ``json.load`` on the whole document, the functions
+here walk the JSON token stream (via ijson when installed) and keep only
+counts plus a size-bounded preview, so memory stays flat however large the
+file is and callers can report progress while the file is still being read.
+"""
+import json
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - fallback keeps the dashboard usable without ijson
+    ijson = None
+
+# Items of the top-level list (or of "shipments") kept in the preview
+PREVIEW_ITEMS = 3
+# Items kept for every nested list in the preview (batches, orders, garments, ...)
+PREVIEW_ARRAY_LIMIT = 3
+# Strings in the preview are cut to this many characters
+PREVIEW_STRING_LIMIT = 200
+# How often (in parser events) the progress callback fires
+PROGRESS_EVERY = 20000
+
+_LEVELS = (("batches", "batches.item"), ("orders", "orders.item"), ("garments", "garments.item"))
+
+
+class ManifestSummary:
+    """Counts and bounded preview gathered while streaming a manifest."""
+
+    def __init__(self):
+        self.root_type = None  # "dict" ({"shipments": [...]}), "shipment" (one shipment object) or "list"
+        self.counts = {"shipments": 0, "batches": 0, "orders": 0, "garments": 0}
+        self.first_shipment_id = None
+        self.preview = None
+        self.preview_complete = False
+        self.bytes_read = 0
+        self.done = False
+
+    @property
+    def top_level_items(self):
+        # A list manifest is a list of batches; a dict manifest holds "shipments"
+        return self.counts["batches"] if self.root_type == "list" else self.counts["shipments"]
+
+
+class _BoundedBuilder:
+    """Rebuilds a JSON value from parser events, truncating long lists and strings."""
+
+    def __init__(self, top_limit, array_limit=PREVIEW_ARRAY_LIMIT, string_limit=PREVIEW_STRING_LIMIT):
+        self.top_limit = top_limit
+        self.array_limit = array_limit
+        self.string_limit = string_limit
+        self.stack = []  # [container, pending map key, dropped items]
+        self.value = None
+        self.skip_depth = 0
+
+    def _limit_for(self, depth):
+        # The root list (or the root's "shipments" list) gets the top-level limit
+        if depth == 1 and isinstance(self.stack[0][0], list):
+            return self.top_limit
+        if depth == 2 and isinstance(self.stack[0][0], dict) and self.stack[0][1] == "shipments":
+            return self.top_limit
+        return self.array_limit
+
+    def _scalar(self, value):
+        if isinstance(value, str) and len(value) > self.string_limit:
+            return value[: self.string_limit] + "…"
+        return value
+
+    def _attach(self, value):
+        if not self.stack:
+            self.value = value
+            return True
+        frame = self.stack[-1]
+        container = frame[0]
+        if isinstance(container, list):
+            if len(container) >= self._limit_for(len(self.stack)):
+                frame[2] += 1
+                return False
+            container.append(value)
+        else:
+            container[frame[1]] = value
+        return True
+
+    def event(self, event, value):
+        if self.skip_depth:
+            if event in ("start_map", "start_array"):
+                self.skip_depth += 1
+            elif event in ("end_map", "end_array"):
+                self.skip_depth -= 1
+            return
+
+        if event == "map_key":
+            self.stack[-1][1] = value
+        elif event in ("start_map", "start_array"):
+            container = {} if event == "start_map" else []
+            if self._attach(container):
+                self.stack.append([container, None, 0])
+            else:
+                self.skip_depth = 1
+        elif event in ("end_map", "end_array"):
+            container, _key, dropped = self.stack.pop()
+            if dropped:
+                container.append(f"… {dropped} more")
+        else:
+            self._attach(self._scalar(value))
+
+
+def _events_from_object(obj, prefix=""):
+    # Same (prefix, event, value) triples as ijson.parse, for the json fallback
+    if isinstance(obj, dict):
+        yield prefix, "start_map", None
+        for k, v in obj.items():
+            yield prefix, "map_key", k
+            yield from _events_from_object(v, f"{prefix}.{k}" if prefix else k)
+        yield prefix, "end_map", None
+    elif isinstance(obj, list):
+        yield prefix, "start_array", None
+        item_prefix = f"{prefix}.item" if prefix else "item"
+        for v in obj:
+            yield from _events_from_object(v, item_prefix)
+        yield prefix, "end_array", None
+    elif obj is None:
+        yield prefix, "null", None
+    elif isinstance(obj, bool):
+        yield prefix, "boolean", obj
+    elif isinstance(obj, (int, float)):
+        yield prefix, "number", obj
+    else:
+        yield prefix, "string", obj
+
+
+def parse_events(fp):
+    """Yield ``(prefix, event, value)`` parser events for a binary file object."""
+    if ijson is not None:
+        return ijson.parse(fp, use_float=True)
+    return _events_from_object(json.load(fp))
+
+
+def scan_manifest(fp, preview_items=PREVIEW_ITEMS, on_progress=None):
+    """Stream ``fp`` once and return a ``ManifestSummary``.
+
+    ``on_progress(summary)`` is called every ``PROGRESS_EVERY`` parser events,
+    once more as soon as the first ``preview_items`` items are complete, and
+    at the end. Raises ``ValueError`` for a scalar (non list/dict) document.
+    An object without a "shipments" key is a single shipment (``root_type``
+    "shipment", counted as one).
+    """
+    summary = ManifestSummary()
+    builder = _BoundedBuilder(preview_items)
+    tell = getattr(fp, "tell", None)
+    has_shipments = False
+
+    for n, (prefix, event, value) in enumerate(parse_events(fp)):
+        if summary.root_type is None:
+            if event == "start_map":
+                summary.root_type = "dict"
+            elif event == "start_array":
+                summary.root_type = "list"
+            else:
+                raise ValueError("Unsupported JSON format")
+
+        if event == "start_map":
+            if prefix == "shipments.item":
+                summary.counts["shipments"] += 1
+            elif prefix == "item" and summary.root_type == "list":
+                summary.counts["batches"] += 1
+            else:
+                for level, suffix in _LEVELS:
+                    if prefix.endswith(suffix):
+                        summary.counts[level] += 1
+                        break
+        elif event == "map_key" and prefix == "" and value == "shipments":
+            has_shipments = True
+        elif event == "string" and summary.first_shipment_id is None:
+            # Same lookup the page used: shipments[0].batches[0].shipmentId, else root shipmentId
+            if prefix in ("shipments.item.batches.item.shipmentId", "shipmentId"):
+                summary.first_shipment_id = value
+
+        if not summary.preview_complete:
+            builder.event(event, value)
+            if summary.top_level_items > preview_items or (not builder.stack and builder.value is not None):
+                summary.preview_complete = True
+                if on_progress is not None:
+                    summary.preview = builder.value
+                    on_progress(summary)
+
+        if on_progress is not None and n % PROGRESS_EVERY == 0 and tell is not None:
+            summary.bytes_read = tell()
+            on_progress(summary)
+
+    if summary.root_type == "dict" and not has_shipments:
+        summary.root_type = "shipment"
+        summary.counts["shipments"] = 1
+    summary.preview = builder.value
+    summary.bytes_read = tell() if tell is not None else summary.bytes_read
+    summary.done = True
+    if on_progress is not None:
+        on_progress(summary)
+    return summary
+
+
+def iter_shipments(fp):
+    """Yield full shipment dicts from a ``{"shipments": [...]}`` manifest one at a time."""
+    if ijson is not None:
+        yield from ijson.items(fp, "shipments.item", use_float=True)
+    else:
+        yield from (json.load(fp).get("shipments") or [])
+
+
+def detect_root_type(fp):
+    """``ManifestSummary.root_type`` of ``fp`` without scanning the whole manifest when avoidable.
+
+    Stops at the root's "shipments" key or first list item; only a single
+    shipment object is read to the end (it is the whole item anyway).
+    """
+    root_type = None
+    for prefix, event, value in parse_events(fp):
+        if root_type is None:
+            if event == "start_array":
+                return "list"
+            if event != "start_map":
+                raise ValueError("Unsupported JSON format")
+            root_type = "dict"
+        elif event == "map_key" and prefix == "" and value == "shipments":
+            return "dict"
+    return "shipment"
+
+
+def iter_items(fp, root_type):
+    """Yield the top-level items one at a time: shipments of a dict manifest, batches of a list one, or the shipment."""
+    if root_type == "shipment":
+        yield from (ijson.items(fp, "", use_float=True) if ijson is not None else [json.load(fp)])
+    elif root_type != "list":
+        yield from iter_shipments(fp)
+    elif ijson is not None:
+        yield from ijson.items(fp, "item", use_float=True)
+    else:
+        yield from json.load(fp)
+
+
+def iter_ndjson(fp):
+    """Yield shipments from an NDJSON manifest (one shipment per line)."""
+    for line in fp:
+        if line.strip():
+            yield json.loads(line)
@@ -0,0 +1,272 @@
+"""Vectorised token-game simulation of the batch shipping Petri nets.
+
+``petri.ipynb`` builds its nets with pm4py only to draw them. ``CompiledNet``
+turns a net, arc weights included, into ``pre`` / ``post`` incidence
+matrices (transitions x places). ``simulate`` then plays the token game for
+thousands of independent markings at once: a marking matrix ``M`` (runs x
+places) enables transition ``t`` in a run where ``M >= pre[t]`` on every
+place. Each step fires one enabled transition per run, chosen at random in
+proportion to the transition weights (how often a choice such as QC pass /
+fail goes each way), with ``M += post[t] - pre[t]``.
+
+``SimulationResult.summary`` reports completion and deadlock rates, firings
+per batch and place occupancy. Given per-transition durations and hourly
+capacity, it also reports utilisation, the bottleneck transition and the
+maximum batches per day.
+
+The notebook's nets are in ``NETS`` (built from the same arcs, without
+pm4py), along with ``dpp_lifecycle``, the garment lifecycle net that
+``conformance`` replays DPP events against. ``from_pm4py`` compiles a pm4py
+``PetriNet`` when pm4py is installed.
+
+    python petri_sim.py batch_shipping --runs 10000 --batches-per-day 10000
+"""
+import argparse
+import json
+
+import numpy as np
+
+RUNS = 10000
+MAX_STEPS = 200
+SEED = 0
+HOURS_PER_DAY = 24
+
+
+class CompiledNet:
+    """Places, transitions and weighted pre/post incidence matrices of a Petri net."""
+
+    def __init__(self, name, places, transitions, arcs):
+        self.name = name
+        self.places = list(places)
+        self.transitions = list(transitions)
+        p_index = {p: i for i, p in enumerate(self.places)}
+        t_index = {t: i for i, t in enumerate(self.transitions)}
+        self.pre = np.zeros((len(self.transitions), len(self.places)), dtype=np.int64)
+        self.post = np.zeros_like(self.pre)
+        for src, dst, weight in arcs:
+            if src in p_index and dst in t_index:
+                self.pre[t_index[dst], p_index[src]] += weight
+            elif src in t_index and dst in p_index:
+                self.post[t_index[src], p_index[dst]] += weight
+            else:
+                raise ValueError(f"Arc {src!r} -> {dst!r} must join a place and a transition")
+        self.incidence = self.post - self.pre
+
+    def marking(self, tokens):
+        """Marking vector from ``{place: tokens}``."""
+        m = np.zeros(len(self.places), dtype=np.int64)
+        for place, n in (tokens or {}).items():
+            m[self.places.index(place)] = n
+        return m
+
+    def enabled(self, markings):
+        """``(runs x transitions)`` boolean matrix of enabled transitions."""
+        return (markings[:, None, :] >= self.pre[None, :, :]).all(axis=2)
+
+
+def from_pm4py(net):
+    """Compile a pm4py ``PetriNet`` (arc weights included)."""
+    arcs = [(a.source.name, a.target.name, getattr(a, "weight", 1)) for a in net.arcs]
+    return CompiledNet(
+        net.name,
+        sorted(p.name for p in net.places),
+        sorted(t.name for t in net.transitions),
+        arcs,
+    )
+
+
+# --- NOTEBOOK NETS ---
+def _chain(*nodes):
+    return [(a, b, 1) for a, b in zip(nodes, nodes[1:])]
+
+
+def batch_shipping():
+    arcs = _chain(
+        "p_orders_ready", "t_create_batch", "p_batch_created", "t_pick_batch", "p_picked",
+        "t_pack_batch", "p_packed", "t_label", "p_labeled", "t_ship", "p_shipped",
+    )
+    places = [a for a, _, _ in arcs if a.startswith("p_")] + ["p_shipped"]
+    transitions = [a for a, _, _ in arcs if a.startswith("t_")]
+    return CompiledNet("batch_shipping", places, transitions, arcs), {"p_orders_ready": 1}, {"p_shipped": 1}
+
+
+def batch_shipping_nonlinear():
+    # Same arcs as the notebook. As drawn, the start transitions shared by the domestic and
+    # international paths need tokens from both, so every run deadlocks after routing.
+    arcs = [(a, b, 1) for a, b in [
+        ("p_orders_ready", "t_create_batch"), ("t_create_batch", "p_batch_created"),
+        ("p_batch_created", "t_route_domestic"), ("t_route_domestic", "p_domestic"),
+        ("p_batch_created", "t_route_international"), ("t_route_international", "p_international"),
+        ("p_domestic", "t_start_pick"), ("t_start_pick", "p_pick_ready"),
+        ("p_domestic", "t_start_label"), ("t_start_label", "p_label_ready"),
+        ("p_domestic", "t_start_paperwork"), ("t_start_paperwork", "p_paperwork_ready"),
+        ("p_pick_ready", "t_pick_batch"), ("t_pick_batch", "p_picked"),
+        ("p_label_ready", "t_print_labels"), ("t_print_labels", "p_labeled"),
+        ("p_paperwork_ready", "t_prepare_paperwork"), ("t_prepare_paperwork", "p_paperwork_done"),
+        ("p_picked", "t_join_for_pack"), ("p_labeled", "t_join_for_pack"),
+        ("p_paperwork_done", "t_join_for_pack"), ("t_join_for_pack", "p_ready_to_pack"),
+        ("p_ready_to_pack", "t_pack"), ("t_pack", "p_packed"),
+        ("p_packed", "t_qc_pass"), ("t_qc_pass", "p_qc_passed"),
+        ("p_packed", "t_qc_fail"), ("t_qc_fail", "p_qc_failed"),
+        ("p_qc_failed", "t_repack"), ("t_repack", "p_packed"),
+        ("p_qc_passed", "t_ship"), ("t_ship", "p_shipped"),
+        ("p_international", "t_start_customs"), ("t_start_customs", "p_customs_ready"),
+        ("p_customs_ready", "t_prepare_customs"), ("t_prepare_customs", "p_customs_done"),
+        ("p_international", "t_start_pick"), ("p_international", "t_start_label"),
+        ("p_picked", "t_join_intl_for_pack"), ("p_labeled", "t_join_intl_for_pack"),
+        ("p_customs_done", "t_join_intl_for_pack"), ("t_join_intl_for_pack", "p_intl_ready_to_pack"),
+        ("p_intl_ready_to_pack", "t_pack"),
+    ]]
+    places = list(dict.fromkeys(n for arc in arcs for n in arc[:2] if n.startswith("p_")))
+    transitions = list(dict.fromkeys(n for arc in arcs for n in arc[:2] if n.startswith("t_")))
+    net = CompiledNet("batch_shipping_nonlinear", places, transitions, arcs)
+    return net, {"p_orders_ready": 1}, {"p_shipped": 1}
+
+
+def arc_weight_example():
+    net = CompiledNet(
+        "arc_weight_example", ["p_items", "p_batch"], ["t_create_batch"],
+        [("p_items", "t_create_batch", 3), ("t_create_batch", "p_batch", 1)],
+    )
+    return net, {"p_items": 6}, {"p_batch": 2}
+
+
+def dpp_lifecycle():
+    # Garment DPP lifecycle up to batching: raw material and components are made in parallel,
+    # joined at product assembly, then completion -> warehouse -> batch (the batch timestamp)
+    arcs = [(a, b, 1) for a, b in [
+        ("p_material", "t_harvest"), ("t_harvest", "p_harvested"),
+        ("p_harvested", "t_process"), ("t_process", "p_processed"),
+        ("p_component", "t_component_assembly"), ("t_component_assembly", "p_components_ready"),
+        ("p_processed", "t_product_assembly"), ("p_components_ready", "t_product_assembly"),
+        ("t_product_assembly", "p_assembled"),
+        ("p_assembled", "t_completion"), ("t_completion", "p_completed"),
+        ("p_completed", "t_warehouse"), ("t_warehouse", "p_warehoused"),
+        ("p_warehoused", "t_create_batch"), ("t_create_batch", "p_batched"),
+    ]]
+    places = list(dict.fromkeys(n for arc in arcs for n in arc[:2] if n.startswith("p_")))
+    transitions = list(dict.fromkeys(n for arc in arcs for n in arc[:2] if n.startswith("t_")))
+    net = CompiledNet("dpp_lifecycle", places, transitions, arcs)
+    return net, {"p_material": 1, "p_component": 1}, {"p_batched": 1}
+
+
+NETS = {
+    "batch_shipping": batch_shipping,
+    "batch_shipping_nonlinear": batch_shipping_nonlinear,
+    "arc_weight_example": arc_weight_example,
+    "dpp_lifecycle": dpp_lifecycle,
+}
+
+
+# --- SIMULATION ---
+class SimulationResult:
+    """Per-run outcome of a token-game simulation."""
+
+    def __init__(self, net, final, markings, firings, steps, occupancy):
+        self.net = net
+        self.markings = markings
+        self.firings = firings  # runs x transitions
+        self.steps = steps
+        self.occupancy = occupancy  # token-steps per place, summed over runs
+        dead = ~net.enabled(markings).any(axis=1)
+        self.completed = dead & (markings == final).all(axis=1) if final is not None else dead
+        self.deadlocked = dead & ~self.completed
+        self.truncated = ~dead
+
+    def summary(self, durations=None, capacity=None, batches_per_day=None):
+        """Completion, firings per batch and, with durations / capacity, throughput and bottleneck.
+
+        ``durations``: hours per firing of each transition; ``capacity``: parallel
+        servers per transition (default 1). Utilisation is for ``batches_per_day``.
+        """
+        runs = len(self.steps)
+        per_batch = self.firings.mean(axis=0)
+        out = {
+            "net": self.net.name,
+            "runs": runs,
+            "completed": float(self.completed.mean()),
+            "deadlocked": float(self.deadlocked.mean()),
+            "truncated": float(self.truncated.mean()),
+            "mean_steps": float(self.steps.mean()),
+            "firings_per_batch": {t: round(float(n), 4) for t, n in zip(self.net.transitions, per_batch)},
+            "mean_tokens": {
+                p: round(float(n), 4) for p, n in zip(self.net.places, self.occupancy / max(self.steps.sum(), 1))
+            },
+        }
+        if self.deadlocked.any():
+            stuck = self.markings[self.deadlocked].mean(axis=0)
+            out["deadlock_places"] = {p: round(float(n), 4) for p, n in zip(self.net.places, stuck) if n}
+        if durations:
+            hours = np.array([float(durations.get(t, 0.0)) for t in self.net.transitions])
+            servers = np.array([float((capacity or {}).get(t, 1)) for t in self.net.transitions])
+            work = per_batch * hours  # server-hours per batch
+            with np.errstate(divide="ignore"):
+                max_rate = np.where(work > 0, servers * HOURS_PER_DAY / work, np.inf)
+            b = int(np.argmin(max_rate))
+            out["hours_per_batch"] = round(float(work.sum()), 4)
+            out["bottleneck"] = self.net.transitions[b]
+            out["max_batches_per_day"] = float(max_rate[b])
+            if batches_per_day:
+                util = batches_per_day * work / (servers * HOURS_PER_DAY)
+                out["utilisation"] = {t: round(float(u), 4) for t, u in zip(self.net.transitions, util) if u}
+        return out
+
+
+def simulate(net, initial, final=None, runs=RUNS, max_steps=MAX_STEPS, weights=None, seed=SEED):
+    """Play the token game for ``runs`` independent copies of ``initial``.
+
+    ``weights`` (``{transition: weight}``, default 1) bias the choice among
+    enabled transitions. Runs stop when nothing is enabled or after
+    ``max_steps`` firings.
+    """
+    rng = np.random.default_rng(seed)
+    w = np.array([float((weights or {}).get(t, 1.0)) for t in net.transitions])
+    markings = np.tile(net.marking(initial), (runs, 1))
+    final = net.marking(final) if final is not None else None
+    firings = np.zeros((runs, len(net.transitions)), dtype=np.int64)
+    steps = np.zeros(runs, dtype=np.int64)
+    occupancy = np.zeros(len(net.places), dtype=np.float64)
+    active = np.arange(runs)
+
+    for _ in range(max_steps):
+        m = markings[active]
+        choice = net.enabled(m) * w
+        total = choice.sum(axis=1)
+        live = total > 0
+        active, m, choice, total = active[live], m[live], choice[live], total[live]
+        if not len(active):
+            break
+        # Roulette-wheel pick of one enabled transition per run
+        r = rng.random(len(active)) * total
+        t = (np.cumsum(choice, axis=1) > r[:, None]).argmax(axis=1)
+        occupancy += m.sum(axis=0)
+        markings[active] = m + net.incidence[t]
+        firings[active, t] += 1
+        steps[active] += 1
+
+    return SimulationResult(net, final, markings, firings, steps, occupancy)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate a batch shipping Petri net.")
+    parser.add_argument("net", choices=sorted(NETS))
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--max-steps", type=int, default=MAX_STEPS)
+    parser.add_argument("--weights", help='JSON {transition: weight}, e.g. {"t_qc_fail": 0.1, "t_qc_pass": 0.9}')
+    parser.add_argument("--durations", help="JSON {transition: hours per firing}")
+    parser.add_argument("--capacity", help="JSON {transition: parallel servers}")
+    parser.add_argument("--batches-per-day", type=float)
+    args = parser.parse_args()
+
+    net, initial, final = NETS[args.net]()
+    result = simulate(
+        net, initial, final, runs=args.runs, max_steps=args.max_steps,
+        weights=json.loads(args.weights) if args.weights else None,
+    )
+    durations = json.loads(args.durations) if args.durations else {t: 0.1 for t in net.transitions}
+    summary = result.summary(
+        durations=durations,
+        capacity=json.loads(args.capacity) if args.capacity else None,
+        batches_per_day=args.batches_per_day,
+    )
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,96 @@
+"""Cold-start and warm-rerun latency per dashboard page.
+
+Streamlit re-executes ``dashboard.py`` from the top on every interaction, so
+the cost of a page is the cost of one script run. ``PageTimings`` records
+those runs per page. The first run of a page in a process is "cold": it pays
+for that page's lazy imports and for filling its caches. Every later run of
+the page is "warm". This module is imported once per process, so ``TIMINGS``
+is shared by all sessions.
+
+With ``DASHBOARD_TIMINGS=1`` the dashboard logs each run to stderr and shows
+a timings table in the sidebar. Runs that end in ``st.rerun()`` are not
+recorded; the run they trigger is.
+"""
+import os
+import sys
+import threading
+from collections import defaultdict, deque
+
+ENABLED = os.environ.get("DASHBOARD_TIMINGS", "").strip().lower() not in ("", "0", "false", "no")
+# Warm samples kept per page for the percentiles
+WARM_WINDOW = 500
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+class PageTimings:
+    """Process-wide cold / warm script-run durations per page (seconds)."""
+
+    def __init__(self, window=WARM_WINDOW):
+        self._lock = threading.Lock()
+        self.cold = {}
+        self.warm = defaultdict(lambda: deque(maxlen=window))
+        self.warm_runs = defaultdict(int)
+
+    def record(self, page, seconds, log=ENABLED):
+        """Record one run of ``page``; returns "cold" or "warm"."""
+        with self._lock:
+            if page not in self.cold:
+                self.cold[page] = seconds
+                kind = "cold"
+            else:
+                self.warm[page].append(seconds)
+                self.warm_runs[page] += 1
+                kind = "warm"
+        if log:
+            print(f"[timings] {page}: {kind} run {seconds * 1000:.1f} ms", file=sys.stderr)
+        return kind
+
+    def summary(self):
+        """One row per page: cold ms, warm run count, warm p50 / p95 / last ms."""
+        with self._lock:
+            pages = list(self.cold.items())
+            warm = {page: list(self.warm[page]) for page, _ in pages}
+            runs = dict(self.warm_runs)
+        rows = []
+        for page, cold in pages:
+            samples = warm[page]
+            ordered = sorted(samples)
+            ms = lambda s: None if s is None else round(s * 1000, 1)
+            rows.append({
+                "page": page,
+                "cold_ms": ms(cold),
+                "warm_runs": runs.get(page, 0),
+                "warm_p50_ms": ms(_percentile(ordered, 50)),
+                "warm_p95_ms": ms(_percentile(ordered, 95)),
+                "last_ms": ms(samples[-1] if samples else cold),
+            })
+        return rows
+
+    def markdown(self):
+        """The summary as a Markdown table (no pandas needed to render it)."""
+        rows = self.summary()
+        if not rows:
+            return "No page runs recorded yet."
+        dash = lambda v: "–" if v is None else f"{v:,}"
+        lines = ["| Page | Cold ms | Warm runs | Warm p50 ms | Warm p95 ms | Last ms |", "|---|---:|---:|---:|---:|---:|"]
+        for r in rows:
+            lines.append(
+                f"| {r['page']} | {dash(r['cold_ms'])} | {r['warm_runs']} | {dash(r['warm_p50_ms'])} "
+                f"| {dash(r['warm_p95_ms'])} | {dash(r['last_ms'])} |"
+            )
+        return "\n".join(lines)
+
+    def reset(self):
+        with self._lock:
+            self.cold.clear()
+            self.warm.clear()
+            self.warm_runs.clear()
+
+
+TIMINGS = PageTimings()
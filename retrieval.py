@@ -0,0 +1,276 @@
+"""Persistent vector index for the agents' knowledge tools.
+
+The workflow downloads its knowledge documents ("Download file",
+"Download file1") on every execution, re-embeds them with "Embeddings
+OpenAI" and inserts them into in-memory vector stores, so every run pays the
+full embedding cost before the first Route_Knowledge / DPP_knowledge query.
+
+``VectorIndex`` keeps one collection on disk as plain files: unit-normalised
+float32 vectors in ``vectors.npy`` (opened with ``mmap_mode="r"``), chunk
+text and metadata in ``chunks.jsonl``, and a ``meta.json`` written last.
+Each chunk carries a hash of its text and the embedder, so ``update`` only
+embeds chunks it has not seen; unchanged documents cost a hash, not a model
+call. ``search`` scores a batch of queries against the mmap in row blocks and
+keeps the top k per query.
+
+Embedders are pluggable: ``OpenAIEmbedder`` (the workflow's
+text-embedding-ada-002) and ``HashingEmbedder``, a deterministic local
+feature-hashing embedder for offline runs.
+
+    python retrieval.py index knowledge/route_knowledge docs/ports.md --embedder hashing
+    python retrieval.py search knowledge/route_knowledge "Genoa port access" -k 4 --embedder hashing
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+import requests
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+CHUNKS_FILE = "chunks.jsonl"
+VECTORS_FILE = "vectors.npy"
+
+# Same defaults as the n8n text splitter
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+EMBED_BATCH = 64
+# Vectors scored per block during search
+SEARCH_BLOCK_ROWS = 65536
+TOP_K = 4
+
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
+EMBEDDING_MODEL = "text-embedding-ada-002"
+
+_TOKEN = re.compile(r"\w+")
+
+
+# --- CHUNKING ---
+def chunk_text(text, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """Split ``text`` into windows of about ``size`` characters, ending at whitespace where possible."""
+    text = text.strip()
+    chunks, start = [], 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            cut = max(text.rfind("\n\n", start, end), text.rfind(" ", start, end))
+            if cut > start + size // 2:
+                end = cut
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def chunk_hash(text, embedder_name):
+    return hashlib.sha256(f"{embedder_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+def read_document(path):
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+# --- EMBEDDERS ---
+class HashingEmbedder:
+    """Deterministic feature-hashing embedder (words and word bigrams, signed buckets)."""
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _bucket(self, feature):
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        return h % self.dim, 1.0 if (h >> 63) & 1 else -1.0
+
+    def embed(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            words = _TOKEN.findall(text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                j, sign = self._bucket(feature)
+                out[i, j] += sign
+        return out
+
+
+class OpenAIEmbedder:
+    """OpenAI-compatible ``/embeddings`` client, batched."""
+
+    def __init__(self, model=EMBEDDING_MODEL, base_url=OPENAI_BASE_URL, api_key=None, timeout=60):
+        self.model = model
+        self.name = f"openai-{model}"
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY", "")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def embed(self, texts):
+        resp = self.session.post(
+            f"{self.base_url}/embeddings",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={"model": self.model, "input": list(texts)},
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        data = sorted(resp.json()["data"], key=lambda d: d["index"])
+        return np.array([d["embedding"] for d in data], dtype=np.float32)
+
+
+def _normalise(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+
+# --- INDEX ---
+class VectorIndex:
+    """One knowledge collection on disk: mmap'd vectors plus chunk records."""
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = {}
+        self.chunks = []
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        if os.path.exists(os.path.join(path, META_FILE)):
+            self._load()
+
+    def _load(self):
+        with open(os.path.join(self.path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("formatVersion") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported vector index format: {meta.get('formatVersion')!r}")
+        with open(os.path.join(self.path, CHUNKS_FILE), "r", encoding="utf-8") as f:
+            chunks = [json.loads(line) for line in f]
+        vectors = np.load(os.path.join(self.path, VECTORS_FILE), mmap_mode="r")
+        if len(chunks) != len(vectors):
+            raise ValueError(f"Vector index at {self.path} is inconsistent")
+        self.meta, self.chunks, self.vectors = meta, chunks, vectors
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def _save(self, chunks, vectors, embedder_name):
+        os.makedirs(self.path, exist_ok=True)
+        tmp = os.path.join(self.path, f".{VECTORS_FILE}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, vectors)
+        os.replace(tmp, os.path.join(self.path, VECTORS_FILE))
+        tmp = os.path.join(self.path, f".{CHUNKS_FILE}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for c in chunks:
+                f.write(json.dumps(c, ensure_ascii=False) + "\n")
+        os.replace(tmp, os.path.join(self.path, CHUNKS_FILE))
+        # meta.json is written last so a reader never sees it ahead of its files
+        meta = {"formatVersion": FORMAT_VERSION, "embedder": embedder_name, "dim": int(vectors.shape[1]),
+                "chunks": len(chunks), "updated": time.time()}
+        tmp = os.path.join(self.path, f".{META_FILE}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(self.path, META_FILE))
+        self._load()
+
+    def update(self, documents, embedder, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+        """Index ``{source: text}``; returns how many chunks had to be embedded.
+
+        The collection is replaced by the given documents, but chunks whose
+        hash is already indexed keep their stored vector.
+        """
+        known = {c["hash"]: i for i, c in enumerate(self.chunks)}
+        chunks = []
+        for source, text in documents.items():
+            for n, piece in enumerate(chunk_text(text, size, overlap)):
+                chunks.append({"source": source, "chunk": n, "hash": chunk_hash(piece, embedder.name), "text": piece})
+
+        new = [i for i, c in enumerate(chunks) if c["hash"] not in known]
+        dim = self.vectors.shape[1] if len(self.vectors) else None
+        fresh = {}
+        for start in range(0, len(new), EMBED_BATCH):
+            batch = new[start:start + EMBED_BATCH]
+            vectors = _normalise(np.asarray(embedder.embed([chunks[i]["text"] for i in batch]), dtype=np.float32))
+            dim = vectors.shape[1]
+            fresh.update(zip(batch, vectors))
+        if dim is None:
+            dim = 0
+
+        out = np.empty((len(chunks), dim), dtype=np.float32)
+        for i, c in enumerate(chunks):
+            out[i] = fresh[i] if i in fresh else self.vectors[known[c["hash"]]]
+        unchanged = [c["hash"] for c in chunks] == [c["hash"] for c in self.chunks]
+        if not unchanged or not os.path.exists(os.path.join(self.path, META_FILE)):
+            self._save(chunks, out, embedder.name)
+        return len(new)
+
+    def search(self, queries, embedder, k=TOP_K):
+        """Top ``k`` chunks per query as ``[[(score, chunk), ...], ...]`` (cosine similarity)."""
+        if isinstance(queries, str):
+            queries = [queries]
+        if not len(self.chunks):
+            return [[] for _ in queries]
+        if self.meta.get("embedder") != embedder.name:
+            raise ValueError(f"Index was built with {self.meta.get('embedder')!r}, not {embedder.name!r}")
+        q = _normalise(np.asarray(embedder.embed(list(queries)), dtype=np.float32))
+        k = min(k, len(self.chunks))
+        best_scores = np.full((len(q), k), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(q), k), dtype=np.int64)
+        for start in range(0, len(self.vectors), SEARCH_BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + SEARCH_BLOCK_ROWS])
+            scores = np.concatenate([best_scores, q @ block.T], axis=1)
+            rows = np.concatenate([best_rows, np.broadcast_to(np.arange(start, start + len(block)), (len(q), len(block)))], axis=1)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_rows = np.take_along_axis(rows, top, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        return [
+            [(float(s), self.chunks[r]) for s, r in zip(best_scores[i], best_rows[i])]
+            for i in range(len(q))
+        ]
+
+
+def make_embedder(name):
+    if name == "openai":
+        return OpenAIEmbedder()
+    if name.startswith("hashing"):
+        dim = name.partition("-")[2]
+        return HashingEmbedder(int(dim)) if dim else HashingEmbedder()
+    raise ValueError(f"Unknown embedder: {name!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Persistent vector index for knowledge documents.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    idx = sub.add_parser("index", help="Index documents (files or directories of .txt / .md)")
+    idx.add_argument("path")
+    idx.add_argument("documents", nargs="+")
+    idx.add_argument("--embedder", default="openai", help="openai, hashing or hashing-<dim>")
+    search = sub.add_parser("search", help="Query a collection")
+    search.add_argument("path")
+    search.add_argument("query", nargs="+")
+    search.add_argument("-k", type=int, default=TOP_K)
+    search.add_argument("--embedder", default="openai")
+    args = parser.parse_args()
+
+    embedder = make_embedder(args.embedder)
+    index = VectorIndex(args.path)
+    started = time.perf_counter()
+    if args.cmd == "index":
+        files = []
+        for p in args.documents:
+            if os.path.isdir(p):
+                files += sorted(os.path.join(p, f) for f in os.listdir(p) if f.endswith((".txt", ".md")))
+            else:
+                files.append(p)
+        embedded = index.update({f: read_document(f) for f in files}, embedder)
+        print(f"{len(index)} chunks from {len(files)} documents, {embedded} embedded in {time.perf_counter() - started:.2f}s")
+    else:
+        for query, hits in zip(args.query, index.search(args.query, embedder, args.k)):
+            print(f"# {query}")
+            for score, chunk in hits:
+                print(f"{score:.3f}  {chunk['source']}#{chunk['chunk']}  {chunk['text'][:100]!r}")
@@ -0,0 +1,499 @@
+"""Precomputed route index for the logistics network.
+
+Build step for the fixed "Logistics Network" graph. Shortest paths for the
+``timeHours`` and ``costEUR`` weights are computed once, as an all-pairs table
+for small networks or as contraction hierarchies for larger ones, and saved as
+plain ``.npy`` arrays plus a ``meta.json``. Workers open the arrays with
+``mmap_mode="r"`` so loading is a few file opens and a route query is a table
+lookup (all-pairs) or two short upward searches (contraction hierarchies).
+
+When edges change, ``update_edges`` recomputes only the origins whose
+shortest-path tree is affected (all-pairs) or re-contracts the graph (CH).
+
+    python route_index.py network.json route_index/
+"""
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import os
+
+import numpy as np
+
+from routing import NO_PRED, WEIGHT_KEYS, RoutingGraph
+
+INDEX_WEIGHT_KEYS = ("timeHours", "costEUR")
+
+# Above this many ports the n x n tables get too large; use contraction hierarchies
+ALL_PAIRS_MAX_NODES = 1024
+
+# Witness searches during contraction give up after settling this many nodes
+WITNESS_SETTLE_LIMIT = 500
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+
+
+# --- EDGE TABLE HELPERS ---
+def _node_names(nodes):
+    return [n.get("city") if isinstance(n, dict) else n for n in nodes or []]
+
+
+def _edge_table(edges):
+    # (from, to) -> (distanceKm, timeHours, costEUR); last duplicate wins like buildGraph()
+    return {(e["from"], e["to"]): tuple(float(e[k]) for k in WEIGHT_KEYS) for e in edges or []}
+
+
+def _fingerprint(names, table):
+    payload = json.dumps([names, sorted([list(k) + list(v) for k, v in table.items()])])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _edge_arrays(graph):
+    # Original edges as CSR with targets sorted per row, so lookups can bisect
+    n = len(graph)
+    offsets = np.asarray(graph.offsets, dtype=np.int64)
+    targets = np.asarray(graph.targets, dtype=np.int32)
+    weights = np.column_stack([np.asarray(graph.weights[k], dtype=np.float64) for k in WEIGHT_KEYS])
+    rows = np.repeat(np.arange(n), np.diff(offsets))
+    order = np.lexsort((targets, rows))
+    return {
+        "edge_offsets": offsets,
+        "edge_targets": targets[order],
+        "edge_weights": weights[order].reshape(-1, len(WEIGHT_KEYS)),
+    }
+
+
+def _csr_find(offsets, targets, u, v):
+    a, b = int(offsets[u]), int(offsets[u + 1])
+    pos = a + int(np.searchsorted(targets[a:b], v))
+    if pos < b and targets[pos] == v:
+        return pos
+    return None
+
+
+# --- ALL-PAIRS TABLES ---
+def _fill_row(graph, key, s, dist, pred, totals):
+    d, p = graph.shortest_path_tree(s, key, cache=False)
+    dist[s] = d
+    pred[s] = p
+
+    # Accumulate (distanceKm, timeHours, costEUR) down the tree from the origin
+    children = {}
+    for v, u in enumerate(p):
+        if u != NO_PRED:
+            children.setdefault(u, []).append(v)
+    row = totals[s]
+    row[:] = 0.0
+    stack = [s]
+    while stack:
+        u = stack.pop()
+        for v in children.get(u, ()):
+            row[v] = row[u] + graph.edge_weights(u, v)
+            stack.append(v)
+
+
+def _build_all_pairs(graph, key):
+    n = len(graph)
+    dist = np.full((n, n), np.inf)
+    pred = np.full((n, n), NO_PRED, dtype=np.int32)
+    totals = np.zeros((n, n, len(WEIGHT_KEYS)))
+    for s in range(n):
+        _fill_row(graph, key, s, dist, pred, totals)
+    return {f"dist_{key}": dist, f"pred_{key}": pred, f"totals_{key}": totals}
+
+
+# --- CONTRACTION HIERARCHIES ---
+def _contract(n, edge_list):
+    """Contract all nodes; return rank plus upward/downward edge dicts per node.
+
+    ``up[x]`` maps higher-ranked targets to ``(weight, mid)`` and ``down[x]``
+    maps higher-ranked sources to ``(weight, mid)``; ``mid`` is the contracted
+    node a shortcut bypasses, or -1 for an original edge.
+    """
+    out = [dict() for _ in range(n)]
+    inc = [dict() for _ in range(n)]
+    for u, v, w in edge_list:
+        if u != v and w < out[u].get(v, (math.inf,))[0]:
+            out[u][v] = (w, -1)
+            inc[v][u] = (w, -1)
+
+    rank = [-1] * n
+    deleted_neighbours = [0] * n
+    up = [None] * n
+    down = [None] * n
+
+    def witness_dist(u, x, limit, targets):
+        dist = {u: 0.0}
+        heap = [(0.0, u)]
+        remaining = set(targets)
+        settled = 0
+        while heap and remaining and settled < WITNESS_SETTLE_LIMIT:
+            d, a = heapq.heappop(heap)
+            if d > dist[a]:
+                continue
+            if d > limit:
+                break
+            settled += 1
+            remaining.discard(a)
+            for b, (w, _mid) in out[a].items():
+                if b == x:
+                    continue
+                nd = d + w
+                if nd < dist.get(b, math.inf):
+                    dist[b] = nd
+                    heapq.heappush(heap, (nd, b))
+        return dist
+
+    def shortcuts(x):
+        result = []
+        for u, (wu, _mid) in inc[x].items():
+            cands = {v: wu + wv for v, (wv, _m) in out[x].items() if v != u}
+            if not cands:
+                continue
+            dist = witness_dist(u, x, max(cands.values()), cands)
+            for v, w in cands.items():
+                if dist.get(v, math.inf) > w:
+                    result.append((u, v, w))
+        return result
+
+    def priority(x):
+        sc = shortcuts(x)
+        return len(sc) - len(inc[x]) - len(out[x]) + deleted_neighbours[x], sc
+
+    heap = [(priority(x)[0], x) for x in range(n)]
+    heapq.heapify(heap)
+    next_rank = 0
+    while heap:
+        _p, x = heapq.heappop(heap)
+        if rank[x] >= 0:
+            continue
+        # Lazy update: re-evaluate and defer if x is no longer the cheapest node
+        p, sc = priority(x)
+        if heap and p > heap[0][0]:
+            heapq.heappush(heap, (p, x))
+            continue
+
+        rank[x] = next_rank
+        next_rank += 1
+        up[x] = out[x]
+        down[x] = inc[x]
+        for v in up[x]:
+            del inc[v][x]
+            deleted_neighbours[v] += 1
+        for u in down[x]:
+            del out[u][x]
+            deleted_neighbours[u] += 1
+        out[x], inc[x] = {}, {}
+        for u, v, w in sc:
+            if w < out[u].get(v, (math.inf,))[0]:
+                out[u][v] = (w, x)
+                inc[v][u] = (w, x)
+    return rank, up, down
+
+
+def _ch_csr(adj):
+    offsets = np.zeros(len(adj) + 1, dtype=np.int64)
+    targets, weights, mids = [], [], []
+    for x, row in enumerate(adj):
+        for v in sorted(row):
+            w, mid = row[v]
+            targets.append(v)
+            weights.append(w)
+            mids.append(mid)
+        offsets[x + 1] = len(targets)
+    return (offsets, np.asarray(targets, dtype=np.int32),
+            np.asarray(weights, dtype=np.float64), np.asarray(mids, dtype=np.int32))
+
+
+def _build_ch(graph, key):
+    edge_list = []
+    weights = graph.weights[key]
+    for u in range(len(graph)):
+        for pos in range(graph.offsets[u], graph.offsets[u + 1]):
+            edge_list.append((u, graph.targets[pos], weights[pos]))
+    rank, up, down = _contract(len(graph), edge_list)
+
+    arrays = {f"rank_{key}": np.asarray(rank, dtype=np.int32)}
+    for name, adj in (("up", up), ("down", down)):
+        offsets, targets, ws, mids = _ch_csr(adj)
+        arrays[f"{name}_offsets_{key}"] = offsets
+        arrays[f"{name}_targets_{key}"] = targets
+        arrays[f"{name}_weights_{key}"] = ws
+        arrays[f"{name}_mids_{key}"] = mids
+    return arrays
+
+
+# --- INDEX ---
+class RouteIndex:
+    """Shortest-path index over a fixed port network.
+
+    Exposes the same ``path()`` / ``sum_along_path()`` interface as
+    ``routing.RoutingGraph``, so ``routing.route_shipments(shipments,
+    graph=index)`` answers from the precomputed tables.
+    """
+
+    def __init__(self, meta, arrays, path=None):
+        self.meta = meta
+        self.arrays = arrays
+        self.path_on_disk = path
+        self.names = list(meta["names"])
+        self.index = {n: i for i, n in enumerate(self.names)}
+        self.method = meta["method"]
+        self.weight_keys = tuple(meta["weightKeys"])
+
+    def __len__(self):
+        return len(self.names)
+
+    # --- build / persist ---
+    @classmethod
+    def build(cls, edges, nodes=None, weight_keys=INDEX_WEIGHT_KEYS, method="auto"):
+        graph = RoutingGraph(edges, nodes=nodes)
+        if method == "auto":
+            method = "all_pairs" if len(graph) <= ALL_PAIRS_MAX_NODES else "ch"
+        if method not in ("all_pairs", "ch"):
+            raise ValueError(f"Unknown route index method: {method!r}")
+
+        arrays = _edge_arrays(graph)
+        for key in weight_keys:
+            arrays.update(_build_all_pairs(graph, key) if method == "all_pairs" else _build_ch(graph, key))
+
+        meta = {
+            "formatVersion": FORMAT_VERSION,
+            "method": method,
+            "names": graph.names,
+            "weightKeys": list(weight_keys),
+            "fingerprint": _fingerprint(graph.names, _edge_table(edges)),
+        }
+        return cls(meta, arrays)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name, arr in self.arrays.items():
+            tmp = os.path.join(path, f".{name}.npy.tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, np.asarray(arr))
+            os.replace(tmp, os.path.join(path, f"{name}.npy"))
+        # meta.json is written last so a reader never sees it ahead of its arrays
+        tmp = os.path.join(path, f".{META_FILE}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(dict(self.meta, arrays=sorted(self.arrays)), f)
+        os.replace(tmp, os.path.join(path, META_FILE))
+        self.path_on_disk = path
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("formatVersion") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported route index format: {meta.get('formatVersion')!r}")
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in meta.pop("arrays")
+        }
+        return cls(meta, arrays, path=path)
+
+    # --- invalidation ---
+    def is_stale(self, edges, nodes=None):
+        names = list(self.names)
+        table = _edge_table(edges)
+        for n in _node_names(nodes) + [x for pair in table for x in pair]:
+            if n is not None and n not in self.index and n not in names:
+                names.append(n)
+        return _fingerprint(names, table) != self.meta["fingerprint"]
+
+    def _current_edge_table(self):
+        offsets = self.arrays["edge_offsets"]
+        targets = self.arrays["edge_targets"]
+        weights = self.arrays["edge_weights"]
+        table = {}
+        for u in range(len(self.names)):
+            for pos in range(int(offsets[u]), int(offsets[u + 1])):
+                table[(self.names[u], self.names[int(targets[pos])])] = tuple(float(w) for w in weights[pos])
+        return table
+
+    def update_edges(self, edges, nodes=None):
+        """Bring the index in line with ``edges``; return the recomputed origin names.
+
+        All-pairs indexes only recompute rows whose tree used a changed edge or
+        that a cheaper edge now improves. New ports, or a CH index, trigger a
+        full rebuild. The index is re-saved if it was loaded from disk.
+        """
+        new_table = _edge_table(edges)
+        old_table = self._current_edge_table()
+        changed = {k for k in set(old_table) | set(new_table) if old_table.get(k) != new_table.get(k)}
+        new_nodes = [n for n in _node_names(nodes) + [x for pair in new_table for x in pair] if n not in self.index]
+        if not changed and not new_nodes:
+            return []
+
+        if new_nodes or self.method != "all_pairs":
+            rebuilt = RouteIndex.build(
+                edges,
+                nodes=list(self.names) + _node_names(nodes),
+                weight_keys=self.weight_keys,
+                method="auto" if new_nodes else self.method,
+            )
+            self.__init__(rebuilt.meta, rebuilt.arrays, self.path_on_disk)
+            recomputed = list(self.names)
+        else:
+            graph = RoutingGraph(edges, nodes=self.names)
+            arrays = {name: np.array(arr) for name, arr in self.arrays.items()}
+            arrays.update(_edge_arrays(graph))
+            affected = np.zeros(len(self.names), dtype=bool)
+            for key in self.weight_keys:
+                ki = WEIGHT_KEYS.index(key)
+                dist = arrays[f"dist_{key}"]
+                pred = arrays[f"pred_{key}"]
+                rows = np.zeros(len(self.names), dtype=bool)
+                for a, b in changed:
+                    u, v = self.index[a], self.index[b]
+                    w_new = new_table.get((a, b), (math.inf,) * len(WEIGHT_KEYS))[ki]
+                    rows |= pred[:, v] == u
+                    rows |= dist[:, u] + w_new < dist[:, v]
+                for s in np.flatnonzero(rows):
+                    _fill_row(graph, key, int(s), dist, pred, arrays[f"totals_{key}"])
+                affected |= rows
+            self.arrays = arrays
+            self.meta["fingerprint"] = _fingerprint(self.names, new_table)
+            recomputed = [self.names[i] for i in np.flatnonzero(affected)]
+
+        if self.path_on_disk:
+            self.save(self.path_on_disk)
+        return recomputed
+
+    # --- queries ---
+    def path(self, origin, destination, weight_key):
+        """Return ``(total_weight, [node names])`` or ``(inf, [])`` if unreachable."""
+        if weight_key not in self.weight_keys:
+            raise KeyError(f"Route index has no {weight_key!r} weight")
+        if origin == destination:
+            return 0.0, [origin]
+        u = self.index.get(origin)
+        v = self.index.get(destination)
+        if u is None or v is None:
+            return math.inf, []
+
+        if self.method == "all_pairs":
+            total = float(self.arrays[f"dist_{weight_key}"][u, v])
+            if total == math.inf:
+                return math.inf, []
+            pred = self.arrays[f"pred_{weight_key}"][u]
+            idx = [v]
+            while idx[-1] != u:
+                idx.append(int(pred[idx[-1]]))
+            idx.reverse()
+            return total, [self.names[i] for i in idx]
+
+        total, idx = self._ch_query(u, v, weight_key)
+        return total, [self.names[i] for i in idx]
+
+    def totals(self, origin, destination, weight_key):
+        """Return ``(distanceKm, timeHours, costEUR)`` along the indexed route."""
+        if self.method == "all_pairs" and origin in self.index and destination in self.index:
+            row = self.arrays[f"totals_{weight_key}"][self.index[origin], self.index[destination]]
+            return tuple(float(x) for x in row)
+        return self.sum_along_path(self.path(origin, destination, weight_key)[1])
+
+    def sum_along_path(self, path):
+        """Return ``(distanceKm, timeHours, costEUR)`` summed over a path of names."""
+        offsets = self.arrays["edge_offsets"]
+        targets = self.arrays["edge_targets"]
+        weights = self.arrays["edge_weights"]
+        total = np.zeros(len(WEIGHT_KEYS))
+        for a, b in zip(path, path[1:]):
+            total += weights[_csr_find(offsets, targets, self.index[a], self.index[b])]
+        return tuple(float(x) for x in total)
+
+    def _ch_search(self, start, direction, key):
+        offsets = self.arrays[f"{direction}_offsets_{key}"]
+        targets = self.arrays[f"{direction}_targets_{key}"]
+        weights = self.arrays[f"{direction}_weights_{key}"]
+        dist = {start: 0.0}
+        pred = {}
+        heap = [(0.0, start)]
+        while heap:
+            d, x = heapq.heappop(heap)
+            if d > dist[x]:
+                continue
+            for pos in range(int(offsets[x]), int(offsets[x + 1])):
+                y = int(targets[pos])
+                nd = d + float(weights[pos])
+                if nd < dist.get(y, math.inf):
+                    dist[y] = nd
+                    pred[y] = x
+                    heapq.heappush(heap, (nd, y))
+        return dist, pred
+
+    def _ch_mid(self, a, b, key):
+        # Edge a -> b lives in up[a] if b ranks higher, otherwise in down[b]
+        rank = self.arrays[f"rank_{key}"]
+        if rank[b] > rank[a]:
+            owner, other, direction = a, b, "up"
+        else:
+            owner, other, direction = b, a, "down"
+        pos = _csr_find(self.arrays[f"{direction}_offsets_{key}"], self.arrays[f"{direction}_targets_{key}"], owner, other)
+        return int(self.arrays[f"{direction}_mids_{key}"][pos])
+
+    def _ch_query(self, u, v, key):
+        df, pf = self._ch_search(u, "up", key)
+        db, pb = self._ch_search(v, "down", key)
+        best, meet = math.inf, None
+        for x, d in df.items():
+            total = d + db.get(x, math.inf)
+            if total < best:
+                best, meet = total, x
+        if meet is None:
+            return math.inf, []
+
+        hops = [meet]
+        while hops[-1] != u:
+            hops.append(pf[hops[-1]])
+        hops.reverse()
+        while hops[-1] != v:
+            hops.append(pb[hops[-1]])
+
+        # Unpack shortcuts back into original edges
+        path = [u]
+        for a, b in zip(hops, hops[1:]):
+            stack = [(a, b)]
+            while stack:
+                x, y = stack.pop()
+                mid = self._ch_mid(x, y, key)
+                if mid < 0:
+                    path.append(y)
+                else:
+                    stack.append((mid, y))
+                    stack.append((x, mid))
+        return best, path
+
+
+def load_or_build(path, edges, nodes=None, method="auto"):
+    """Open the index at ``path``, updating it if ``edges`` changed, or build it."""
+    if os.path.exists(os.path.join(path, META_FILE)):
+        index = RouteIndex.load(path)
+        if index.is_stale(edges, nodes):
+            index.update_edges(edges, nodes)
+        return index
+    index = RouteIndex.build(edges, nodes=nodes, method=method)
+    index.save(path)
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the route index from a Logistics Network JSON file.")
+    parser.add_argument("network", help="JSON with 'nodes' and 'edges' (the Logistics Network node output)")
+    parser.add_argument("out_dir", help="Directory to write the index to")
+    parser.add_argument("--method", choices=("auto", "all_pairs", "ch"), default="auto")
+    args = parser.parse_args()
+
+    with open(args.network, "r", encoding="utf-8") as f:
+        network = json.load(f)
+    if os.path.exists(os.path.join(args.out_dir, META_FILE)):
+        index = RouteIndex.load(args.out_dir)
+        recomputed = index.update_edges(network.get("edges"), network.get("nodes"))
+        print(f"Updated {args.out_dir}: {len(recomputed)} origin(s) recomputed")
+    else:
+        index = RouteIndex.build(network.get("edges"), network.get("nodes"), method=args.method)
+        index.save(args.out_dir)
+        print(f"Built {index.method} index for {len(index)} ports in {args.out_dir}")
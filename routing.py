@@ -0,0 +1,217 @@
+"""Batch routing engine for the logistics network.
+
+Python counterpart of the "Dijkstra Solver" n8n node (solver.js). The graph is
+built once into integer-indexed arrays, one shortest-path tree is computed per
+(origin, weightKey) pair and paths are rebuilt from predecessor arrays, so a
+manifest with thousands of shipments over the same ports only runs Dijkstra
+once per distinct origin and weight.
+"""
+import heapq
+import json
+import math
+import sys
+from decimal import Decimal, ROUND_HALF_UP
+
+import tracing
+
+WEIGHT_KEYS = ("distanceKm", "timeHours", "costEUR")
+
+NO_PRED = -1
+
+
+def weight_key_for_priority(priority):
+    # Same rule as solver.js: express/high optimise time, everything else cost
+    pr = str(priority if priority is not None else "low").lower()
+    return "timeHours" if pr in ("express", "high") else "costEUR"
+
+
+def _to_fixed_1(x):
+    # Number(x.toFixed(1)): rounds the exact binary value half away from zero
+    return float(Decimal(x).quantize(Decimal("0.1"), rounding=ROUND_HALF_UP))
+
+
+class RoutingGraph:
+    """Logistics network compiled to CSR adjacency arrays.
+
+    Nodes are addressed by integer index (``index[name]``); edges of node ``u``
+    live in ``targets[offsets[u]:offsets[u + 1]]`` with one weight array per
+    entry of ``WEIGHT_KEYS``.
+    """
+
+    def __init__(self, edges, nodes=None):
+        self.names = []
+        self.index = {}
+        for n in nodes or []:
+            self._add_node(n.get("city") if isinstance(n, dict) else n)
+
+        # Last edge wins for duplicate (from, to) pairs, like buildGraph() in solver.js
+        adjacency = {}
+        for e in edges or []:
+            u = self._add_node(e["from"])
+            v = self._add_node(e["to"])
+            adjacency.setdefault(u, {})[v] = tuple(float(e[k]) for k in WEIGHT_KEYS)
+
+        self.offsets = [0] * (len(self.names) + 1)
+        self.targets = []
+        self.weights = {k: [] for k in WEIGHT_KEYS}
+        for u in range(len(self.names)):
+            for v, ws in adjacency.get(u, {}).items():
+                self.targets.append(v)
+                for k, w in zip(WEIGHT_KEYS, ws):
+                    self.weights[k].append(w)
+            self.offsets[u + 1] = len(self.targets)
+
+        self._edge_pos = {}
+        for u in range(len(self.names)):
+            for pos in range(self.offsets[u], self.offsets[u + 1]):
+                self._edge_pos[(u, self.targets[pos])] = pos
+
+        self._trees = {}
+
+    def _add_node(self, name):
+        if name is None:
+            return None
+        if name not in self.index:
+            self.index[name] = len(self.names)
+            self.names.append(name)
+        return self.index[name]
+
+    def __len__(self):
+        return len(self.names)
+
+    def edge_weights(self, u, v):
+        """Return ``(distanceKm, timeHours, costEUR)`` for the edge u -> v."""
+        pos = self._edge_pos[(u, v)]
+        return tuple(self.weights[k][pos] for k in WEIGHT_KEYS)
+
+    def shortest_path_tree(self, origin, weight_key, cache=True):
+        """Return ``(dist, pred)`` arrays from ``origin`` (an index) for ``weight_key``.
+
+        Trees are cached per (origin, weight_key) for the lifetime of the graph
+        unless ``cache`` is False (used by bulk builds such as route_index.py).
+        """
+        key = (origin, weight_key)
+        tree = self._trees.get(key)
+        if tree is None:
+            tree = self._dijkstra(origin, self.weights[weight_key])
+            if cache:
+                self._trees[key] = tree
+        return tree
+
+    def _dijkstra(self, origin, weights):
+        n = len(self.names)
+        dist = [math.inf] * n
+        pred = [NO_PRED] * n
+        done = [False] * n
+        offsets, targets = self.offsets, self.targets
+
+        dist[origin] = 0.0
+        heap = [(0.0, origin)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if done[u]:
+                continue
+            done[u] = True
+            for pos in range(offsets[u], offsets[u + 1]):
+                v = targets[pos]
+                nd = d + weights[pos]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = u
+                    heapq.heappush(heap, (nd, v))
+        return dist, pred
+
+    def path(self, origin, destination, weight_key):
+        """Return ``(total_weight, [node names])`` or ``(inf, [])`` if unreachable."""
+        if origin == destination:
+            return 0.0, [origin]
+        u = self.index.get(origin)
+        v = self.index.get(destination)
+        if u is None or v is None:
+            return math.inf, []
+
+        dist, pred = self.shortest_path_tree(u, weight_key)
+        if dist[v] == math.inf:
+            return math.inf, []
+
+        idx = [v]
+        while idx[-1] != u:
+            idx.append(pred[idx[-1]])
+        idx.reverse()
+        return dist[v], [self.names[i] for i in idx]
+
+    def sum_along_path(self, path):
+        """Return ``(distanceKm, timeHours, costEUR)`` summed over a path of names."""
+        dist = time_h = cost = 0.0
+        for a, b in zip(path, path[1:]):
+            d, t, c = self.edge_weights(self.index[a], self.index[b])
+            dist += d
+            time_h += t
+            cost += c
+        return dist, time_h, cost
+
+
+def route_shipments(shipments, edges=None, graph=None):
+    """Route a whole ``shipments`` list in one call.
+
+    Returns one result per shipment in the same shape as the "Dijkstra Solver"
+    node. Shipments sharing origin, destination and weight key reuse a single
+    computed route.
+    """
+    if graph is None:
+        graph = RoutingGraph(edges)
+
+    od_results = {}
+    results = []
+    for sh in shipments or []:
+        origin = sh.get("origin")
+        destination = sh.get("destination")
+        priority = sh.get("priority")
+        weight_key = weight_key_for_priority(priority)
+
+        od_key = (origin, destination, weight_key)
+        routed = od_results.get(od_key)
+        if routed is None:
+            _total, path = graph.path(origin, destination, weight_key)
+            distance_km = time_hours = cost_eur = 0
+            if len(path) > 1:
+                totals = graph.sum_along_path(path)
+                distance_km, time_hours, cost_eur = (_to_fixed_1(x) for x in totals)
+            routed = (path, distance_km, time_hours, cost_eur)
+            od_results[od_key] = routed
+
+        path, distance_km, time_hours, cost_eur = routed
+        results.append({
+            "shipmentId": sh.get("shipmentId"),
+            "origin": origin,
+            "destination": destination,
+            "route": list(path),
+            "distanceKm": distance_km,
+            "timeHours": time_hours,
+            "costEUR": cost_eur,
+            "priority": priority,
+            "logisticsNetwork": {
+                "edges": [{
+                    "from": origin,
+                    "to": destination,
+                    "timeHours": time_hours,
+                    "costEUR": cost_eur,
+                }] if len(path) > 1 else []
+            },
+            "batches": sh.get("batches") or [],
+        })
+    return results
+
+
+def solve(payload):
+    """Entry point matching the n8n node: merged ``{shipments, edges}`` in, ``{shipments}`` out."""
+    shipments = payload.get("shipments") or []
+    with tracing.span("Dijkstra Solver", stage="routing", attributes={"shipments": len(shipments)}):
+        return {"shipments": route_shipments(shipments, payload.get("edges") or [])}
+
+
+if __name__ == "__main__":
+    # Usage: python routing.py merged_input.json > routed.json
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        data = json.load(f)
+    json.dump(solve(data), sys.stdout)
@@ -0,0 +1,295 @@
+"""Inverted search index for the Shipments table.
+
+The search box used to cast every cell to ``str`` and run ``str.contains``
+over every column on each rerun. ``SearchIndex.build(df)`` indexes the
+table once per data version and answers queries with row ids:
+
+* the table's own columns (shipmentId, timestamp, decision, risk, STATUS)
+  get a trigram index over their distinct values, so any substring still
+  matches, as in the old search;
+* free-text columns (reason, recommendations), which the old search did not
+  look at, get a token index; each query word must be a prefix of a word in
+  the cell.
+
+Matching is case-insensitive. A row matches when any column matches, and row
+ids come back sorted (table order). STATUS is edited per session, so
+``search`` / ``select`` take ``overrides`` (``{column: {row: value}}``, a
+session's edits) that replace the indexed value of those rows. ``rows_equal``
+and ``distinct`` serve exact-value filters such as the decision selectbox
+from the same postings.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+SUBSTRING_COLUMNS = ["shipmentId", "timestamp", "decision", "risk", "STATUS"]
+TEXT_COLUMNS = ["reason", "recommendations"]
+
+_TOKEN = re.compile(r"\w+")
+_SEP = b"\x00"
+
+# Above this many matched values, rows are gathered with one vectorised mask
+_MASK_GATHER_KEYS = 64
+# Candidate values below this are verified directly instead of intersecting more postings
+_VERIFY_LIMIT = 4096
+
+
+class _Postings:
+    """Sorted ids per key in CSR form (``rows[offsets[k]:offsets[k + 1]]``).
+
+    ``keys[i]`` is the key of id ``i`` (or of ``values[i]`` when given).
+    """
+
+    def __init__(self, keys, n_keys, values=None):
+        keys = np.asarray(keys, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys
+        self.rows = order if values is None else np.asarray(values, dtype=np.int64)[order]
+        self.offsets = np.searchsorted(keys[order], np.arange(n_keys + 1))
+        self.n_keys = n_keys
+
+    def get(self, k):
+        return self.rows[self.offsets[k]:self.offsets[k + 1]]
+
+    def union(self, ks):
+        ks = np.asarray(ks, dtype=np.int64)
+        if not len(ks):
+            return np.empty(0, dtype=np.int64)
+        if len(ks) > _MASK_GATHER_KEYS:
+            mask = np.zeros(self.n_keys, dtype=bool)
+            mask[ks] = True
+            return np.flatnonzero(mask[self.keys])
+        if len(ks) == 1:
+            return self.get(ks[0])
+        return np.sort(np.concatenate([self.get(k) for k in ks]))
+
+
+def _factorize(series):
+    values = series.fillna("").astype(str).to_numpy(dtype=object)
+    codes, uniques = pd.factorize(values, sort=False)
+    return codes, uniques.tolist()
+
+
+def _sorted_unique(a):
+    # Sort-based dedupe: np.unique's hash path is far slower on tens of millions of int64
+    a = np.sort(a)
+    if len(a):
+        a = a[np.concatenate([[True], a[1:] != a[:-1]])]
+    return a
+
+
+class _SubstringColumn:
+    """Trigram index over a column's distinct values (lower-cased UTF-8 bytes)."""
+
+    def __init__(self, series):
+        codes, self.uniques = _factorize(series)
+        self.rows = _Postings(codes, len(self.uniques))
+        self._exact = None
+
+        encoded = [u.lower().encode("utf-8") for u in self.uniques]
+        self.blob = _SEP.join(encoded) + _SEP
+        lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+        self.starts = np.concatenate([[0], np.cumsum(lengths + 1)[:-1]]).astype(np.int64)
+        self.ends = self.starts + lengths
+
+        self._bytes = np.frombuffer(self.blob, dtype=np.uint8)
+        b = self._bytes.astype(np.uint32)
+        if len(b) >= 3:
+            grams = (b[:-2] << 16) | (b[1:-1] << 8) | b[2:]
+            valid = (b[:-2] != 0) & (b[1:-1] != 0) & (b[2:] != 0)
+            pos = np.flatnonzero(valid)
+            owner = np.searchsorted(self.starts, pos, side="right") - 1
+            pairs = _sorted_unique((grams[pos].astype(np.int64) << 32) | owner)
+            gram_of = pairs >> 32
+            first = np.flatnonzero(np.concatenate([[True], gram_of[1:] != gram_of[:-1]])) if len(pairs) else np.empty(0, dtype=np.int64)
+            self._gram_keys = gram_of[first]
+            self._gram_offsets = np.append(first, len(pairs))
+            self._gram_values = (pairs & 0xFFFFFFFF).astype(np.int64)
+        else:
+            self._gram_keys = np.empty(0, dtype=np.int64)
+            self._gram_offsets = np.zeros(1, dtype=np.int64)
+            self._gram_values = np.empty(0, dtype=np.int64)
+
+    def _gram_postings(self, gram):
+        i = np.searchsorted(self._gram_keys, gram)
+        if i == len(self._gram_keys) or self._gram_keys[i] != gram:
+            return np.empty(0, dtype=np.int64)
+        return self._gram_values[self._gram_offsets[i]:self._gram_offsets[i + 1]]
+
+    def _scan(self, qb):
+        # Vectorised substring scan over the distinct-value bytes (short or unselective queries)
+        b = self._bytes
+        span = len(b) - len(qb) + 1
+        if span <= 0:
+            return np.empty(0, dtype=np.int64)
+        hits = b[:span] == qb[0]
+        for k in range(1, len(qb)):
+            hits &= b[k:span + k] == qb[k]
+        owner = np.searchsorted(self.starts, np.flatnonzero(hits), side="right") - 1
+        # Positions are increasing, so owners are already sorted
+        if len(owner):
+            owner = owner[np.concatenate([[True], owner[1:] != owner[:-1]])]
+        return owner
+
+    def match_values(self, q):
+        qb = q.lower().encode("utf-8")
+        if len(qb) < 3:
+            return self._scan(qb)
+        grams = sorted({(qb[i] << 16) | (qb[i + 1] << 8) | qb[i + 2] for i in range(len(qb) - 2)})
+        postings = sorted((self._gram_postings(g) for g in grams), key=len)
+        cand = postings[0]
+        if len(grams) == 1:
+            return cand
+        if len(cand) * 4 > len(self.uniques):
+            # Unselective query: one scan beats intersecting near-complete postings
+            return self._scan(qb)
+        for p in postings[1:]:
+            if len(cand) <= _VERIFY_LIMIT:
+                break
+            cand = np.intersect1d(cand, p, assume_unique=True)
+        if len(cand) > _VERIFY_LIMIT:
+            return self._scan(qb)
+        # Shared trigrams do not mean they are contiguous: verify
+        blob, starts, ends = self.blob, self.starts, self.ends
+        return np.array([i for i in cand if blob.find(qb, starts[i], ends[i]) >= 0], dtype=np.int64)
+
+    def search(self, q):
+        return self.rows.union(self.match_values(q))
+
+    def rows_equal(self, value):
+        if self._exact is None:
+            self._exact = {v: i for i, v in enumerate(self.uniques)}
+        i = self._exact.get(str(value))
+        return np.empty(0, dtype=np.int64) if i is None else self.rows.get(i)
+
+
+class _TokenColumn:
+    """Word index over a free-text column's distinct values."""
+
+    def __init__(self, series):
+        codes, self.uniques = _factorize(series)
+        self.rows = _Postings(codes, len(self.uniques))
+
+        token_ids = {}
+        tok_keys, text_ids = [], []
+        for i, text in enumerate(self.uniques):
+            for tok in set(_TOKEN.findall(text.lower())):
+                tok_keys.append(token_ids.setdefault(tok, len(token_ids)))
+                text_ids.append(i)
+        # Vocabulary in sorted order so a prefix maps to one contiguous range
+        vocab = sorted(token_ids)
+        remap = np.empty(len(vocab), dtype=np.int64)
+        for rank, tok in enumerate(vocab):
+            remap[token_ids[tok]] = rank
+        self.vocab = np.array(vocab, dtype=object)
+        keys = remap[np.asarray(tok_keys, dtype=np.int64)] if tok_keys else np.empty(0, dtype=np.int64)
+        self.texts = _Postings(keys, len(vocab), values=text_ids)
+
+    def match_values(self, q):
+        tokens = _TOKEN.findall(q.lower())
+        if not tokens:
+            ql = q.lower()
+            return np.array([i for i, t in enumerate(self.uniques) if ql in t.lower()], dtype=np.int64)
+        result = None
+        for tok in tokens:
+            lo = np.searchsorted(self.vocab, tok, side="left")
+            hi = np.searchsorted(self.vocab, tok + "\U0010ffff", side="left")
+            ids = _sorted_unique(self.texts.rows[self.texts.offsets[lo]:self.texts.offsets[hi]])
+            result = ids if result is None else np.intersect1d(result, ids, assume_unique=True)
+            if not len(result):
+                break
+        return result
+
+    def search(self, q):
+        return self.rows.union(self.match_values(q))
+
+
+def _override(hits, q, values):
+    # Overridden rows match on their new value only (substring, like the trigram columns)
+    ql = q.lower()
+    rows = np.fromiter(values, dtype=np.int64, count=len(values))
+    matched = [row for row, v in values.items() if ql in str(v or "").lower()]
+    hits = np.setdiff1d(hits, rows, assume_unique=True)
+    return np.union1d(hits, np.asarray(matched, dtype=np.int64)) if matched else hits
+
+
+class SearchIndex:
+    """Row-id search over the indexed columns of one table snapshot."""
+
+    def __init__(self, columns, n_rows):
+        self.columns = columns
+        self.n_rows = n_rows
+
+    @classmethod
+    def build(cls, df, substring_columns=SUBSTRING_COLUMNS, text_columns=TEXT_COLUMNS):
+        columns = {}
+        for c in substring_columns:
+            if c in df.columns:
+                columns[c] = _SubstringColumn(df[c])
+        for c in text_columns:
+            if c in df.columns:
+                columns[c] = _TokenColumn(df[c])
+        return cls(columns, len(df))
+
+    def search(self, q, overrides=None):
+        """Sorted row ids where any indexed column matches ``q``.
+
+        ``overrides`` (``{column: {row: value}}``) stand in for the indexed
+        values of those rows.
+        """
+        q = str(q or "").strip()
+        if not q:
+            return np.arange(self.n_rows)
+        hits = []
+        for name, col in self.columns.items():
+            h = col.search(q)
+            if overrides and overrides.get(name):
+                h = _override(h, q, overrides[name])
+            if len(h):
+                hits.append(h)
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        if len(hits) == 1:
+            return hits[0]
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for h in hits:
+            mask[h] = True
+        return np.flatnonzero(mask)
+
+    def select(self, q=None, equals=None, overrides=None):
+        """Sorted row ids matching ``q`` and every ``{column: value}`` in ``equals``."""
+        rows = self.search(q, overrides) if str(q or "").strip() else None
+        for column, value in (equals or {}).items():
+            hits = self.rows_equal(column, value)
+            rows = hits if rows is None else np.intersect1d(rows, hits, assume_unique=True)
+        return np.arange(self.n_rows) if rows is None else rows
+
+    def rows_equal(self, column, value):
+        """Sorted row ids where ``column`` (a substring column) equals ``value``."""
+        return self.columns[column].rows_equal(value)
+
+    def suggest(self, column, q=None, limit=20):
+        """Up to ``limit`` distinct values of a substring column matching ``q``, most recent first.
+
+        Without ``q`` the most recently added values are returned.
+        """
+        col = self.columns[column]
+        q = str(q or "").strip()
+        ids = col.match_values(q) if q else np.arange(len(col.uniques))
+        picked = []
+        for i in ids[::-1]:
+            v = col.uniques[i]
+            if v.strip():
+                picked.append(v)
+                if len(picked) >= limit:
+                    break
+        return picked
+
+    def distinct(self, column, sort=True):
+        """Non-blank distinct values of a column, sorted or in first-appearance order."""
+        values = [v for v in self.columns[column].uniques if v.strip()]
+        return sorted(values) if sort else values
+
+    def distinct_count(self, column):
+        return len(self.columns[column].uniques)
@@ -0,0 +1,186 @@
+"""One read-only decision table per process, with per-session STATUS overlays.
+
+The Shipments and Shipment Overview pages used to keep a normalised copy of
+the whole decision log in each session (``st.session_state.shipments_df``)
+and copied it again for the editors. Server memory grew with sessions x rows,
+though a session only ever changes the STATUS of a few rows.
+
+``SharedTable`` is the normalised log for one data version. Every session
+shares it and nobody writes to it. Text columns use pandas' ``str`` dtype
+(Arrow-backed when pyarrow is installed). ``decision`` and ``risk`` are
+categoricals. ``SharedTableRegistry`` checks ``store.version()`` on every
+rerun, so each session sees new rows as soon as the store has them; tables
+of the last few versions are kept.
+
+A session keeps only a ``StatusOverlay``: its STATUS edits, keyed by
+(shipmentId, timestamp) so they still apply to a newer version of the log.
+``SessionTable.view`` copies just the rows a page shows and lays the overlay
+over them. Memory per session therefore grows with its edits, not with the
+log. ``SessionTable`` also offers the ``columns`` / ``at`` subset of the
+DataFrame interface that ``EditTracker`` uses, so editor edits land in the
+overlay.
+"""
+import threading
+
+import pandas as pd
+
+from decision_rows import normalize_frame
+
+STATUS = "STATUS"
+KEY_COLUMNS = ("shipmentId", "timestamp")
+# Low-cardinality columns stored as categoricals
+CATEGORY_COLUMNS = ("decision", "risk")
+
+# Tables kept per registry
+KEEP_VERSIONS = 4
+
+
+def _shared_dtypes(df):
+    """Compact, immutable-friendly dtypes: categoricals for CATEGORY_COLUMNS, ``str`` for text."""
+    for c in df.columns:
+        if c in CATEGORY_COLUMNS:
+            df[c] = df[c].astype(str).astype("category")
+        elif df[c].dtype == object and pd.api.types.infer_dtype(df[c], skipna=True) in ("string", "empty"):
+            df[c] = df[c].astype("str")
+    return df
+
+
+# --- SHARED TABLE ---
+class SharedTable:
+    """Normalised decision log of one data version; read-only, row labels are positions."""
+
+    def __init__(self, frame, version):
+        self.frame = frame
+        self.version = version
+        self._positions = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df, version):
+        df = normalize_frame(df).reset_index(drop=True)
+        if STATUS not in df.columns:
+            df[STATUS] = ""
+        return cls(_shared_dtypes(df), version)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def key(self, pos):
+        """(shipmentId, timestamp) of row ``pos``, as text."""
+        return tuple(str(self.frame[c].iat[pos]) if c in self.frame.columns else "" for c in KEY_COLUMNS)
+
+    def position(self, key):
+        """Last row with ``key``, or None."""
+        if self._positions is None:
+            # Only needed once some session has edits; built on first use
+            with self._lock:
+                if self._positions is None:
+                    cols = [self.frame[c].astype(str).tolist() if c in self.frame.columns else [""] * len(self.frame)
+                            for c in KEY_COLUMNS]
+                    self._positions = dict(zip(zip(*cols), range(len(self.frame))))
+        return self._positions.get(tuple(key))
+
+
+class SharedTableRegistry:
+    """Process-wide ``SharedTable`` per data version."""
+
+    def __init__(self, keep=KEEP_VERSIONS):
+        self.keep = keep
+        self._by_version = {}
+        self._lock = threading.Lock()
+
+    def get(self, store):
+        """Table for the store's current version; built by the first session that asks, then shared."""
+        version = store.version()
+        with self._lock:
+            table = self._by_version.get(version)
+            if table is None:
+                table = SharedTable.from_frame(store.frame(), version)
+                self._by_version[version] = table
+                while len(self._by_version) > self.keep:
+                    self._by_version.pop(next(iter(self._by_version)))
+            return table
+
+
+# --- SESSION OVERLAY ---
+class StatusOverlay:
+    """One session's STATUS edits: {(shipmentId, timestamp): value}."""
+
+    def __init__(self):
+        self.cells = {}
+
+    def __len__(self):
+        return len(self.cells)
+
+    def by_row(self, table):
+        """``{row position: value}`` for the edited rows present in ``table``."""
+        hits = {}
+        for key, value in self.cells.items():
+            pos = table.position(key)
+            if pos is not None:
+                hits[pos] = value
+        return hits
+
+    def apply(self, table, df):
+        """Lay the overlay over ``df`` (rows of ``table``, labelled by position); returns the frame."""
+        if not self.cells or STATUS not in df.columns:
+            return df
+        hits = self.by_row(table)
+        labels = [label for label in hits if label in df.index]
+        if labels:
+            df.loc[labels, STATUS] = [hits[label] for label in labels]
+        return df
+
+
+class _OverlayAt:
+    def __init__(self, session_table):
+        self._t = session_table
+
+    def __getitem__(self, item):
+        label, col = item
+        if col == STATUS:
+            value = self._t.overlay.cells.get(self._t.table.key(label))
+            if value is not None:
+                return value
+        return self._t.table.frame.at[label, col]
+
+    def __setitem__(self, item, value):
+        label, col = item
+        if col != STATUS:
+            raise KeyError(f"Only {STATUS} can be edited, not {col!r}")
+        self._t.overlay.cells[self._t.table.key(label)] = value
+
+
+class SessionTable:
+    """The shared table as one session sees it: base rows plus that session's overlay."""
+
+    def __init__(self, table, overlay):
+        self.table = table
+        self.overlay = overlay
+
+    @property
+    def frame(self):
+        return self.table.frame
+
+    @property
+    def version(self):
+        return self.table.version
+
+    @property
+    def columns(self):
+        return self.table.frame.columns
+
+    @property
+    def at(self):
+        return _OverlayAt(self)
+
+    def status_by_row(self):
+        """This session's STATUS edits as ``{row position: value}``."""
+        return self.overlay.by_row(self.table) if self.overlay.cells else {}
+
+    def view(self, rows=None, columns=None):
+        """Copy of ``rows`` (positions; all when None) x ``columns`` with the overlay applied."""
+        frame = self.table.frame
+        df = frame if rows is None else frame.iloc[rows]
+        df = df[list(columns)] if columns else df
+        return self.overlay.apply(self.table, df.copy())
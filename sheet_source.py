@@ -0,0 +1,180 @@
+"""Cached, conditional access to the published decision sheet.
+
+Every Streamlit rerun used to download and parse the whole sheet again (with
+a cache-buster so nothing in between could help). ``SheetSource`` keeps one
+parsed copy per process and only goes back to the network once ``ttl``
+seconds have passed. It then revalidates with ETag / Last-Modified, and
+skips the re-parse when the body hash has not changed. The last good body is
+mirrored to disk (written atomically) so all sessions, restarts and
+network outages start from it.
+
+The fetcher is injectable: ``fetch(url, headers, timeout)`` returns
+``(status, headers, body)``. ``file_fetcher`` serves a local CSV with the
+same semantics as a test double for the remote sheet.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+
+import pandas as pd
+
+SHEET_TTL_SECONDS = 60
+FETCH_TIMEOUT_SECONDS = 15
+SHEET_CACHE_DIR = os.environ.get("SHEET_CACHE_DIR", os.path.join(tempfile.gettempdir(), "shipping-sheet-cache"))
+
+
+# --- FETCHERS ---
+def http_fetcher(url, headers, timeout):
+    import requests
+
+    r = requests.get(url, headers=headers, timeout=timeout)
+    if r.status_code != 304:
+        r.raise_for_status()
+    return r.status_code, r.headers, r.content
+
+
+def file_fetcher(path):
+    """Fetcher serving a local CSV, honouring If-None-Match / If-Modified-Since."""
+
+    def fetch(_url, headers, _timeout):
+        st_ = os.stat(path)
+        etag = f'"{st_.st_mtime_ns:x}-{st_.st_size:x}"'
+        last_modified = formatdate(st_.st_mtime, usegmt=True)
+        if headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag, "Last-Modified": last_modified}, b""
+        with open(path, "rb") as f:
+            return 200, {"ETag": etag, "Last-Modified": last_modified}, f.read()
+
+    return fetch
+
+
+def fetcher_for(url):
+    if url.startswith("file://"):
+        return file_fetcher(url[len("file://"):])
+    if "://" not in url:
+        return file_fetcher(url)
+    return http_fetcher
+
+
+# --- MIRROR ---
+def _atomic_write(path, data):
+    d = os.path.dirname(path)
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=d, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+class SheetSource:
+    """One remote CSV, parsed at most once per content version."""
+
+    def __init__(self, url, ttl=SHEET_TTL_SECONDS, cache_dir=SHEET_CACHE_DIR, fetch=None, timeout=FETCH_TIMEOUT_SECONDS):
+        self.url = url
+        self.ttl = ttl
+        self.timeout = timeout
+        self.fetch = fetch or fetcher_for(url)
+        self._lock = threading.Lock()
+
+        self._body = None
+        self._meta = {}  # etag, lastModified, sha256, fetchedAt
+        self._frame = None
+        self._frame_version = None
+        self.last_error = None
+
+        self._mirror_body = self._mirror_meta = None
+        if cache_dir:
+            stem = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+            self._mirror_body = os.path.join(cache_dir, f"{stem}.csv")
+            self._mirror_meta = os.path.join(cache_dir, f"{stem}.json")
+            self._load_mirror()
+
+    @property
+    def version(self):
+        """Content hash of the current body (None before the first load)."""
+        return self._meta.get("sha256")
+
+    def _load_mirror(self):
+        try:
+            with open(self._mirror_meta, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(self._mirror_body, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return
+        if hashlib.sha256(body).hexdigest() == meta.get("sha256"):
+            self._body, self._meta = body, meta
+
+    def _save_mirror(self, body_changed=True):
+        if not self._mirror_body:
+            return
+        try:
+            # Body first: a meta file always describes a complete body
+            if body_changed:
+                _atomic_write(self._mirror_body, self._body)
+            _atomic_write(self._mirror_meta, json.dumps(self._meta).encode("utf-8"))
+        except OSError:
+            pass  # The mirror is an optimisation; an unwritable cache dir is not an error
+
+    def _revalidate(self):
+        headers = {}
+        if self._body is not None:
+            if self._meta.get("etag"):
+                headers["If-None-Match"] = self._meta["etag"]
+            if self._meta.get("lastModified"):
+                headers["If-Modified-Since"] = self._meta["lastModified"]
+
+        status, resp_headers, body = self.fetch(self.url, headers, self.timeout)
+        now = time.time()
+        changed = False
+        if status == 304 and self._body is not None:
+            self._meta["fetchedAt"] = now
+        else:
+            sha = hashlib.sha256(body).hexdigest()
+            changed = sha != self._meta.get("sha256")
+            if changed:
+                self._body = body
+            self._meta = {
+                "etag": resp_headers.get("ETag"),
+                "lastModified": resp_headers.get("Last-Modified"),
+                "sha256": sha,
+                "fetchedAt": now,
+            }
+        self._save_mirror(body_changed=changed)
+
+    def refresh(self, force=False):
+        """Revalidate if the TTL has expired (or ``force``); returns the body bytes.
+
+        On a fetch error the last good body (in memory or mirrored) is served
+        and the error kept in ``last_error``; with no body at all it is raised.
+        """
+        with self._lock:
+            fresh = self._body is not None and time.time() - self._meta.get("fetchedAt", 0) < self.ttl
+            if force or not fresh:
+                try:
+                    self._revalidate()
+                    self.last_error = None
+                except Exception as e:
+                    if self._body is None:
+                        raise
+                    self.last_error = e
+            return self._body
+
+    def read_frame(self, force=False):
+        """Return the sheet as a DataFrame (a copy callers may modify)."""
+        self.refresh(force=force)
+        with self._lock:
+            if self._frame is None or self._frame_version != self.version:
+                self._frame = pd.read_csv(io.BytesIO(self._body))
+                self._frame_version = self.version
+            return self._frame.copy()
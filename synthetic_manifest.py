@@ -0,0 +1,429 @@
+"""Seeded generator for large synthetic shipment manifests.
+
+``syntheticdata.json`` has 15 shipments and 235 garments, which is too small
+to load-test the dashboard, the validators or the workflow. This module
+produces manifests with the same schema at any size: every DPP section, the
+Logistics Network ports, dates ordered like the sample (harvest, processing,
+components, assembly, completion, warehousing, then the batch timestamp), and
+the nulls the sample allows (collectionPartner, recyclingProcess). With
+``missing_rate`` set, some shipments, batches, orders and garments lose one
+field the "DPP Missing Data Check" requires. The field is removed, set to
+null or left empty, and the candidates are taken from ``dpp_validator``.
+Like the sample, most direct shipments have an empty ``route`` and about a
+third of garments have no raw material certifications. The check flags both
+even with ``missing_rate`` at 0.
+
+Each shipment is drawn from its own RNG seeded with ``(seed, index)``. The
+same seed therefore gives the same manifest whether it is written as one file
+or as shards by several processes. Shipments are generated and written one
+at a time, so memory stays flat for millions of garments. The output formats
+are NDJSON (one shipment per line, read back with
+``manifest_stream.iter_ndjson``) and the ``{"shipments": [...]}`` document
+the rest of the tools read. A ``.gz`` suffix writes the file gzip-compressed.
+
+    python synthetic_manifest.py big.ndjson --shipments 100000 --seed 7
+    python synthetic_manifest.py big.json --shipments 20000 --format json --missing-rate 0.01
+    python synthetic_manifest.py shards/ --shipments 1000000 --shards 16 --workers 8
+"""
+import argparse
+import gzip
+import json
+import math
+import os
+import random
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from dpp_validator import NESTED_REQUIRED, REQUIRED
+from weather_risk import PORTS
+
+# Fan-out ranges (inclusive) per level, as in the sample
+FANOUT = {"batches": (1, 3), "orders": (2, 5), "garments": (1, 3)}
+MISSING_RATE = 0.0
+START = datetime(2025, 12, 14, 14, 43, 35, 221921)
+# Batch timestamps fall in this window after START
+WINDOW_DAYS = 365
+BATCH_SPACING = timedelta(hours=2)
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+
+# The manifest spells Antwerp as the port authority does
+PORT_NAMES = {"Antwerp": "Antwerp-Bruges"}
+_PORTS = [(PORT_NAMES.get(p["city"], p["city"]), math.radians(p["lat"]), math.radians(p["lon"])) for p in PORTS]
+# Great-circle km -> route km, and the sample's speed and rate per km
+DETOUR_FACTOR = 1.3
+SPEED_KMH = 35.0
+EUR_PER_KM = 0.6
+ROUTE_STOP_SHARE = 0.2
+
+PRIORITIES = ["High", "Express", "Medium", "Low"]
+BRANDS = [
+    "Luxury Threads", "Modern Textiles", "Quality Clothes", "Business Attire", "FastFashion Co", "Street Style",
+    "Trendy Wear", "Casual Comfort", "Style Hub", "EcoWear Ltd", "Premium Garments", "Urban Style",
+    "Denim Co", "Green Fashion", "Classic Wear", "Sporty Life",
+]
+SOURCE_COUNTRIES = ["Vietnam", "Mexico", "Pakistan", "Egypt", "Turkey", "China", "Bangladesh", "Indonesia", "Brazil", "India"]
+MATERIALS = ["denim", "hemp", "polyester", "linen", "cotton", "silk", "wool", "rayon", "nylon", "blended"]
+PROCESSING_LOCATIONS = ["Vietnam", "Pakistan", "Morocco", "India", "China", "Turkey", "Bangladesh", "Indonesia", "Myanmar", "Cambodia"]
+PROCESS_TYPES = ["dyeing", "spinning", "knitting", "weaving"]
+COMPONENT_SUPPLIERS = ["Scovill (USA)", "YKK (Japan)", "Riri (Switzerland)", "Prym (Germany)", "National (USA)", "KAMsnaps (USA)"]
+COMPONENTS = ["zipper", "thread", "tags", "labels", "elastic", "buttons"]
+CERTIFICATIONS = ["RWS", "B Corp", "Cradle to Cradle", "Fair Trade", "GRS", "OEKO-TEX", "GOTS", "ISO 14001", "Bluesign"]
+QUALITY_GRADES = ["A", "B", "A+"]
+PACKAGING = ["biodegradable", "standard", "recyclable"]
+CARE = ["Machine wash cold", "Dry clean only", "Hand wash"]
+DURABILITY = ["high", "medium", "standard"]
+COLLECTION_PARTNERS = ["Charity Partner", None, "Third-Party Recycler", "Brand Take-Back"]
+RECYCLABILITY = ["medium", "high", "low"]
+RECYCLABLE_MATERIALS = ["thread", "polyester", "buttons", "cotton"]
+RECYCLING_PROCESSES = ["chemical", "upcycling", None, "mechanical"]
+DISPOSAL = ["composting", "landfill", "recycling", "incineration"]
+TRANSPORT_MODES = ["truck", "rail", "sea", "air"]
+ESG_RATINGS = ["A", "C+", "B+", "B", "A+", "C"]
+COMPLIANCE_SCORES = [0.7, 0.8, 0.9, 1.0]
+LABOR = ["good", "excellent", "acceptable"]
+IMPACT = ["high", "medium", "low"]
+
+# Days from each lifecycle event to the next one (the batch timestamp follows warehousing)
+LIFECYCLE_GAPS = {
+    "warehouse": (10, 180),
+    "completion": (1, 10),
+    "product_assembly": (1, 5),
+    "component_assembly": (7, 21),
+    "process": (5, 20),
+    "harvest": (12, 44),
+}
+
+# Required keys "DPP Missing Data Check" looks at, per level; child lists stay so fan-out is unchanged
+MISSING_TARGETS = {
+    "shipment": [(k,) for k in REQUIRED["shipment"] if k != "batches"],
+    "batch": [(k,) for k in REQUIRED["batch"] if k != "orders"],
+    "order": [(k,) for k in REQUIRED["order"] if k != "garments"],
+    "garment": (
+        [(k,) for k in REQUIRED["garment"]]
+        + [("dpp", k) for k in REQUIRED["dpp"]]
+        + [("dpp", section, k) for section, keys in NESTED_REQUIRED for k in keys]
+    ),
+}
+
+
+# --- GENERATION ---
+def _rng(seed, index):
+    return random.Random(seed * 1_000_003 + index)
+
+
+def _leg(rng, a, b):
+    _, lat1, lon1 = a
+    _, lat2, lon2 = b
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    km = round(2 * 6371.0 * math.asin(math.sqrt(h)) * DETOUR_FACTOR * rng.uniform(0.95, 1.05))
+    return float(km)
+
+
+def _punch_hole(rng, obj, level):
+    """Remove, null or empty one required field of ``obj`` (in place)."""
+    path = rng.choice(MISSING_TARGETS[level])
+    parent = obj
+    for key in path[:-1]:
+        parent = parent.get(key)
+        if not isinstance(parent, dict):
+            return
+    key = path[-1]
+    current = parent.get(key)
+    mode = rng.randrange(3)
+    if mode == 0:
+        parent.pop(key, None)
+    elif mode == 1:
+        parent[key] = None
+    else:
+        parent[key] = [] if isinstance(current, list) else {} if isinstance(current, dict) else ""
+
+
+def _iso(dt):
+    return dt.isoformat(timespec="microseconds")
+
+
+def _dpp(rng, batch_time):
+    days = lambda name: timedelta(days=rng.randint(*LIFECYCLE_GAPS[name]))
+    warehouse = batch_time - days("warehouse")
+    completion = warehouse - days("completion")
+    assembly = completion - days("product_assembly")
+    component = assembly - days("component_assembly")
+    process = component - days("process")
+    harvest = process - days("harvest")
+    audit = harvest + timedelta(days=rng.randint(-45, 51))
+    return {
+        "uuid": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "rawMaterialsAndProcess": {
+            "sourceCountry": rng.choice(SOURCE_COUNTRIES),
+            "materialType": rng.choice(MATERIALS),
+            "supplier": f"Tier4-Supplier-{rng.randint(1000, 9999)}",
+            "harvestDate": _iso(harvest),
+            "certifications": rng.sample(CERTIFICATIONS, rng.randint(0, 2)),
+        },
+        "rawMaterialsConversion": {
+            "processingFacility": f"Tier3-Processing-{rng.randint(100, 999)}",
+            "location": rng.choice(PROCESSING_LOCATIONS),
+            "processDate": _iso(process),
+            "processType": rng.choice(PROCESS_TYPES),
+            "waterUsageLiters": rng.randint(50, 500),
+            "energyUsageKWh": round(rng.uniform(10, 100), 2),
+        },
+        "component": {
+            "supplier": rng.choice(COMPONENT_SUPPLIERS),
+            "components": rng.sample(COMPONENTS, rng.randint(2, 4)),
+            "assemblyDate": _iso(component),
+        },
+        "productAssembly": {
+            "manufacturingFacility": f"Tier1-Factory-{rng.randint(100, 999)}",
+            "location": rng.choice(PROCESSING_LOCATIONS),
+            "assemblyDate": _iso(assembly),
+            "workersCount": rng.randint(50, 500),
+            "wasteGeneratedKg": round(rng.uniform(0.1, 5.0), 2),
+        },
+        "finishedProduct": {
+            "productId": f"PROD-{rng.randint(100000, 999999)}",
+            "completionDate": _iso(completion),
+            "qualityGrade": rng.choice(QUALITY_GRADES),
+            "weightKg": round(rng.uniform(0.2, 2.0), 3),
+            "dimensions": {"lengthCm": rng.randint(50, 199), "widthCm": rng.randint(30, 99)},
+        },
+        "distribution": {
+            "warehouseLocation": rng.choice(_PORTS)[0],
+            "warehouseDate": _iso(warehouse),
+            "packagingType": rng.choice(PACKAGING),
+            "storageDays": rng.randint(1, 30),
+        },
+        "usage": {
+            "estimatedLifespanMonths": rng.randint(12, 60),
+            "careInstructions": rng.choice(CARE),
+            "durabilityRating": rng.choice(DURABILITY),
+        },
+        "afterSale": {
+            "warrantyMonths": rng.randint(6, 24),
+            "repairServiceAvailable": rng.random() < 0.5,
+            "resaleEligible": rng.random() < 0.5,
+        },
+        "collection": {
+            "collectionProgramAvailable": rng.random() < 0.5,
+            "collectionPartner": rng.choice(COLLECTION_PARTNERS),
+        },
+        "recycling": {
+            "recyclability": rng.choice(RECYCLABILITY),
+            "recyclableMaterials": rng.sample(RECYCLABLE_MATERIALS, rng.randint(1, 3)),
+            "recyclingProcess": rng.choice(RECYCLING_PROCESSES),
+        },
+        "endOfLife": {
+            "estimatedEndOfLifeYears": rng.randint(2, 10),
+            "disposalOptions": rng.sample(DISPOSAL, rng.randint(1, 3)),
+        },
+        "transports": {
+            "totalTransportLegs": rng.randint(2, 5),
+            "transportModes": rng.sample(TRANSPORT_MODES, rng.randint(1, 3)),
+            "totalDistanceKm": rng.randint(500, 4999),
+            "co2EmissionsKg": round(rng.uniform(10, 100), 2),
+        },
+        "evaluations": {
+            "esgRating": rng.choice(ESG_RATINGS),
+            "certifications": rng.sample(CERTIFICATIONS, rng.randint(1, 3)),
+            "lastAuditDate": _iso(audit),
+            "complianceScore": rng.choice(COMPLIANCE_SCORES),
+            "laborStandards": rng.choice(LABOR),
+            "environmentalImpact": rng.choice(IMPACT),
+        },
+    }
+
+
+def make_shipment(index, seed=0, fanout=None, missing_rate=MISSING_RATE):
+    """Shipment number ``index`` (0-based) of the manifest for ``seed``."""
+    fanout = {**FANOUT, **(fanout or {})}
+    rng = _rng(seed, index)
+    origin, destination = rng.sample(_PORTS, 2)
+    stops = [p for p in _PORTS if p is not origin and p is not destination]
+    route = [rng.choice(stops)] if rng.random() < ROUTE_STOP_SHARE else []
+
+    legs = list(zip([origin] + route, route + [destination]))
+    kms = [_leg(rng, a, b) for a, b in legs]
+    distance = sum(kms)
+    edges = [
+        {"from": a[0], "to": b[0], "timeHours": round(km / SPEED_KMH, 1), "costEUR": round(km * EUR_PER_KM, 1)}
+        for (a, b), km in zip(legs, kms)
+    ]
+    shipment_id = f"SHIP-{index + 1:03d}"
+    shipment = {
+        "shipmentId": shipment_id,
+        "origin": origin[0],
+        "destination": destination[0],
+        "route": [p[0] for p in route],
+        "distanceKm": distance,
+        "timeHours": round(distance / SPEED_KMH, 1),
+        "costEUR": round(distance * EUR_PER_KM, 1),
+        "priority": rng.choice(PRIORITIES),
+        "logisticsNetwork": {"edges": edges},
+        "batches": [],
+    }
+
+    first_batch = START + timedelta(days=rng.randrange(WINDOW_DAYS))
+    for b in range(rng.randint(*fanout["batches"])):
+        batch_time = first_batch + b * BATCH_SPACING
+        batch_id = f"BAT-{shipment_id}-{b + 1:03d}"
+        batch = {"batchId": batch_id, "shipmentId": shipment_id, "timestamp": _iso(batch_time), "orders": []}
+        for o in range(rng.randint(*fanout["orders"])):
+            order_id = f"ORD-{batch_id}-{o + 1:03d}"
+            quantity = rng.randint(*fanout["garments"])
+            order = {"id": order_id, "batchId": batch_id, "brand": rng.choice(BRANDS), "quantity": quantity, "garments": []}
+            for g in range(quantity):
+                garment = {"id": f"GAR-{order_id}-{g + 1:03d}", "orderId": order_id, "dpp": _dpp(rng, batch_time)}
+                if missing_rate and rng.random() < missing_rate:
+                    _punch_hole(rng, garment, "garment")
+                order["garments"].append(garment)
+            if missing_rate and rng.random() < missing_rate:
+                _punch_hole(rng, order, "order")
+            batch["orders"].append(order)
+        if missing_rate and rng.random() < missing_rate:
+            _punch_hole(rng, batch, "batch")
+        shipment["batches"].append(batch)
+    if missing_rate and rng.random() < missing_rate:
+        _punch_hole(rng, shipment, "shipment")
+    return shipment
+
+
+def generate(shipments, seed=0, start=0, fanout=None, missing_rate=MISSING_RATE):
+    """Yield shipments ``start .. start + shipments - 1`` one at a time."""
+    for index in range(start, start + shipments):
+        yield make_shipment(index, seed, fanout, missing_rate)
+
+
+# --- OUTPUT ---
+def _open(path, compress):
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+    return open(path, "w", encoding="utf-8")
+
+
+def _tally(counts, shipment):
+    counts["shipments"] += 1
+    for batch in shipment.get("batches") or []:
+        counts["batches"] += 1
+        for order in batch.get("orders") or []:
+            counts["orders"] += 1
+            counts["garments"] += len(order.get("garments") or [])
+
+
+def write_manifest(path, shipments, fmt="ndjson"):
+    """Stream ``shipments`` to ``path`` ("ndjson" or "json"); returns level counts."""
+    if fmt not in ("ndjson", "json"):
+        raise ValueError(f"Unknown format: {fmt!r}")
+    counts = Counter()
+    tmp = os.path.join(os.path.dirname(path) or ".", f".{os.path.basename(path)}.tmp")
+    with _open(tmp, path.endswith(".gz")) as f:
+        if fmt == "json":
+            f.write('{"shipments": [')
+        for n, shipment in enumerate(shipments):
+            if fmt == "json":
+                f.write(",\n" if n else "\n")
+                f.write(json.dumps(shipment, separators=(",", ":")))
+            else:
+                f.write(json.dumps(shipment, separators=(",", ":")) + "\n")
+            _tally(counts, shipment)
+        if fmt == "json":
+            f.write("\n]}\n")
+    os.replace(tmp, path)
+    return dict(counts)
+
+
+def _write_shard(args):
+    path, start, count, seed, fanout, missing_rate, fmt = args
+    return path, write_manifest(path, generate(count, seed, start, fanout, missing_rate), fmt)
+
+
+def _available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def write_shards(directory, shipments, shards, seed=0, fanout=None, missing_rate=MISSING_RATE, fmt="ndjson",
+                 workers=None, compress=False):
+    """Split the manifest for ``seed`` over ``shards`` files in ``directory``.
+
+    Shard ``k`` holds a contiguous range of shipment indices, so the shards
+    concatenated in name order are the single-file manifest. A ``meta.json``
+    listing the shards and their counts is written last.
+    """
+    os.makedirs(directory, exist_ok=True)
+    workers = min(workers or _available_cpus(), shards)
+    ext = (".ndjson" if fmt == "ndjson" else ".json") + (".gz" if compress else "")
+    tasks = []
+    for k in range(shards):
+        start, stop = shipments * k // shards, shipments * (k + 1) // shards
+        name = f"shipments-{k:05d}-of-{shards:05d}{ext}"
+        tasks.append((os.path.join(directory, name), start, stop - start, seed, fanout, missing_rate, fmt))
+
+    results = []
+    if workers <= 1:
+        results = [_write_shard(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.submit(_write_shard, task))
+                if len(pending) >= 2 * workers:
+                    results.append(pending.popleft().result())
+            while pending:
+                results.append(pending.popleft().result())
+
+    totals = Counter()
+    for _, counts in results:
+        totals.update(counts)
+    meta = {
+        "formatVersion": FORMAT_VERSION,
+        "seed": seed,
+        "fanout": {**FANOUT, **(fanout or {})},
+        "missingRate": missing_rate,
+        "format": fmt,
+        "counts": dict(totals),
+        "shards": [{"file": os.path.basename(path), **counts} for path, counts in results],
+    }
+    tmp = os.path.join(directory, f".{META_FILE}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(directory, META_FILE))
+    return meta
+
+
+def _range(text):
+    lo, _, hi = text.partition("-")
+    return int(lo), int(hi or lo)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic shipment manifest.")
+    parser.add_argument("output", help="Output file, or a directory with --shards")
+    parser.add_argument("--shipments", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batches", type=_range, default=FANOUT["batches"], help="Batches per shipment, e.g. 1-3")
+    parser.add_argument("--orders", type=_range, default=FANOUT["orders"], help="Orders per batch, e.g. 2-5")
+    parser.add_argument("--garments", type=_range, default=FANOUT["garments"], help="Garments per order, e.g. 1-3")
+    parser.add_argument("--missing-rate", type=float, default=MISSING_RATE,
+                        help="Share of shipments, batches, orders and garments missing one required field")
+    parser.add_argument("--format", choices=("ndjson", "json"), default="ndjson")
+    parser.add_argument("--shards", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--gzip", action="store_true", help="Compress shards (single files: use a .gz name)")
+    args = parser.parse_args()
+
+    fanout = {"batches": args.batches, "orders": args.orders, "garments": args.garments}
+    started = time.perf_counter()
+    if args.shards:
+        counts = write_shards(args.output, args.shipments, args.shards, args.seed, fanout, args.missing_rate,
+                              args.format, args.workers, args.gzip)["counts"]
+    else:
+        counts = write_manifest(args.output, generate(args.shipments, args.seed, 0, fanout, args.missing_rate), args.format)
+    elapsed = time.perf_counter() - started
+    print(", ".join(f"{counts.get(k, 0)} {k}" for k in ("shipments", "batches", "orders", "garments"))
+          + f" in {elapsed:.2f}s")
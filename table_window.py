@@ -0,0 +1,63 @@
+"""Server-side sorting and paging for the Shipments table.
+
+Large decision logs are not sent to the browser whole: the page works on
+sorted row ids and hands ``st.data_editor`` one page at a time, so the
+payload and rerun cost depend on the page size, not on the log size.
+``SortOrder`` is computed once per data version and column; ``page_rows``
+slices a (filtered) set of row ids in that order.
+"""
+import numpy as np
+import pandas as pd
+
+# Above this many rows the table switches to windowed mode
+TABLE_WINDOW_ROWS = 1000
+PAGE_SIZES = [50, 100, 250, 500]
+# Only columns that are not edited in the session can use a cached order
+SORTABLE_COLUMNS = ["timestamp", "shipmentId", "decision", "risk"]
+
+# The shipment picker lists every id up to this many, then switches to type-ahead
+PICKER_ALL_IDS = 200
+PICKER_MATCHES = 50
+
+
+class SortOrder:
+    """Row ids of one column in sorted order (stable; blanks last)."""
+
+    def __init__(self, values):
+        values = pd.Series(values).fillna("").astype(str).to_numpy(dtype=object)
+        codes, uniques = pd.factorize(values, sort=True)
+        blank = np.flatnonzero(uniques == "")
+        if len(blank):
+            # Blank sorts first lexically; push it past every real value
+            codes = np.where(codes == blank[0], len(uniques), codes)
+        self.codes = codes
+        self.order = np.argsort(codes, kind="stable")
+
+    def sort(self, rows, descending=False):
+        """``rows`` (sorted ids, or None for all rows) in column order."""
+        if rows is None:
+            ordered = self.order
+        elif len(rows) * 8 > len(self.order):
+            # Large selections: filter the precomputed order with a mask
+            mask = np.zeros(len(self.order), dtype=bool)
+            mask[rows] = True
+            ordered = self.order[mask[self.order]]
+        else:
+            ordered = rows[np.argsort(self.codes[rows], kind="stable")]
+        return ordered[::-1] if descending else ordered
+
+
+def ordered_rows(rows, n_rows, order=None, descending=False):
+    """Row ids to show: ``rows`` (None = all ``n_rows``) in ``order`` (None = log order)."""
+    if order is not None:
+        return order.sort(rows, descending)
+    rows = np.arange(n_rows) if rows is None else rows
+    return rows[::-1] if descending else rows
+
+
+def page_rows(rows, page, page_size):
+    """Return ``(row ids on page, page, number of pages)`` with ``page`` clamped to range."""
+    n_pages = max(1, -(-len(rows) // page_size))
+    page = min(max(int(page), 1), n_pages)
+    start = (page - 1) * page_size
+    return rows[start:start + page_size], page, n_pages
@@ -0,0 +1,131 @@
+import json
+
+import pytest
+
+from agent_gateway import AgentCache, AgentGateway, ChatClient, StubModelServer, input_key
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _batch(batch_id, material="cotton", shipment_id="SHP-1"):
+    return {"batchId": batch_id, "shipmentId": shipment_id, "dpp": {"materialType": material, "recycled": 0.25}}
+
+
+def _payload(*batches):
+    return {"batches": list(batches)}
+
+
+def _echo_batches(agent, messages):
+    # Answer the way the batch agent does: naming the batches it was given
+    prompt = next(m["content"] for m in messages if m["role"] == "user")
+    payload = json.loads(prompt.split("Input data:\n", 1)[1])
+    ids = [b["batchId"] for b in payload["batches"]]
+    return {
+        "isFlagged": True,
+        "reason": f"{ids[0]} lacks a recycling process",
+        "includedBatches": ", ".join(ids),
+        "severity": "0.6",
+        "recommendations": f"Hold {ids[0]} until its DPP is complete",
+    }
+
+
+@pytest.fixture
+def stub():
+    with StubModelServer(respond=_echo_batches) as server:
+        yield server
+
+
+@pytest.fixture
+def gateway(stub, tmp_path):
+    cache = AgentCache(str(tmp_path / "agents.db"), clock=Clock())
+    return AgentGateway(client=ChatClient(base_url=stub.base_url, api_key="test"), cache=cache)
+
+
+def test_identical_normalised_inputs_hit_the_cache(gateway, stub):
+    first, cached = gateway.run("batch_compliance", _payload(_batch("B-100"), _batch("B-200", "wool")))
+    assert not cached
+    # Same content: other key order, padded strings, list order swapped
+    again = _payload({"dpp": {"recycled": 0.25, "materialType": " wool "}, "batchId": "B-200"}, _batch("B-100"))
+    second, cached = gateway.run("batch_compliance", again)
+    assert cached
+    assert second == first
+    assert stub.requests == 1
+    assert (gateway.hits, gateway.misses) == (1, 1)
+
+
+def test_different_inputs_miss(gateway, stub):
+    gateway.run("batch_compliance", _payload(_batch("B-100")))
+    _, cached = gateway.run("batch_compliance", _payload(_batch("B-100", "polyester")))
+    assert not cached
+    assert stub.requests == 2
+
+
+def test_cached_answers_carry_the_callers_identifiers(gateway, stub):
+    gateway.run("batch_compliance", _payload(_batch("B-1"), _batch("B-12", "wool")))
+    answer, cached = gateway.run("batch_compliance", _payload(_batch("C-7"), _batch("C-70", "wool")))
+    assert cached
+    assert stub.requests == 1
+    assert answer["includedBatches"] == "C-7, C-70"
+    assert answer["reason"] == "C-7 lacks a recycling process"
+    assert answer["recommendations"] == "Hold C-7 until its DPP is complete"
+
+
+def test_cache_entries_expire_after_the_ttl(tmp_path):
+    clock = Clock()
+    cache = AgentCache(str(tmp_path / "agents.db"), ttl=60, clock=clock)
+    cache.put("k", "decision", {"decision": "PROCEED"})
+    clock.now += 59
+    assert cache.get("k") == {"decision": "PROCEED"}
+    clock.now += 1
+    assert cache.get("k") is None
+    assert cache.stats() == {}
+
+
+def test_purge_expired_drops_only_old_entries(tmp_path):
+    clock = Clock()
+    cache = AgentCache(str(tmp_path / "agents.db"), ttl=60, clock=clock)
+    cache.put("old", "decision", {})
+    clock.now += 30
+    cache.put("new", "decision", {})
+    clock.now += 30
+    assert cache.purge_expired() == 1
+    assert cache.get("new") == {}
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    clock = Clock()
+    cache = AgentCache(str(tmp_path / "agents.db"), max_entries=2, clock=clock)
+    cache.put("a", "decision", {"n": 1})
+    clock.now += 1
+    cache.put("b", "decision", {"n": 2})
+    clock.now += 1
+    assert cache.get("a") == {"n": 1}
+    clock.now += 1
+    cache.put("c", "decision", {"n": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert cache.get("c") == {"n": 3}
+
+
+def test_run_many_calls_the_model_once_per_distinct_input(gateway, stub):
+    payloads = [_payload(_batch(f"B-{i:03d}", "wool" if i % 3 else "cotton")) for i in range(12)]
+    answers = gateway.run_many("batch_compliance", payloads)
+    assert stub.requests == 2
+    assert gateway.misses == 2
+    assert [a["includedBatches"] for a in answers] == [f"B-{i:03d}" for i in range(12)]
+    # A second pass is served from the cache
+    gateway.run_many("batch_compliance", payloads)
+    assert stub.requests == 2
+    assert gateway.hits == 2
+
+
+def test_prompt_or_model_change_changes_the_key():
+    payload = _payload(_batch("B-1"))
+    assert input_key("batch_compliance", payload) != input_key("batch_compliance", payload, model="other")
+    assert input_key("batch_compliance", payload) != input_key("route_compliance", payload)
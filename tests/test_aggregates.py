@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggregates
+from aggregates import AggregateRegistry, DecisionAggregates
+
+DECISIONS = ["PROCEED", "FLAGGED AS DELAY", "BLOCK shipment", None, ""]
+RISKS = ["High", "Low ", "Medium", None, ""]
+
+
+def _frame(n, seed=0, categorical=True):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "shipmentId": [f"SHP-{seed}-{i}" for i in range(n)],
+        "decision": rng.choice(np.array(DECISIONS, dtype=object), n),
+        "risk": rng.choice(np.array(RISKS, dtype=object), n),
+    })
+    if categorical:
+        df["decision"] = df["decision"].astype("category")
+        df["risk"] = df["risk"].astype("category")
+    return df
+
+
+def _counts(df):
+    buckets = pd.Series([aggregates.decision_bucket(x) for x in df["decision"]]).value_counts()
+    risks = pd.Series([aggregates._risk_label(x) for x in df["risk"]]).value_counts()
+    return (
+        tuple(sorted(((b, int(n)) for b, n in buckets.items()), key=lambda t: (-t[1], t[0]))),
+        tuple(sorted(((r, int(n)) for r, n in risks.items() if r), key=lambda t: (-t[1], t[0]))),
+    )
+
+
+def _got(aggs):
+    return aggs.bucket_counts(), aggs.risk_counts()
+
+
+@pytest.fixture
+def recounts(monkeypatch):
+    calls = []
+    label_codes = aggregates._label_codes
+
+    def spy(series, label, codes):
+        calls.append(len(series))
+        return label_codes(series, label, codes)
+
+    monkeypatch.setattr(aggregates, "_label_codes", spy)
+    return calls
+
+
+@pytest.mark.parametrize("categorical", [True, False])
+def test_counts_match_a_full_count(categorical):
+    df = _frame(300, categorical=categorical)
+    assert _got(DecisionAggregates.from_frame(df)) == _counts(df)
+
+
+def test_edited_rows_are_recounted_alone(recounts):
+    df = _frame(1000)
+    aggs = DecisionAggregates.from_frame(df)
+    edited = df.copy()
+    edited["decision"] = edited["decision"].cat.add_categories(["BLOCK late"])
+    edited.loc[[3, 500], "decision"] = "BLOCK late"
+    edited.loc[7, "risk"] = "Medium" if df.loc[7, "risk"] != "Medium" else "High"
+    recounts.clear()
+    nxt = aggs.advance(edited)
+    assert _got(nxt) == _counts(edited)
+    assert recounts == [3, 3]
+    # The earlier snapshot is untouched
+    assert _got(aggs) == _counts(df)
+
+
+def test_appended_rows_are_counted_alone(recounts):
+    df = _frame(1000)
+    aggs = DecisionAggregates.from_frame(df)
+    longer = pd.concat([df, _frame(25, seed=1)], ignore_index=True)
+    recounts.clear()
+    nxt = aggs.advance(longer)
+    assert _got(nxt) == _counts(longer)
+    assert recounts == [25, 25]
+
+
+def test_unchanged_frame_returns_the_same_snapshot():
+    df = _frame(100)
+    aggs = DecisionAggregates.from_frame(df)
+    assert aggs.advance(df.copy()) is aggs
+
+
+@pytest.mark.parametrize("change", ["shrink", "shuffle", "drop_risk"])
+def test_other_changes_still_count_correctly(change):
+    df = _frame(400)
+    aggs = DecisionAggregates.from_frame(df)
+    if change == "shrink":
+        new = df.iloc[:350].reset_index(drop=True)
+    elif change == "shuffle":
+        new = df.sample(frac=1, random_state=0).reset_index(drop=True)
+    else:
+        new = df.drop(columns=["risk"])
+    nxt = aggs.advance(new)
+    if change == "drop_risk":
+        assert nxt.bucket_counts() == _counts(df)[0]
+        assert nxt.risk_counts() == ()
+    else:
+        assert _got(nxt) == _counts(new)
+
+
+def test_registry_advances_from_the_latest_version(recounts):
+    registry = AggregateRegistry()
+    df = _frame(500)
+    registry.for_frame("v1", df)
+    longer = pd.concat([df, _frame(10, seed=2)], ignore_index=True)
+    recounts.clear()
+    aggs = registry.for_frame("v2", longer)
+    assert recounts == [10, 10]
+    assert registry.for_frame("v2", longer) is aggs
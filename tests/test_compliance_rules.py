@@ -0,0 +1,63 @@
+import copy
+import json
+from pathlib import Path
+
+import pytest
+
+from agent_gateway import AgentGateway, ChatClient, StubModelServer
+from compliance_rules import DECISIONS, assess_manifest, decide_shipment, load_rules
+
+MANIFEST = Path(__file__).resolve().parent.parent / "syntheticdata.json"
+
+
+@pytest.fixture(scope="module")
+def manifest():
+    return json.loads(MANIFEST.read_text(encoding="utf-8"))
+
+
+def test_without_a_gateway_borderline_batches_take_the_fallback(manifest):
+    rules = load_rules()
+    results = assess_manifest(manifest, rules)
+    assert {r["decision"] for r in results} <= set(DECISIONS)
+    review = [r for r in results if r["source"] == "rules-review"]
+    assert review
+    for r in review:
+        assert r["decision"] == rules["review_fallback"]["decision"]
+        assert r["confidence"] == rules["confidence"][r["decision"]]
+        assert r["shipmentFlagged"] is (r["decision"] != "PROCEED")
+        assert r["reasons"][-1] == rules["review_fallback"]["reason"]
+    shipment = decide_shipment(results, rules)
+    assert shipment["decision"] in DECISIONS
+    assert shipment["confidence"] is not None
+
+
+def test_fallback_decision_is_configurable(manifest, tmp_path):
+    rules = copy.deepcopy(load_rules())
+    rules["review_fallback"] = {"decision": "PROCEED"}
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(rules))
+    results = assess_manifest(manifest, load_rules(str(path)))
+    review = [r for r in results if r["source"] == "rules-review"]
+    assert review and all(r["decision"] == "PROCEED" and not r["shipmentFlagged"] for r in review)
+
+
+def test_unknown_fallback_decision_is_rejected(tmp_path):
+    rules = copy.deepcopy(load_rules())
+    rules["review_fallback"] = {"decision": "REVIEW"}
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(rules))
+    with pytest.raises(ValueError):
+        load_rules(str(path))
+
+
+def test_gateway_decides_borderline_batches(manifest):
+    def respond(agent, messages):
+        return {"isFlagged": True, "reason": "audit overdue", "includedBatches": "", "severity": "0.9",
+                "recommendations": "Re-audit"}
+
+    with StubModelServer(respond=respond) as server:
+        gateway = AgentGateway(client=ChatClient(base_url=server.base_url, api_key="test"))
+        results = assess_manifest(manifest, gateway=gateway)
+    agent = [r for r in results if r["source"] == "agent"]
+    assert agent and not [r for r in results if r["source"] == "rules-review"]
+    assert all(r["decision"] == "BLOCK" for r in agent)
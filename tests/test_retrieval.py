@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+import retrieval
+from retrieval import HashingEmbedder, VectorIndex, chunk_text
+
+WORDS = (
+    "port customs delay storm cotton wool polyester recycling harvest audit certificate vessel crane berth "
+    "strike tariff label garment dye supplier warehouse rail truck inspection quota"
+).split()
+
+
+class CountingEmbedder(HashingEmbedder):
+    """HashingEmbedder that records every text it embeds."""
+
+    def __init__(self, dim=64):
+        super().__init__(dim)
+        self.embedded = []
+
+    def embed(self, texts):
+        self.embedded.extend(texts)
+        return super().embed(texts)
+
+
+def _documents(n, words_per_doc=400, seed=0):
+    rng = np.random.default_rng(seed)
+    return {f"doc{i}.md": " ".join(rng.choice(WORDS, words_per_doc)) for i in range(n)}
+
+
+def test_build_and_reload(tmp_path):
+    embedder = CountingEmbedder()
+    docs = _documents(3)
+    index = VectorIndex(str(tmp_path / "kb"))
+    embedded = index.update(docs, embedder)
+    expected = sum(len(chunk_text(t)) for t in docs.values())
+    assert embedded == expected == len(index)
+    assert len(embedder.embedded) == expected
+    reloaded = VectorIndex(str(tmp_path / "kb"))
+    assert reloaded.chunks == index.chunks
+    assert isinstance(reloaded.vectors, np.memmap)
+    assert np.allclose(np.linalg.norm(reloaded.vectors, axis=1), 1, atol=1e-5)
+
+
+def test_update_embeds_only_the_changed_document(tmp_path):
+    docs = _documents(4)
+    index = VectorIndex(str(tmp_path / "kb"))
+    index.update(docs, CountingEmbedder())
+
+    embedder = CountingEmbedder()
+    assert index.update(docs, embedder) == 0
+    assert embedder.embedded == []
+
+    changed = dict(docs, **{"doc2.md": docs["doc2.md"] + " late addendum on port strike"})
+    embedded = index.update(changed, embedder)
+    fresh = set(chunk_text(changed["doc2.md"])) - set(chunk_text(docs["doc2.md"]))
+    assert embedded == len(fresh) > 0
+    assert set(embedder.embedded) == fresh
+    assert {c["source"] for c in index.chunks if c["text"] in fresh} == {"doc2.md"}
+    # Stored vectors of untouched chunks are kept as they were
+    again = VectorIndex(str(tmp_path / "other"))
+    again.update(changed, CountingEmbedder())
+    assert np.allclose(index.vectors, again.vectors)
+
+
+def test_removed_documents_leave_the_index(tmp_path):
+    docs = _documents(3)
+    index = VectorIndex(str(tmp_path / "kb"))
+    index.update(docs, CountingEmbedder())
+    embedder = CountingEmbedder()
+    assert index.update({k: docs[k] for k in ("doc0.md", "doc2.md")}, embedder) == 0
+    assert {c["source"] for c in index.chunks} == {"doc0.md", "doc2.md"}
+    assert len(index.vectors) == len(index.chunks)
+
+
+@pytest.mark.parametrize("block_rows", [1, 7, retrieval.SEARCH_BLOCK_ROWS])
+def test_block_search_matches_brute_force(tmp_path, monkeypatch, block_rows):
+    monkeypatch.setattr(retrieval, "SEARCH_BLOCK_ROWS", block_rows)
+    embedder = HashingEmbedder(64)
+    index = VectorIndex(str(tmp_path / "kb"))
+    index.update(_documents(20, words_per_doc=60, seed=1), embedder, size=120, overlap=20)
+    queries = ["port strike delay", "organic cotton certificate", "warehouse rail truck", "dye supplier audit"]
+    k = 5
+    results = index.search(queries, embedder, k=k)
+
+    q = retrieval._normalise(embedder.embed(queries))
+    scores = q @ np.asarray(index.vectors).T
+    for i, hits in enumerate(results):
+        assert len(hits) == k
+        expected = np.sort(scores[i])[::-1][:k]
+        got = np.array([s for s, _ in hits])
+        assert np.allclose(got, expected, atol=1e-5)
+        rows = {(c["source"], c["chunk"]): r for r, c in enumerate(index.chunks)}
+        for s, chunk in hits:
+            assert scores[i, rows[(chunk["source"], chunk["chunk"])]] == pytest.approx(s, abs=1e-5)
+
+
+def test_search_rejects_another_embedder(tmp_path):
+    index = VectorIndex(str(tmp_path / "kb"))
+    index.update(_documents(1), HashingEmbedder(64))
+    with pytest.raises(ValueError):
+        index.search("port", HashingEmbedder(128))
+
+
+def test_hashing_embedder_is_deterministic():
+    a = HashingEmbedder(64).embed(["Genoa port access", "storm delay"])
+    b = HashingEmbedder(64).embed(["Genoa port access", "storm delay"])
+    assert np.array_equal(a, b)
+    assert a.any()
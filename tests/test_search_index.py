@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from search_index import SearchIndex
+
+
+def _frame():
+    return pd.DataFrame({
+        "shipmentId": ["SHP-001", "SHP-002", "SHP-010", "SHP-100"],
+        "timestamp": ["2026-10-01T08:00", "2026-10-01T09:00", "2026-10-02T08:00", "2026-10-03T10:00"],
+        "decision": ["PROCEED", "FLAGGED AS DELAY", "BLOCK", "PROCEED"],
+        "risk": ["Low", "High", "High", "Medium"],
+        "STATUS": ["held at Genoa", "", "", "released"],
+        "reason": ["All DPP fields present", "Storm warning at Rotterdam", "Missing recycling data", ""],
+    })
+
+
+def _brute_force(df, q, columns):
+    ql = q.lower()
+    mask = np.zeros(len(df), dtype=bool)
+    for c in columns:
+        mask |= df[c].fillna("").astype(str).str.lower().str.contains(ql, regex=False).to_numpy()
+    return np.flatnonzero(mask).tolist()
+
+
+def test_substring_columns_match_any_substring():
+    df = _frame()
+    columns = ["shipmentId", "timestamp", "decision", "risk", "STATUS"]
+    index = SearchIndex.build(df, text_columns=[])
+    for q in ["shp-0", "01", "10-0", "flag", "as del", "igh", "eld at", "LEASE", "x"]:
+        assert index.search(q).tolist() == _brute_force(df, q, columns), q
+
+
+def test_status_is_searchable():
+    index = SearchIndex.build(_frame())
+    assert index.search("genoa").tolist() == [0]
+    assert index.search("releas").tolist() == [3]
+
+
+def test_text_columns_match_word_prefixes():
+    index = SearchIndex.build(_frame())
+    assert index.search("rotter").tolist() == [1]
+    assert index.search("recycling dat").tolist() == [2]
+
+
+def test_overrides_replace_indexed_values():
+    index = SearchIndex.build(_frame())
+    overrides = {"STATUS": {0: "cleared", 2: "Held for customs"}}
+    # Row 0 no longer says "held"; row 2 now does
+    assert index.search("held", overrides).tolist() == [2]
+    assert index.search("clear", overrides).tolist() == [0]
+    assert index.search("genoa", overrides).tolist() == []
+    assert index.select("held", equals={"decision": "BLOCK"}, overrides=overrides).tolist() == [2]
+    assert index.select("held", equals={"decision": "PROCEED"}, overrides=overrides).tolist() == []
+
+
+def test_empty_query_returns_every_row():
+    index = SearchIndex.build(_frame())
+    assert index.search("  ").tolist() == [0, 1, 2, 3]
+    assert index.select(None, equals={"risk": "High"}).tolist() == [1, 2]
@@ -0,0 +1,157 @@
+import pandas as pd
+import pytest
+
+import sheet_source
+from sheet_source import SheetSource, file_fetcher
+
+URL = "https://example.invalid/sheet.csv"
+CSV = b"shipmentId,decision\nSHP-1,PROCEED\nSHP-2,DELAY\n"
+
+
+class FakeSheet:
+    """Fetcher double with validators: 304 when If-None-Match or If-Modified-Since still match."""
+
+    def __init__(self, body=CSV):
+        self.body = body
+        self.etag = '"v1"'
+        self.last_modified = "Mon, 05 Oct 2026 10:00:00 GMT"
+        self.requests = []
+        self.down = False
+
+    def publish(self, body, etag, last_modified):
+        self.body, self.etag, self.last_modified = body, etag, last_modified
+
+    def __call__(self, url, headers, timeout):
+        self.requests.append(dict(headers))
+        if self.down:
+            raise ConnectionError("sheet unreachable")
+        validators = {"ETag": self.etag, "Last-Modified": self.last_modified}
+        if headers.get("If-None-Match") == self.etag or headers.get("If-Modified-Since") == self.last_modified:
+            return 304, validators, b""
+        return 200, validators, self.body
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sheet_source.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    calls = []
+    read_csv = pd.read_csv
+
+    def spy(*args, **kwargs):
+        calls.append(1)
+        return read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(sheet_source.pd, "read_csv", spy)
+    return calls
+
+
+def test_reads_within_the_ttl_do_not_fetch(tmp_path, clock, parses):
+    sheet = FakeSheet()
+    source = SheetSource(URL, ttl=60, cache_dir=str(tmp_path), fetch=sheet)
+    first = source.read_frame()
+    clock.now += 59
+    second = source.read_frame()
+    assert len(sheet.requests) == 1
+    assert len(parses) == 1
+    assert first.equals(second)
+    # Callers get copies
+    first.loc[0, "decision"] = "BLOCK"
+    assert source.read_frame().loc[0, "decision"] == "PROCEED"
+
+
+def test_expired_ttl_revalidates_with_etag_and_last_modified(tmp_path, clock, parses):
+    sheet = FakeSheet()
+    source = SheetSource(URL, ttl=60, cache_dir=str(tmp_path), fetch=sheet)
+    source.read_frame()
+    version = source.version
+    clock.now += 61
+    source.read_frame()
+    assert sheet.requests[1] == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 05 Oct 2026 10:00:00 GMT"}
+    assert source.version == version
+    assert len(parses) == 1
+    # The 304 restarts the TTL
+    clock.now += 30
+    source.read_frame()
+    assert len(sheet.requests) == 2
+
+
+def test_new_content_is_fetched_and_parsed(tmp_path, clock, parses):
+    sheet = FakeSheet()
+    source = SheetSource(URL, ttl=60, cache_dir=str(tmp_path), fetch=sheet)
+    source.read_frame()
+    version = source.version
+    sheet.publish(CSV + b"SHP-3,BLOCK\n", '"v2"', "Tue, 06 Oct 2026 10:00:00 GMT")
+    clock.now += 61
+    df = source.read_frame()
+    assert len(df) == 3
+    assert source.version != version
+    assert len(parses) == 2
+
+
+def test_same_body_under_new_validators_is_not_reparsed(tmp_path, clock, parses):
+    sheet = FakeSheet()
+    source = SheetSource(URL, ttl=60, cache_dir=str(tmp_path), fetch=sheet)
+    source.read_frame()
+    sheet.publish(CSV, '"v2"', "Tue, 06 Oct 2026 10:00:00 GMT")
+    source.read_frame(force=True)
+    assert len(sheet.requests) == 2
+    assert len(parses) == 1
+
+
+def test_failed_fetch_falls_back_to_the_disk_mirror(tmp_path, clock):
+    sheet = FakeSheet()
+    SheetSource(URL, ttl=60, cache_dir=str(tmp_path), fetch=sheet).read_frame()
+
+    sheet.down = True
+    clock.now += 3600
+    restarted = SheetSource(URL, ttl=60, cache_dir=str(tmp_path), fetch=sheet)
+    df = restarted.read_frame()
+    assert df["shipmentId"].tolist() == ["SHP-1", "SHP-2"]
+    assert isinstance(restarted.last_error, ConnectionError)
+    # The mirrored validators are sent along once the sheet is back
+    sheet.down = False
+    restarted.read_frame()
+    assert restarted.last_error is None
+    assert sheet.requests[-1]["If-None-Match"] == '"v1"'
+
+
+def test_failed_fetch_without_a_mirror_raises(tmp_path, clock):
+    sheet = FakeSheet()
+    sheet.down = True
+    with pytest.raises(ConnectionError):
+        SheetSource(URL, cache_dir=str(tmp_path), fetch=sheet).read_frame()
+
+
+def test_corrupt_mirror_is_ignored(tmp_path, clock):
+    sheet = FakeSheet()
+    source = SheetSource(URL, cache_dir=str(tmp_path), fetch=sheet)
+    source.refresh()
+    with open(source._mirror_body, "ab") as f:
+        f.write(b"SHP-9,TRUNCATED")
+    sheet.down = True
+    with pytest.raises(ConnectionError):
+        SheetSource(URL, cache_dir=str(tmp_path), fetch=sheet).refresh()
+
+
+def test_file_fetcher_answers_304_for_a_matching_etag(tmp_path):
+    path = tmp_path / "sheet.csv"
+    path.write_bytes(CSV)
+    fetch = file_fetcher(str(path))
+    status, headers, body = fetch(None, {}, 1)
+    assert (status, body) == (200, CSV)
+    status, _, body = fetch(None, {"If-None-Match": headers["ETag"]}, 1)
+    assert (status, body) == (304, b"")
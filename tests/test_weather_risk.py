@@ -0,0 +1,146 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+import weather_risk
+from weather_risk import (
+    EARTH_RADIUS_KM, LOCATIONS_PER_REQUEST, PORTS, FixtureClient, ForecastCache, OpenMeteoClient, PortIndex,
+    WeatherRisk, forecast_days, score_precipitation,
+)
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _daily(precipitation, codes=None, days=None):
+    days = days or forecast_days(len(precipitation))
+    return {
+        "time": days,
+        "weather_code": codes or [0] * len(precipitation),
+        "precipitation_sum": precipitation,
+    }
+
+
+def _fixture(tmp_path, forecasts):
+    path = tmp_path / "weather.json"
+    path.write_text(json.dumps({weather_risk._location_key(lat, lon): d for (lat, lon), d in forecasts.items()}))
+    return str(path)
+
+
+@pytest.mark.parametrize("tree", [True, False])
+def test_nearest_port_matches_brute_force_haversine(tree):
+    index = PortIndex()
+    if not tree:
+        index._tree = None
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(30, 60, 500)
+    lons = rng.uniform(-15, 30, 500)
+    ports, km = index.nearest(lats, lons)
+    for lat, lon, p, d in zip(lats, lons, ports, km):
+        distances = [_haversine_km(lat, lon, q["lat"], q["lon"]) for q in PORTS]
+        assert p == int(np.argmin(distances))
+        assert d == pytest.approx(min(distances), abs=1e-6)
+
+
+def test_forecast_cache_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache = ForecastCache(ttl=60, clock=clock)
+    days = forecast_days(3)
+    cache.put(51.0, 4.0, _daily([1.0, 2.0, 3.0], days=days))
+    clock.now += 59
+    assert cache.get(51.0, 4.0, days)["precipitation_sum"] == [1.0, 2.0, 3.0]
+    clock.now += 1
+    assert cache.get(51.0, 4.0, days) is None
+    cache.prune()
+    assert cache._days == {}
+
+
+def test_forecast_cache_needs_every_requested_day():
+    cache = ForecastCache(clock=Clock())
+    days = forecast_days(3)
+    cache.put(51.0, 4.0, _daily([1.0, 2.0], days=days[:2]))
+    assert cache.get(51.0, 4.0, days[:2]) is not None
+    assert cache.get(51.0, 4.0, days) is None
+
+
+class FakeSession:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, timeout=None, params=None):
+        self.calls.append(params)
+        n = len(params["latitude"].split(","))
+        body = [{"daily": _daily([float(i)])} for i in range(n)]
+        return FakeResponse(body[0] if n == 1 else body)
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+def test_open_meteo_requests_carry_at_most_50_locations():
+    session = FakeSession()
+    client = OpenMeteoClient(session=session)
+    locations = [(40 + i / 100, 5 + i / 100) for i in range(2 * LOCATIONS_PER_REQUEST + 1)]
+    dailies = client.fetch(locations)
+    assert client.requests == 3
+    assert [len(c["latitude"].split(",")) for c in session.calls] == [50, 50, 1]
+    assert session.calls[1]["latitude"].split(",")[0] == f"{locations[50][0]:.4f}"
+    assert len(dailies) == len(locations)
+
+
+def test_only_cache_misses_are_fetched(tmp_path):
+    locations = [(p["lat"], p["lon"]) for p in PORTS[:3]]
+    client = FixtureClient(_fixture(tmp_path, {loc: _daily([0.0] * 7) for loc in locations}))
+    service = WeatherRisk(client=client, cache=ForecastCache(clock=Clock()))
+    service.forecasts(locations[:2])
+    service.forecasts(locations)
+    service.forecasts(locations)
+    assert client.requests == 2
+
+
+def test_score_precipitation_thresholds():
+    assert score_precipitation([0, 5, 5.1, 20, 20.1, np.nan]).tolist() == [0, 0, 1, 1, 2, 0]
+
+
+def test_risk_is_the_worst_forecast_day(tmp_path):
+    days = forecast_days(7)
+    rotterdam = (51.9496, 4.1383)
+    genoa = (44.4056, 8.9463)
+    client = FixtureClient(_fixture(tmp_path, {
+        rotterdam: _daily([0.0, 1.0, 6.0, 25.0, 2.0, None, 0.0], codes=[0, 1, 61, 65, 3, 0, 0], days=days),
+        genoa: _daily([0.0, 8.0, 1.0, 0.0, 0.0, 0.0, 0.0], codes=[0, 63, 1, 0, 0, 0, 0], days=days),
+    }))
+    service = WeatherRisk(client=client, cache=ForecastCache(clock=Clock()))
+    a, b = service.assess([rotterdam, genoa])
+    # The workflow node only looked at day 0, which is dry for both
+    assert a["port"] == "Rotterdam"
+    assert a["daily_risk"] == ["LOW", "LOW", "MEDIUM", "HIGH", "LOW", "LOW", "LOW"]
+    assert a["derived"] == {"precipitation_mm": 25.0, "weather_code": 65, "risk": "HIGH", "worst_day": days[3]}
+    assert b["derived"]["risk"] == "MEDIUM"
+    assert b["derived"]["worst_day"] == days[1]
+    summary = {row["city"]: row for row in service.port_summary([a, b])}
+    assert summary["Rotterdam"]["max_risk"] == "HIGH"
+    assert summary["Genoa"]["max_risk"] == "MEDIUM"
+    assert summary["Hamburg"]["max_risk"] == "LOW"
@@ -0,0 +1,131 @@
+import asyncio
+import io
+import json
+import socket
+import time
+
+import pytest
+
+import webhook_client
+from manifest_stream import detect_root_type
+from webhook_client import StubWebhookServer, SubmissionJob, iter_chunks, submit_chunks
+
+
+def _shipment(i, batches=1):
+    return {
+        "shipmentId": f"SHP-{i}",
+        "batches": [{"batchId": f"B-{i}-{b}", "shipmentId": f"SHP-{i}"} for b in range(batches)],
+    }
+
+
+def _chunks_of(manifest, size=None):
+    fp = io.BytesIO(json.dumps(manifest).encode("utf-8"))
+    root_type = detect_root_type(fp)
+    fp.seek(0)
+    return root_type, list(iter_chunks(fp, root_type, size))
+
+
+def _submit(url, chunks, **options):
+    options.setdefault("backoff", 0.001)
+    return asyncio.run(submit_chunks(url, chunks, **options))
+
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    calls = []
+    backoff = webhook_client._backoff
+
+    def spy(attempt, base, retry_after=None):
+        calls.append((attempt, retry_after))
+        return backoff(attempt, base, retry_after)
+
+    monkeypatch.setattr(webhook_client, "_backoff", spy)
+    return calls
+
+
+def test_dict_manifest_is_chunked_per_shipment():
+    root_type, chunks = _chunks_of({"shipments": [_shipment(i) for i in range(3)]})
+    assert root_type == "dict"
+    assert chunks == [{"shipments": [_shipment(i)]} for i in range(3)]
+
+
+def test_list_manifest_is_chunked_by_batch_groups():
+    batches = [{"batchId": f"B-{i}", "shipmentId": f"SHP-{i // 2}"} for i in range(7)]
+    root_type, chunks = _chunks_of(batches, size=3)
+    assert root_type == "list"
+    assert chunks == [batches[0:3], batches[3:6], batches[6:7]]
+
+
+def test_single_shipment_manifest_is_one_chunk():
+    shipment = _shipment(1, batches=3)
+    root_type, chunks = _chunks_of(shipment)
+    assert root_type == "shipment"
+    assert chunks == [shipment]
+
+
+def test_every_shipment_is_delivered_exactly_once():
+    shipments = [_shipment(i) for i in range(25)]
+    _, chunks = _chunks_of({"shipments": shipments})
+    with StubWebhookServer() as server:
+        results = _submit(server.url, iter(chunks), concurrency=4)
+    assert [r.index for r in results] == list(range(25))
+    assert all(r.ok and r.attempts == 1 for r in results)
+    delivered = [s["shipmentId"] for payload in server.received for s in payload["shipments"]]
+    assert sorted(delivered) == sorted(s["shipmentId"] for s in shipments)
+    assert len(delivered) == len(set(delivered))
+
+
+def test_503_is_retried_with_backoff(backoffs):
+    with StubWebhookServer(fail_first=2) as server:
+        (result,) = _submit(server.url, [{"shipments": [_shipment(1)]}], concurrency=1, retries=3)
+    assert result.ok
+    assert result.attempts == 3
+    assert result.json() == webhook_client.STUB_RESPONSE
+    assert server.requests == 3
+    assert len(server.received) == 1
+    # One wait per failed attempt, honouring the stub's Retry-After
+    assert backoffs == [(0, "0"), (1, "0")]
+
+
+def test_503_past_the_retry_limit_is_reported():
+    with StubWebhookServer(fail_first=10) as server:
+        (result,) = _submit(server.url, [_shipment(1)], retries=2)
+    assert not result.ok
+    assert result.status == 503
+    assert result.error == "HTTP 503"
+    assert result.attempts == 3
+    assert server.received == []
+
+
+def test_backoff_is_exponential_and_capped(monkeypatch):
+    monkeypatch.setattr(webhook_client.random, "uniform", lambda lo, hi: hi)
+    waits = [webhook_client._backoff(attempt, 0.5) for attempt in range(8)]
+    assert waits[:4] == [0.5, 1.0, 2.0, 4.0]
+    assert max(waits) == webhook_client.BACKOFF_MAX_SECONDS
+
+
+def test_unreachable_host_reports_an_error_after_the_attempt_limit(backoffs):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    url = f"http://127.0.0.1:{port}/webhook"
+    (result,) = _submit(url, [{"shipments": [_shipment(1)]}], retries=2, timeout=5)
+    assert not result.ok
+    assert result.status is None
+    assert result.error
+    assert result.attempts == 3
+    assert [attempt for attempt, _ in backoffs] == [0, 1]
+
+
+def test_submission_job_polls_without_blocking():
+    chunks = [{"shipments": [_shipment(i)]} for i in range(3)]
+    with StubWebhookServer(delay=0.05) as server:
+        job = SubmissionJob(server.url, chunks, concurrency=1, backoff=0.001).start()
+        assert job.poll() == []
+        seen = []
+        while not job.done:
+            seen.extend(job.poll())
+            time.sleep(0.01)
+    assert sorted(r.index for r in seen) == [0, 1, 2]
+    assert [r.index for r in job.results] == [0, 1, 2]
+    assert job.error is None and job.failed == []
@@ -0,0 +1,668 @@
+"""Span tracing for the upload -> decision pipeline.
+
+Time between an upload and its decision is spent in the JSON parse, the
+"DPP Missing Data Check", batch mapping, Dijkstra routing, the weather
+fetch, the three agents and the sheet writes. ``Tracer.span`` times a block
+of work as a span in OpenTelemetry shape:
+
+    {"traceId", "spanId", "parentSpanId", "name", "kind",
+     "startTimeUnixNano", "endTimeUnixNano", "attributes", "status", "resource"}
+
+Attributes stay a flat dict (``pipeline.stage``, ``shipment.id``, ...), and
+``to_otlp`` wraps records as OTLP/JSON for a collector. Tracing is opt-in:
+finished spans go to the sink chosen by ``TRACE_SINK``, ``off`` by default.
+``jsonl:///path`` appends to a file that is rotated to ``path.1`` at
+``TRACE_JSONL_MAX_BYTES``; ``sqlite:///path`` is indexed by stage and
+shipment and keeps the newest ``TRACE_MAX_SPANS`` spans. Either way disk use
+and the Latency page's read stay bounded. The parent span is kept in a
+contextvar, so nested ``span`` blocks form a tree.
+
+Workflow stages report through the webhook response. ``Tracer.ingest``
+accepts ``{"spans": [...]}`` or OTLP ``{"resourceSpans": [...]}`` bodies and
+re-parents the spans under the request that carried them. n8n code nodes can
+send ``startMs`` / ``endMs`` (``Date.now()``) instead of nanoseconds, and
+node names are mapped to stages by ``WORKFLOW_STAGES``.
+
+    TRACE_SINK=jsonl:////tmp/shipping-traces.jsonl streamlit run dashboard.py
+    python tracing.py summary --sink jsonl:////tmp/shipping-traces.jsonl
+    python tracing.py otlp traces.otlp.json --sink sqlite:///traces.db
+"""
+import argparse
+import contextvars
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+SERVICE_NAME = "shipping-dashboard"
+TRACE_SINK = os.environ.get("TRACE_SINK", "off")
+# A JSONL sink rolls over to "<path>.1" past this size (one old file is kept)
+TRACE_JSONL_MAX_BYTES = int(os.environ.get("TRACE_JSONL_MAX_BYTES", 32 * 1024 * 1024))
+# A SQLite sink deletes its oldest spans beyond this many
+TRACE_MAX_SPANS = int(os.environ.get("TRACE_MAX_SPANS", 500000))
+
+# Pipeline stages in workflow order (the Latency page lists them this way)
+STAGES = [
+    "json_parse",
+    "submit",
+    "webhook",
+    "dpp_missing_data_check",
+    "batch_mapping",
+    "routing",
+    "weather_fetch",
+    "batch_compliance_agent",
+    "route_compliance_agent",
+    "decision_agent",
+    "sheet_write",
+]
+# n8n node name -> stage, for spans reported by the workflow
+WORKFLOW_STAGES = {
+    "DPP Missing Data Check": "dpp_missing_data_check",
+    "Batch mapping": "batch_mapping",
+    "Code in JavaScript": "batch_mapping",
+    "Dijkstra Solver": "routing",
+    "weather forecast": "weather_fetch",
+    "Parse Weather & Assess Risk": "weather_fetch",
+    "batch compliance agent": "batch_compliance_agent",
+    "route compliance agent": "route_compliance_agent",
+    "Decision Agent1": "decision_agent",
+}
+SHEET_NODE_PREFIXES = ("Update sheet", "Append or update row in sheet")
+
+STATUS_OK = "STATUS_CODE_OK"
+STATUS_ERROR = "STATUS_CODE_ERROR"
+
+# Most recent spans the summaries read
+READ_LIMIT = 50000
+
+_current = contextvars.ContextVar("tracing_current_span", default=None)
+
+
+def _trace_id():
+    return f"{random.getrandbits(128):032x}"
+
+
+def _span_id():
+    return f"{random.getrandbits(64):016x}"
+
+
+def stage_for(name):
+    """Stage of a span name (workflow node names included); unknown names are their own stage."""
+    if name in WORKFLOW_STAGES:
+        return WORKFLOW_STAGES[name]
+    if name.startswith(SHEET_NODE_PREFIXES):
+        return "sheet_write"
+    return name
+
+
+# --- SPANS ---
+class Span:
+    """One timed unit of work; ``record()`` is what the sinks store."""
+
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "start_ns", "end_ns", "attributes", "status", "message", "_t0")
+
+    def __init__(self, name, trace_id, parent_span_id=None, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = _span_id()
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.status = STATUS_OK
+        self.message = None
+        # Wall clock for the timestamps, monotonic clock for the duration
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._t0 = time.perf_counter_ns()
+
+    @property
+    def context(self):
+        return self.trace_id, self.span_id
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_error(self, error):
+        self.status = STATUS_ERROR
+        self.message = f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = self.start_ns + (time.perf_counter_ns() - self._t0)
+
+    def record(self, resource):
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "name": self.name,
+            "kind": "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.message} if self.message else {"code": self.status},
+            "resource": resource,
+        }
+
+
+class _NoopSpan:
+    trace_id = span_id = parent_span_id = None
+    context = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def record_error(self, error):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def _parent_ids(parent):
+    if parent is None or parent is _NOOP:
+        return None, None
+    if isinstance(parent, Span):
+        return parent.context
+    if isinstance(parent, dict):
+        return parent.get("traceId"), parent.get("spanId")
+    return tuple(parent)
+
+
+def duration_ms(record):
+    return (record["endTimeUnixNano"] - record["startTimeUnixNano"]) / 1e6
+
+
+def shipment_of(record):
+    return (record.get("attributes") or {}).get("shipment.id")
+
+
+# --- SINKS ---
+class SpanSink:
+    """Append-only store of span records."""
+
+    enabled = True
+
+    def export(self, records):
+        raise NotImplementedError
+
+    def read(self, limit=READ_LIMIT):
+        """The most recent ``limit`` records, oldest first."""
+        raise NotImplementedError
+
+    def version(self):
+        """Token that changes whenever spans are appended (for caches)."""
+        raise NotImplementedError
+
+
+class NullSpanSink(SpanSink):
+    enabled = False
+
+    def __init__(self):
+        self.location = "off"
+
+    def export(self, records):
+        pass
+
+    def read(self, limit=READ_LIMIT):
+        return []
+
+    def version(self):
+        return None
+
+
+class JsonlSpanSink(SpanSink):
+    """One JSON record per line; each export is a single appending write.
+
+    Past ``max_bytes`` the file is renamed to ``<path>.1`` (replacing the
+    previous one) and a new file started, so at most two files are kept and
+    ``read`` never scans more than about ``2 * max_bytes``.
+    """
+
+    def __init__(self, path, max_bytes=TRACE_JSONL_MAX_BYTES):
+        self.path = self.location = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @property
+    def rotated_path(self):
+        return self.path + ".1"
+
+    def export(self, records):
+        if not records:
+            return
+        data = "".join(json.dumps(r, separators=(",", ":"), default=str) + "\n" for r in records)
+        with self._lock:
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                size = 0
+            if size and self.max_bytes and size + len(data) > self.max_bytes:
+                os.replace(self.path, self.rotated_path)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+
+    def read(self, limit=READ_LIMIT):
+        lines = deque(maxlen=limit)
+        for path in (self.rotated_path, self.path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    lines.extend(f)
+            except FileNotFoundError:
+                continue
+        out = []
+        for line in lines:
+            try:
+                out.append(json.loads(line))
+            except ValueError:
+                # A torn last line from a concurrent writer
+                continue
+        return out
+
+    def version(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spans (
+    id INTEGER PRIMARY KEY,
+    trace_id TEXT NOT NULL,
+    span_id TEXT NOT NULL,
+    parent_span_id TEXT,
+    name TEXT NOT NULL,
+    stage TEXT,
+    shipment_id TEXT,
+    start_ns INTEGER NOT NULL,
+    end_ns INTEGER NOT NULL,
+    status TEXT,
+    record TEXT NOT NULL,
+    UNIQUE (trace_id, span_id)
+);
+CREATE INDEX IF NOT EXISTS idx_spans_stage ON spans (stage);
+CREATE INDEX IF NOT EXISTS idx_spans_shipment ON spans (shipment_id);
+"""
+
+
+class SQLiteSpanSink(SpanSink):
+    """Spans in SQLite (WAL, one connection per thread); re-ingested spans are ignored.
+
+    Only the newest ``max_spans`` spans are kept.
+    """
+
+    def __init__(self, path, max_spans=TRACE_MAX_SPANS):
+        self.path = self.location = path
+        self.max_spans = max_spans
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def export(self, records):
+        rows = [
+            (
+                r["traceId"], r["spanId"], r.get("parentSpanId"), r["name"],
+                (r.get("attributes") or {}).get("pipeline.stage"), shipment_of(r),
+                r["startTimeUnixNano"], r["endTimeUnixNano"], (r.get("status") or {}).get("code"),
+                json.dumps(r, separators=(",", ":"), default=str),
+            )
+            for r in records
+        ]
+        if rows:
+            with self._conn() as conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO spans (trace_id, span_id, parent_span_id, name, stage, shipment_id, "
+                    "start_ns, end_ns, status, record) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                if self.max_spans:
+                    # ids only grow, so the oldest spans are a range scan on the primary key
+                    conn.execute("DELETE FROM spans WHERE id <= (SELECT MAX(id) FROM spans) - ?", (int(self.max_spans),))
+
+    def read(self, limit=READ_LIMIT):
+        rows = self._conn().execute("SELECT record FROM spans ORDER BY id DESC LIMIT ?", (int(limit),)).fetchall()
+        return [json.loads(r[0]) for r in reversed(rows)]
+
+    def version(self):
+        return self._conn().execute("SELECT MAX(id) FROM spans").fetchone()[0]
+
+
+def open_span_sink(spec=None):
+    """Sink for ``spec``: "jsonl:///path", "sqlite:///path" or "off"."""
+    spec = (spec if spec is not None else TRACE_SINK).strip()
+    if spec.lower() in ("", "off", "none", "0"):
+        return NullSpanSink()
+    for scheme, cls in (("jsonl:", JsonlSpanSink), ("sqlite:", SQLiteSpanSink)):
+        if spec.startswith(scheme + "///"):
+            return cls(spec[len(scheme) + 3:])
+        if spec.startswith(scheme):
+            return cls(spec[len(scheme):])
+    raise ValueError(f"Unknown trace sink: {spec!r}")
+
+
+# --- TRACER ---
+class Tracer:
+    """Creates spans and hands finished ones to a sink."""
+
+    def __init__(self, sink=None, service=SERVICE_NAME):
+        self.sink = sink if sink is not None else open_span_sink()
+        self.resource = {"service.name": service}
+
+    @property
+    def enabled(self):
+        return self.sink.enabled
+
+    @contextmanager
+    def span(self, name, stage=None, shipment_id=None, attributes=None, parent=None):
+        """Time the enclosed block as a child of ``parent`` (default: the current span).
+
+        ``parent`` may be a ``Span``, a span record or a ``(trace_id, span_id)``
+        pair, e.g. one kept in session state to continue a trace on a later rerun.
+        """
+        if not self.enabled:
+            yield _NOOP
+            return
+        trace_id, parent_span_id = _parent_ids(parent if parent is not None else _current.get())
+        span = Span(name, trace_id or _trace_id(), parent_span_id, attributes)
+        span.attributes["pipeline.stage"] = stage or stage_for(name)
+        if shipment_id is not None:
+            span.attributes["shipment.id"] = str(shipment_id)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current.reset(token)
+            span.end()
+            self.sink.export([span.record(self.resource)])
+
+    def ingest(self, body, parent=None, attributes=None):
+        """Store the spans a webhook response reports; returns how many were stored."""
+        if not self.enabled:
+            return 0
+        trace_id, parent_span_id = _parent_ids(parent)
+        records = [
+            _normalize(s, trace_id, parent_span_id, attributes, self.resource)
+            for s in reported_spans(body)
+        ]
+        records = [r for r in records if r is not None]
+        self.sink.export(records)
+        return len(records)
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Process-wide tracer on ``TRACE_SINK``."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer()
+    return _tracer
+
+
+def span(name, stage=None, shipment_id=None, attributes=None, parent=None):
+    """``get_tracer().span(...)``; the form pipeline modules use."""
+    return get_tracer().span(name, stage, shipment_id, attributes, parent)
+
+
+# --- INGESTION ---
+def _otlp_value(value):
+    if not isinstance(value, dict):
+        return value
+    for key in ("stringValue", "boolValue", "doubleValue"):
+        if key in value:
+            return value[key]
+    if "intValue" in value:
+        return int(value["intValue"])
+    if "arrayValue" in value:
+        return [_otlp_value(v) for v in value["arrayValue"].get("values", [])]
+    return None
+
+
+def _attributes(attrs):
+    # OTLP sends [{"key", "value": {...}}]; the flat shape sends a dict
+    if isinstance(attrs, list):
+        return {a.get("key"): _otlp_value(a.get("value")) for a in attrs if isinstance(a, dict)}
+    return dict(attrs) if isinstance(attrs, dict) else {}
+
+
+def reported_spans(body):
+    """Span dicts in a response body (a list of bodies, ``spans``, ``trace.spans`` or OTLP)."""
+    if isinstance(body, list):
+        for item in body:
+            yield from reported_spans(item)
+        return
+    if not isinstance(body, dict):
+        return
+    for rs in body.get("resourceSpans") or []:
+        resource = _attributes((rs.get("resource") or {}).get("attributes"))
+        for ss in rs.get("scopeSpans") or rs.get("instrumentationLibrarySpans") or []:
+            for s in ss.get("spans") or []:
+                yield dict(s, resource=resource)
+    spans = body.get("spans")
+    if spans is None and isinstance(body.get("trace"), dict):
+        spans = body["trace"].get("spans")
+    for s in spans or []:
+        if isinstance(s, dict):
+            yield s
+
+
+def _nanos(span, nano_key, ms_key):
+    if span.get(nano_key) is not None:
+        return int(span[nano_key])
+    if span.get(ms_key) is not None:
+        return int(float(span[ms_key]) * 1_000_000)
+    return None
+
+
+def _normalize(span, trace_id, parent_span_id, attributes, resource):
+    name = span.get("name")
+    start = _nanos(span, "startTimeUnixNano", "startMs")
+    end = _nanos(span, "endTimeUnixNano", "endMs")
+    if end is None and start is not None and span.get("durationMs") is not None:
+        end = start + int(float(span["durationMs"]) * 1_000_000)
+    if not name or start is None or end is None:
+        return None
+    attrs = dict(attributes or {})
+    attrs.update(_attributes(span.get("attributes")))
+    if span.get("shipmentId") is not None:
+        attrs["shipment.id"] = str(span["shipmentId"])
+    attrs.setdefault("pipeline.stage", span.get("stage") or stage_for(name))
+    status = span.get("status") or {}
+    code = status.get("code") if isinstance(status, dict) else status
+    if code in (2, "ERROR", "STATUS_CODE_ERROR"):
+        code = STATUS_ERROR
+    elif code in (1, "OK", "STATUS_CODE_OK", None, 0, "UNSET", "STATUS_CODE_UNSET"):
+        code = STATUS_OK
+    return {
+        # Reported spans join the request's trace; their roots hang off the request span
+        "traceId": trace_id or span.get("traceId") or _trace_id(),
+        "spanId": span.get("spanId") or _span_id(),
+        "parentSpanId": span.get("parentSpanId") or parent_span_id,
+        "name": name,
+        "kind": span.get("kind") or "SPAN_KIND_INTERNAL",
+        "startTimeUnixNano": start,
+        "endTimeUnixNano": end,
+        "attributes": attrs,
+        "status": {"code": code},
+        "resource": {**resource, **(span.get("resource") or {}), "reported.by": "workflow"},
+    }
+
+
+# --- SUMMARIES ---
+def _percentiles(values):
+    import numpy as np
+
+    a = np.asarray(values, dtype=float)
+    p50, p95, p99 = np.percentile(a, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 1),
+        "p95_ms": round(float(p95), 1),
+        "p99_ms": round(float(p99), 1),
+        "max_ms": round(float(a.max()), 1),
+        "total_ms": round(float(a.sum()), 1),
+    }
+
+
+def latency_by_stage(records):
+    """One row per stage (workflow order first): span count, p50 / p95 / p99 / max / total ms."""
+    durations = defaultdict(list)
+    errors = defaultdict(int)
+    for r in records:
+        stage = (r.get("attributes") or {}).get("pipeline.stage") or stage_for(r["name"])
+        durations[stage].append(duration_ms(r))
+        errors[stage] += (r.get("status") or {}).get("code") == STATUS_ERROR
+    order = {s: i for i, s in enumerate(STAGES)}
+    rows = []
+    for stage in sorted(durations, key=lambda s: (order.get(s, len(order)), s)):
+        rows.append({"stage": stage, "spans": len(durations[stage]), "errors": errors[stage], **_percentiles(durations[stage])})
+    return rows
+
+
+def _shipments(records):
+    """Shipment ids per span id; spans without ``shipment.id`` inherit their parent's."""
+    by_id = {(r["traceId"], r["spanId"]): r for r in records}
+    resolved = {}
+
+    def resolve(key):
+        if key in resolved:
+            return resolved[key]
+        resolved[key] = []  # guards against parent cycles
+        r = by_id[key]
+        attrs = r.get("attributes") or {}
+        if attrs.get("shipment.id") is not None:
+            ids = [attrs["shipment.id"]]
+        elif attrs.get("shipment.ids"):
+            ids = list(attrs["shipment.ids"])
+        else:
+            parent = (r["traceId"], r.get("parentSpanId"))
+            ids = resolve(parent) if parent in by_id else []
+        resolved[key] = ids
+        return ids
+
+    for key in by_id:
+        resolve(key)
+    return resolved
+
+
+def latency_by_shipment(records, limit=None):
+    """One row per shipment: end-to-end ms per trace (p50 / p95 / p99), runs and slowest stage.
+
+    A shipment's end-to-end latency in a trace runs from its first span start
+    to its last span end; the slowest stage is the one with the most total time.
+    """
+    ids = _shipments(records)
+    extents = defaultdict(dict)
+    stage_ms = defaultdict(lambda: defaultdict(float))
+    for r in records:
+        stage = (r.get("attributes") or {}).get("pipeline.stage") or stage_for(r["name"])
+        for shipment in ids.get((r["traceId"], r["spanId"]), ()):
+            lo, hi = extents[shipment].get(r["traceId"], (r["startTimeUnixNano"], r["endTimeUnixNano"]))
+            extents[shipment][r["traceId"]] = (min(lo, r["startTimeUnixNano"]), max(hi, r["endTimeUnixNano"]))
+            stage_ms[shipment][stage] += duration_ms(r)
+    rows = []
+    for shipment, traces in extents.items():
+        e2e = [(hi - lo) / 1e6 for lo, hi in traces.values()]
+        slowest = max(stage_ms[shipment].items(), key=lambda kv: kv[1])
+        row = {"shipmentId": shipment, "runs": len(e2e), **_percentiles(e2e)}
+        row.pop("total_ms")
+        row["slowest_stage"] = slowest[0]
+        row["slowest_stage_ms"] = round(slowest[1], 1)
+        rows.append(row)
+    rows.sort(key=lambda r: r["p95_ms"], reverse=True)
+    return rows[:limit] if limit else rows
+
+
+def to_otlp(records):
+    """Records as an OTLP/JSON ``ExportTraceServiceRequest`` body."""
+
+    def value(v):
+        if isinstance(v, bool):
+            return {"boolValue": v}
+        if isinstance(v, int):
+            return {"intValue": str(v)}
+        if isinstance(v, float):
+            return {"doubleValue": v}
+        if isinstance(v, (list, tuple)):
+            return {"arrayValue": {"values": [value(x) for x in v]}}
+        return {"stringValue": str(v)}
+
+    def attrs(d):
+        return [{"key": k, "value": value(v)} for k, v in (d or {}).items()]
+
+    by_resource = defaultdict(list)
+    for r in records:
+        status = dict(r.get("status") or {})
+        status["code"] = 2 if status.get("code") == STATUS_ERROR else 1
+        span = {
+            "traceId": r["traceId"],
+            "spanId": r["spanId"],
+            "name": r["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(r["startTimeUnixNano"]),
+            "endTimeUnixNano": str(r["endTimeUnixNano"]),
+            "attributes": attrs(r.get("attributes")),
+            "status": {k: v for k, v in status.items() if v is not None},
+        }
+        if r.get("parentSpanId"):
+            span["parentSpanId"] = r["parentSpanId"]
+        by_resource[json.dumps(r.get("resource") or {}, sort_keys=True)].append(span)
+    return {
+        "resourceSpans": [
+            {"resource": {"attributes": attrs(json.loads(res))}, "scopeSpans": [{"scope": {"name": "tracing"}, "spans": spans}]}
+            for res, spans in by_resource.items()
+        ]
+    }
+
+
+def _table(rows):
+    if not rows:
+        return "(no spans)"
+    cols = list(rows[0])
+    widths = [max(len(c), *(len(str(r[c])) for r in rows)) for c in cols]
+    lines = ["  ".join(c.ljust(w) for c, w in zip(cols, widths))]
+    lines += ["  ".join(str(r[c]).ljust(w) for c, w in zip(cols, widths)) for r in rows]
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarise or export pipeline spans.")
+    parser.add_argument("--sink", default=None, help="jsonl:///path or sqlite:///path (default: TRACE_SINK)")
+    parser.add_argument("--limit", type=int, default=READ_LIMIT, help="Most recent spans to read")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("summary", help="p50 / p95 / p99 per stage and per shipment")
+    otlp = sub.add_parser("otlp", help="Write the spans as OTLP/JSON")
+    otlp.add_argument("output")
+    args = parser.parse_args()
+
+    sink = open_span_sink(args.sink)
+    records = sink.read(args.limit)
+    if args.cmd == "summary":
+        print(f"{len(records)} spans from {sink.location}\n")
+        print(_table(latency_by_stage(records)))
+        print()
+        print(_table(latency_by_shipment(records, limit=20)))
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(to_otlp(records), f)
+        print(f"Wrote {len(records)} spans to {args.output}")
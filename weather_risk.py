@@ -0,0 +1,343 @@
+"""Port weather risk from cached, batched Open-Meteo forecasts.
+
+In the workflow, "weather forecast" calls Open-Meteo once per network city.
+"Parse Weather & Assess Risk" rates only ``precipitation_sum[0]``, and "add
+cities" matches each forecast to a port by scanning every port with a
+Manhattan distance on degrees. This module does the same job as three parts:
+
+* ``PortIndex``: nearest-port lookup on the sphere. Ports are indexed as unit
+  vectors, so chord distance orders neighbours exactly like great-circle
+  distance. It uses scipy's ``cKDTree`` when installed and a vectorised
+  search otherwise, which is faster anyway for a port list this size.
+* ``ForecastCache``: daily values per ``(lat, lon, day)`` with a TTL. Only
+  locations missing a fresh value for one of the requested days are fetched,
+  many per request (Open-Meteo takes comma-separated coordinate lists).
+* ``score_precipitation``: LOW / MEDIUM / HIGH for every forecast day at
+  once (> 20 mm HIGH, > 5 mm MEDIUM, as in the workflow node).
+
+``FixtureClient`` replays recorded responses offline (``RecordingClient``
+records them):
+
+    python weather_risk.py --record fixtures/weather.json
+    python weather_risk.py --fixture fixtures/weather.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import requests
+
+import tracing
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # pragma: no cover - the vectorised search covers small port lists
+    cKDTree = None
+
+# Same list as the workflow's "add cities" node
+PORTS = [
+    {"city": "Algeciras", "lat": 36.1408, "lon": -5.4562},
+    {"city": "Antwerp", "lat": 51.2213, "lon": 4.4051},
+    {"city": "Barcelona", "lat": 41.3894, "lon": 2.1686},
+    {"city": "Bremerhaven", "lat": 53.5396, "lon": 8.5809},
+    {"city": "Dunkirk", "lat": 51.0344, "lon": 2.377},
+    {"city": "Felixstowe", "lat": 51.9636, "lon": 1.351},
+    {"city": "Genoa", "lat": 44.4056, "lon": 8.9463},
+    {"city": "Gioia Tauro", "lat": 38.4247, "lon": 15.901},
+    {"city": "Hamburg", "lat": 53.5461, "lon": 9.9661},
+    {"city": "Le Havre", "lat": 49.4939, "lon": 0.1079},
+    {"city": "Marseille", "lat": 43.2965, "lon": 5.3698},
+    {"city": "Piraeus", "lat": 37.9429, "lon": 23.6469},
+    {"city": "Rotterdam", "lat": 51.9496, "lon": 4.1383},
+    {"city": "Valencia", "lat": 39.4699, "lon": -0.3763},
+]
+
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+DAILY_FIELDS = ("weather_code", "precipitation_sum")
+TIMEZONE = "Europe/Berlin"
+FORECAST_DAYS = 7
+FORECAST_TTL_SECONDS = 3 * 3600
+FETCH_TIMEOUT_SECONDS = 15
+# Coordinates per Open-Meteo request
+LOCATIONS_PER_REQUEST = 50
+
+RISK_LEVELS = ("LOW", "MEDIUM", "HIGH")
+MEDIUM_PRECIPITATION_MM = 5
+HIGH_PRECIPITATION_MM = 20
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _unit_vectors(lat, lon):
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _location_key(lat, lon):
+    return f"{float(lat):.4f},{float(lon):.4f}"
+
+
+def _today():
+    return datetime.now(ZoneInfo(TIMEZONE)).date()
+
+
+def forecast_days(days=FORECAST_DAYS, start=None):
+    """ISO dates of the forecast window (Open-Meteo's ``daily.time``)."""
+    start = start or _today()
+    return [(start + timedelta(days=i)).isoformat() for i in range(days)]
+
+
+# --- PORT INDEX ---
+class PortIndex:
+    """Nearest port on the sphere for arrays of coordinates."""
+
+    def __init__(self, ports=PORTS):
+        self.ports = list(ports)
+        self.cities = [p["city"] for p in self.ports]
+        self.xyz = _unit_vectors([p["lat"] for p in self.ports], [p["lon"] for p in self.ports])
+        self._tree = cKDTree(self.xyz) if cKDTree is not None else None
+
+    def nearest(self, lat, lon):
+        """Return ``(port positions, great-circle km)`` for coordinate arrays."""
+        q = _unit_vectors(np.atleast_1d(lat), np.atleast_1d(lon))
+        if self._tree is not None:
+            chord, idx = self._tree.query(q)
+        else:
+            d2 = ((q[:, None, :] - self.xyz[None, :, :]) ** 2).sum(axis=-1)
+            idx = d2.argmin(axis=1)
+            chord = np.sqrt(d2[np.arange(len(q)), idx])
+        km = 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+        return np.asarray(idx, dtype=np.int64), km
+
+
+# --- SCORING ---
+def score_precipitation(precipitation):
+    """Risk codes (0 LOW, 1 MEDIUM, 2 HIGH) for an array of daily mm; missing counts as 0 mm."""
+    p = np.nan_to_num(np.asarray(precipitation, dtype=np.float64), nan=0.0)
+    return (p > MEDIUM_PRECIPITATION_MM).astype(np.int8) + (p > HIGH_PRECIPITATION_MM).astype(np.int8)
+
+
+# --- FORECAST CACHE ---
+class ForecastCache:
+    """Daily forecast values per ``(lat, lon, day)``, each valid for ``ttl`` seconds."""
+
+    def __init__(self, ttl=FORECAST_TTL_SECONDS, clock=time.time):
+        self.ttl = ttl
+        self.clock = clock
+        self._days = {}  # (location key, day) -> (expires, {field: value})
+        self._lock = threading.Lock()
+
+    def get(self, lat, lon, days):
+        """``{"time": days, field: [...]}`` when every day is cached and fresh, else None."""
+        key, now = _location_key(lat, lon), self.clock()
+        with self._lock:
+            hits = [self._days.get((key, d)) for d in days]
+        if any(h is None or h[0] <= now for h in hits):
+            return None
+        daily = {"time": list(days)}
+        for field in DAILY_FIELDS:
+            daily[field] = [h[1].get(field) for h in hits]
+        return daily
+
+    def put(self, lat, lon, daily):
+        key, expires = _location_key(lat, lon), self.clock() + self.ttl
+        with self._lock:
+            for i, day in enumerate(daily.get("time") or []):
+                values = {}
+                for f in DAILY_FIELDS:
+                    column = daily.get(f) or []
+                    values[f] = column[i] if i < len(column) else None
+                self._days[(key, day)] = (expires, values)
+
+    def prune(self):
+        now = self.clock()
+        with self._lock:
+            for k in [k for k, (expires, _) in self._days.items() if expires <= now]:
+                del self._days[k]
+
+
+# --- CLIENTS ---
+class OpenMeteoClient:
+    """Batched Open-Meteo forecast requests (many coordinates per call)."""
+
+    def __init__(self, url=FORECAST_URL, timeout=FETCH_TIMEOUT_SECONDS, session=None):
+        self.url = url
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.requests = 0
+
+    def fetch(self, locations, days=FORECAST_DAYS):
+        """``daily`` dicts for ``[(lat, lon), ...]``, in order."""
+        out = []
+        for start in range(0, len(locations), LOCATIONS_PER_REQUEST):
+            chunk = locations[start:start + LOCATIONS_PER_REQUEST]
+            resp = self.session.get(self.url, timeout=self.timeout, params={
+                "latitude": ",".join(f"{lat:.4f}" for lat, _ in chunk),
+                "longitude": ",".join(f"{lon:.4f}" for _, lon in chunk),
+                "daily": ",".join(DAILY_FIELDS),
+                "timezone": TIMEZONE,
+                "forecast_days": days,
+            })
+            self.requests += 1
+            resp.raise_for_status()
+            body = resp.json()
+            # One location comes back as an object, several as a list
+            out.extend(r.get("daily") or {} for r in (body if isinstance(body, list) else [body]))
+        return out
+
+
+class FixtureClient:
+    """Replays recorded forecasts offline; dates are moved to start today."""
+
+    def __init__(self, path, rebase_dates=True):
+        with open(path, "r", encoding="utf-8") as f:
+            self.fixtures = json.load(f)
+        self.rebase_dates = rebase_dates
+        self.requests = 0
+
+    def fetch(self, locations, days=FORECAST_DAYS):
+        self.requests += 1
+        out = []
+        for lat, lon in locations:
+            key = _location_key(lat, lon)
+            if key not in self.fixtures:
+                raise KeyError(f"No recorded forecast for {key}")
+            daily = {f: list(v[:days]) for f, v in self.fixtures[key].items()}
+            if self.rebase_dates:
+                daily["time"] = forecast_days(len(daily.get("time") or []))
+            out.append(daily)
+        return out
+
+
+class RecordingClient:
+    """Wraps a client and writes every forecast it returns to a fixture file."""
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.path = path
+        self.fixtures = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.fixtures = json.load(f)
+
+    @property
+    def requests(self):
+        return self.inner.requests
+
+    def fetch(self, locations, days=FORECAST_DAYS):
+        out = self.inner.fetch(locations, days)
+        for (lat, lon), daily in zip(locations, out):
+            self.fixtures[_location_key(lat, lon)] = daily
+        d = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(d, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=d, prefix=".tmp-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.fixtures, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+        return out
+
+
+# --- SERVICE ---
+class WeatherRisk:
+    """Forecasts (cache first), per-day scoring and per-port rollup."""
+
+    def __init__(self, client=None, cache=None, index=None, days=FORECAST_DAYS):
+        self.client = client or OpenMeteoClient()
+        self.cache = cache or ForecastCache()
+        self.index = index or PortIndex()
+        self.days = days
+
+    def forecasts(self, locations):
+        """``daily`` dicts for ``[(lat, lon), ...]``; only cache misses are fetched."""
+        window = forecast_days(self.days)
+        out = [self.cache.get(lat, lon, window) for lat, lon in locations]
+        missing = sorted({(float(lat), float(lon)) for (lat, lon), d in zip(locations, out) if d is None})
+        if missing:
+            with tracing.span("weather forecast", stage="weather_fetch", attributes={"locations": len(missing)}):
+                fetched = dict(zip(missing, self.client.fetch(missing, self.days)))
+            for (lat, lon), daily in fetched.items():
+                self.cache.put(lat, lon, daily)
+            out = [d if d is not None else fetched[(float(lat), float(lon))] for (lat, lon), d in zip(locations, out)]
+        return out
+
+    def assess(self, locations):
+        """Per-location risk over every forecast day, with the nearest port."""
+        if not locations:
+            return []
+        dailies = self.forecasts(locations)
+        lats = np.array([lat for lat, _ in locations], dtype=np.float64)
+        lons = np.array([lon for _, lon in locations], dtype=np.float64)
+        ports, km = self.index.nearest(lats, lons)
+
+        # Pad to a (locations x days) matrix so all days score in one pass
+        width = max((len(d.get("precipitation_sum") or []) for d in dailies), default=0)
+        precip = np.full((len(dailies), max(width, 1)), np.nan)
+        for i, d in enumerate(dailies):
+            values = [np.nan if v is None else v for v in d.get("precipitation_sum") or []]
+            precip[i, :len(values)] = values
+        risk = score_precipitation(precip)
+        worst_day = risk.argmax(axis=1)
+        peak = np.nan_to_num(precip, nan=0.0).max(axis=1)
+
+        out = []
+        for i, d in enumerate(dailies):
+            codes = d.get("weather_code") or []
+            times = d.get("time") or []
+            n = len(d.get("precipitation_sum") or [])
+            out.append({
+                "latitude": float(lats[i]),
+                "longitude": float(lons[i]),
+                "port": self.index.cities[ports[i]],
+                "port_distance_km": round(float(km[i]), 1),
+                "daily_risk": [RISK_LEVELS[r] for r in risk[i, :n]],
+                "derived": {
+                    "precipitation_mm": float(peak[i]),
+                    "weather_code": codes[worst_day[i]] if worst_day[i] < len(codes) else None,
+                    "risk": RISK_LEVELS[risk[i].max()],
+                    "worst_day": times[worst_day[i]] if worst_day[i] < len(times) else None,
+                },
+            })
+        return out
+
+    def port_summary(self, assessments):
+        """One row per port in the shape "add cities" produces (worst day per location)."""
+        rows = {p["city"]: {"city": p["city"], "latitude": p["lat"], "longitude": p["lon"],
+                            "precipitation_mm": 0.0, "risk": 0, "codes": []} for p in self.index.ports}
+        for a in assessments:
+            row = rows[a["port"]]
+            row["precipitation_mm"] += a["derived"]["precipitation_mm"] or 0
+            row["risk"] = max(row["risk"], RISK_LEVELS.index(a["derived"]["risk"]))
+            row["codes"].append(a["derived"]["weather_code"])
+        return [{
+            "city": r["city"],
+            "latitude": r["latitude"],
+            "longitude": r["longitude"],
+            "precipitation_mm": round(r["precipitation_mm"], 1),
+            "max_risk": RISK_LEVELS[r["risk"]],
+            "weather_codes": ", ".join(str(c) for c in dict.fromkeys(r["codes"])),
+        } for r in rows.values()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Port weather risk for the logistics network.")
+    parser.add_argument("--fixture", help="Replay forecasts recorded in this file instead of calling Open-Meteo")
+    parser.add_argument("--record", help="Record Open-Meteo responses to this fixture file")
+    parser.add_argument("--days", type=int, default=FORECAST_DAYS)
+    args = parser.parse_args()
+
+    client = FixtureClient(args.fixture) if args.fixture else OpenMeteoClient()
+    if args.record:
+        client = RecordingClient(client, args.record)
+    service = WeatherRisk(client=client, days=args.days)
+    locations = [(p["lat"], p["lon"]) for p in PORTS]
+    started = time.perf_counter()
+    summary = service.port_summary(service.assess(locations))
+    print(json.dumps(summary, indent=2))
+    print(f"{len(locations)} locations, {client.requests} requests in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,481 @@
+"""Chunked, concurrent submission of manifests to the n8n webhook.
+
+The Upload page used to post the whole manifest in one request (and, in the
+demo build, only slept). ``submit_chunks`` instead splits a manifest into
+per-shipment (dict manifests) or per-batch-group (list manifests) payloads
+and posts them over one pooled HTTP session with a concurrency limit,
+retrying connection errors, timeouts and 429/5xx responses with exponential
+backoff. Chunks are produced lazily from the manifest stream, so only the
+chunks in flight are held in memory.
+
+``SubmissionJob`` runs a submission on a background thread with its own
+event loop and hands per-chunk results back through a queue. The Streamlit
+page keeps the job in session state and drains the queue with ``poll()``
+(non-blocking) on each rerun, so the script thread never waits on it.
+
+With a ``tracing.Tracer`` each chunk request is a ``webhook`` span, and
+stage spans the workflow reports in its response are stored under it.
+
+``StubWebhookServer`` is a local stand-in for n8n (fixed delay, optional
+failures, optionally simulated stage spans) to run the client against
+without the real workflow:
+
+    python webhook_client.py stub --port 8765 --trace
+    python webhook_client.py submit syntheticdata.json --url http://127.0.0.1:8765/webhook
+"""
+import argparse
+import asyncio
+import json
+import queue
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from manifest_stream import detect_root_type, iter_items
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - falls back to a pooled requests session on worker threads
+    aiohttp = None
+
+# Shipments per request for {"shipments": [...]} manifests, batches per request for list manifests
+CHUNK_SHIPMENTS = 1
+CHUNK_BATCHES = 5
+CONCURRENCY = 4
+RETRIES = 3
+BACKOFF_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8.0
+# The workflow answers once its agents are done with the chunk
+REQUEST_TIMEOUT_SECONDS = 120
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# Same body the workflow's "Respond to Webhook" node returns
+STUB_RESPONSE = {"status": "queued", "message": "Batch accepted for processing. Check dashboard history for results."}
+
+
+def chunk_size_for(root_type):
+    return CHUNK_BATCHES if root_type == "list" else CHUNK_SHIPMENTS
+
+
+def count_chunks(n_items, root_type, size=None):
+    size = size or chunk_size_for(root_type)
+    return -(-n_items // size)
+
+
+def iter_chunks(fp, root_type, size=None):
+    """Yield request payloads in the manifest's own shape, ``size`` top-level items each.
+
+    A single-shipment manifest (root type "shipment") is one payload, posted as it is.
+    """
+    if root_type == "shipment":
+        yield from iter_items(fp, root_type)
+        return
+    size = size or chunk_size_for(root_type)
+    chunk = []
+    for item in iter_items(fp, root_type):
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk if root_type == "list" else {"shipments": chunk}
+            chunk = []
+    if chunk:
+        yield chunk if root_type == "list" else {"shipments": chunk}
+
+
+class ChunkResult:
+    """Outcome of one chunk after all attempts."""
+
+    def __init__(self, index, items, shipment_ids=()):
+        self.index = index
+        self.items = items
+        self.shipment_ids = list(shipment_ids)
+        self.status = None
+        self.body = None
+        self.error = None
+        self.attempts = 0
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        return self.status is not None and 200 <= self.status < 300
+
+    def json(self):
+        """Response body parsed as JSON, or None."""
+        try:
+            return json.loads(self.body) if self.body else None
+        except ValueError:
+            return None
+
+
+def _items(payload):
+    # Batches of a list manifest, shipments of a dict one, or a single shipment
+    if isinstance(payload, list):
+        return payload
+    if "shipments" in payload:
+        return payload.get("shipments") or []
+    return [payload]
+
+
+def _items_in(payload):
+    return len(_items(payload))
+
+
+def _shipment_ids(payload):
+    # Batches of a list manifest carry their shipmentId too
+    items = _items(payload)
+    ids = (item.get("shipmentId") for item in items if isinstance(item, dict))
+    return list(dict.fromkeys(str(i) for i in ids if i is not None))
+
+
+def _backoff(attempt, base, retry_after=None):
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass
+    # Exponential with full jitter so parallel retries do not line up
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, base * 2 ** attempt))
+
+
+# --- HTTP ---
+def _open_session(concurrency, timeout):
+    if aiohttp is not None:
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=concurrency),
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        )
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+async def _close_session(session):
+    if aiohttp is not None:
+        await session.close()
+    else:
+        session.close()
+
+
+async def _post(session, url, body, timeout):
+    """Return ``(status, headers, text)``; raises on connection errors and timeouts."""
+    headers = {"Content-Type": "application/json"}
+    if aiohttp is not None:
+        async with session.post(url, data=body, headers=headers) as resp:
+            return resp.status, resp.headers, await resp.text()
+    resp = await asyncio.to_thread(session.post, url, data=body, headers=headers, timeout=timeout)
+    return resp.status_code, resp.headers, resp.text
+
+
+_TRANSIENT = (asyncio.TimeoutError, ConnectionError, OSError, requests.exceptions.RequestException)
+if aiohttp is not None:
+    _TRANSIENT += (aiohttp.ClientError,)
+
+
+async def _send(session, url, index, payload, retries, backoff, timeout):
+    result = ChunkResult(index, _items_in(payload), _shipment_ids(payload))
+    body = json.dumps(payload)
+    started = time.perf_counter()
+    for attempt in range(retries + 1):
+        result.attempts = attempt + 1
+        retry_after = None
+        try:
+            result.status, headers, result.body = await _post(session, url, body, timeout)
+            result.error = None
+            if result.status not in RETRY_STATUSES:
+                break
+            retry_after = headers.get("Retry-After")
+            result.error = f"HTTP {result.status}"
+        except _TRANSIENT as e:
+            result.status, result.body = None, None
+            result.error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+        if attempt < retries:
+            await asyncio.sleep(_backoff(attempt, backoff, retry_after))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+async def _send_traced(tracer, parent, session, url, index, payload, retries, backoff, timeout):
+    ids = _shipment_ids(payload)
+    attributes = {"chunk.index": index, "chunk.items": _items_in(payload), "http.url": url}
+    if len(ids) > 1:
+        attributes["shipment.ids"] = ids
+    with tracer.span(
+        "webhook.post", stage="webhook", shipment_id=ids[0] if len(ids) == 1 else None,
+        attributes=attributes, parent=parent,
+    ) as span:
+        result = await _send(session, url, index, payload, retries, backoff, timeout)
+        span.set_attribute("http.status_code", result.status)
+        span.set_attribute("chunk.attempts", result.attempts)
+        if not result.ok:
+            span.record_error(RuntimeError(result.error or f"HTTP {result.status}"))
+        else:
+            tracer.ingest(result.json(), parent=span)
+    return result
+
+
+async def submit_chunks(
+    url,
+    chunks,
+    concurrency=CONCURRENCY,
+    retries=RETRIES,
+    backoff=BACKOFF_SECONDS,
+    timeout=REQUEST_TIMEOUT_SECONDS,
+    on_result=None,
+    tracer=None,
+    parent=None,
+):
+    """Post every payload from ``chunks`` to ``url``; returns ``ChunkResult``s in chunk order.
+
+    At most ``concurrency`` requests are in flight and ``chunks`` is only
+    advanced as workers free up. ``on_result(result)`` is called as each
+    chunk finishes. With ``tracer``, requests are traced under ``parent``
+    (a span or ``(trace_id, span_id)``).
+    """
+    source = enumerate(chunks)
+    results = []
+    session = _open_session(concurrency, timeout)
+
+    async def worker():
+        for index, payload in source:
+            if tracer is not None:
+                result = await _send_traced(tracer, parent, session, url, index, payload, retries, backoff, timeout)
+            else:
+                result = await _send(session, url, index, payload, retries, backoff, timeout)
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        await _close_session(session)
+    return sorted(results, key=lambda r: r.index)
+
+
+class SubmissionJob:
+    """Runs ``submit_chunks`` on a background thread; results arrive through a queue.
+
+    With a ``tracer`` option and ``span_name``, the whole submission is one
+    span (stage "submit") under ``parent``, with the chunk requests below it.
+    """
+
+    def __init__(self, url, chunks, span_name=None, span_attributes=None, **options):
+        self.url = url
+        self.chunks = chunks
+        self.span_name = span_name
+        self.span_attributes = span_attributes
+        self.options = options
+        self.results = []
+        self.error = None
+        self.done = False
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def _submit(self, options):
+        asyncio.run(submit_chunks(self.url, self.chunks, on_result=self._queue.put, **options))
+
+    def _run(self):
+        tracer = self.options.get("tracer")
+        try:
+            if tracer is not None and self.span_name:
+                with tracer.span(
+                    self.span_name, stage="submit", attributes=self.span_attributes, parent=self.options.get("parent"),
+                ) as span:
+                    self._submit(dict(self.options, parent=span.context))
+            else:
+                self._submit(self.options)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._queue.put(None)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="webhook-submit", daemon=True)
+        self._thread.start()
+        return self
+
+    def _finish(self):
+        self._thread.join()
+        self.results.sort(key=lambda r: r.index)
+        self.done = True
+
+    def poll(self):
+        """``ChunkResult``s that finished since the last call, without blocking; sets ``done`` at the end."""
+        new = []
+        while not self.done:
+            try:
+                result = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if result is None:
+                self._finish()
+            else:
+                self.results.append(result)
+                new.append(result)
+        return new
+
+    def updates(self):
+        """Yield each ``ChunkResult`` as it finishes until the job is done (blocks; for scripts)."""
+        while True:
+            result = self._queue.get()
+            if result is None:
+                break
+            self.results.append(result)
+            yield result
+        self._finish()
+
+    @property
+    def failed(self):
+        return [r for r in self.results if not r.ok]
+
+
+# --- STUB SERVER ---
+# Simulated per-shipment stage durations (ms) for ``traced_stub_response``
+STUB_STAGE_MS = [
+    ("DPP Missing Data Check", 5, 40),
+    ("Batch mapping", 2, 20),
+    ("Dijkstra Solver", 1, 10),
+    ("weather forecast", 150, 900),
+    ("batch compliance agent", 2000, 9000),
+    ("route compliance agent", 2500, 12000),
+    ("Decision Agent1", 1500, 6000),
+    ("Update sheet: GOOD", 200, 1200),
+]
+
+
+def traced_stub_response(payload):
+    """``STUB_RESPONSE`` plus made-up stage spans per shipment, in the shape a workflow code node sends."""
+    spans = []
+    end_ms = time.time() * 1000
+    for shipment_id in _shipment_ids(payload) or [None]:
+        t = end_ms
+        stages = []
+        for name, lo, hi in reversed(STUB_STAGE_MS):
+            duration = random.uniform(lo, hi)
+            stages.append({"name": name, "shipmentId": shipment_id, "startMs": t - duration, "endMs": t})
+            t -= duration
+        spans.extend(reversed(stages))
+    return dict(STUB_RESPONSE, spans=spans)
+
+
+class StubWebhookServer:
+    """Local n8n stand-in: answers POSTs with the workflow's queued response.
+
+    ``delay`` seconds per request; the first ``fail_first`` requests get a 503.
+    ``response`` may be a callable of the payload. Received payloads are kept
+    in ``received``.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0, fail_first=0, response=None):
+        self.delay = delay
+        self.fail_first = fail_first
+        self.response = STUB_RESPONSE if response is None else response
+        self.received = []
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/webhook"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with stub._lock:
+                    stub.requests += 1
+                    failing = stub.requests <= stub.fail_first
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if failing:
+                    self.send_response(503)
+                    self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    return
+                payload = json.loads(body or b"null")
+                with stub._lock:
+                    stub.received.append(payload)
+                response = stub.response(payload) if callable(stub.response) else stub.response
+                out = json.dumps(response).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="webhook-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Submit manifests to the n8n webhook, or run a local stub.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    stub = sub.add_parser("stub", help="Serve a local stand-in for the webhook")
+    stub.add_argument("--port", type=int, default=8765)
+    stub.add_argument("--delay", type=float, default=0.0)
+    stub.add_argument("--fail-first", type=int, default=0)
+    stub.add_argument("--trace", action="store_true", help="Answer with simulated stage spans")
+    submit = sub.add_parser("submit", help="Submit a manifest in chunks")
+    submit.add_argument("manifest")
+    submit.add_argument("--url", required=True)
+    submit.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    submit.add_argument("--chunk-size", type=int, default=None)
+    submit.add_argument("--trace", action="store_true", help="Record spans to TRACE_SINK")
+    args = parser.parse_args()
+
+    if args.cmd == "stub":
+        server = StubWebhookServer(
+            port=args.port, delay=args.delay, fail_first=args.fail_first,
+            response=traced_stub_response if args.trace else None,
+        )
+        print(f"Stub webhook listening on {server.url}")
+        try:
+            server._httpd.serve_forever()
+        except KeyboardInterrupt:
+            server._httpd.server_close()
+    else:
+        with open(args.manifest, "rb") as fp:
+            root_type = detect_root_type(fp)
+            fp.seek(0)
+            started = time.perf_counter()
+            tracer = None
+            if args.trace:
+                from tracing import get_tracer
+
+                tracer = get_tracer()
+                if not tracer.enabled:
+                    print("Tracing is off; set TRACE_SINK (e.g. jsonl:////tmp/shipping-traces.jsonl) to record spans")
+            results = asyncio.run(submit_chunks(
+                args.url, iter_chunks(fp, root_type, args.chunk_size), concurrency=args.concurrency, tracer=tracer,
+            ))
+        failed = [r for r in results if not r.ok]
+        print(f"{len(results) - len(failed)}/{len(results)} chunks accepted in {time.perf_counter() - started:.2f}s")
+        for r in failed[:10]:
+            print(f"  chunk {r.index}: {r.error or r.status} after {r.attempts} attempts")